@@ -0,0 +1,370 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+import platform
+import resource
+import tempfile
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+
+# Offline benchmark of the recommendation hot path.
+#
+#   python -m backend.benchmark --out backend/data/benchmark.json
+#   python -m backend.benchmark --baseline backend/data/benchmark.json
+#
+# Restaurants are synthetic and the Groq clients are stubs with a fixed latency, so
+# runs are reproducible without network access. --encoder model swaps the hashing
+# encoder for the real sentence-transformers model (needs it cached locally).
+
+DEFAULT_ROWS = 20000
+DEFAULT_QUERIES = 200
+DEFAULT_CONCURRENCY = [1, 4, 16, 64]
+DEFAULT_LLM_LATENCY_MS = 50.0
+# Allowed slowdown (fraction) against a baseline before a metric counts as a regression
+DEFAULT_TOLERANCE = 0.2
+DIMENSION = 384
+
+CUISINES = ["North Indian", "Chinese", "South Indian", "Biryani", "Pizza", "Burger", "Cafe", "Desserts",
+            "Italian", "Continental", "Fast Food", "Seafood", "Kerala", "Andhra", "Mughlai", "Beverages"]
+LOCATIONS = ["BTM", "HSR", "Koramangala 5th Block", "Indiranagar", "Jayanagar", "Whitefield", "JP Nagar",
+             "Marathahalli", "Bellandur", "Electronic City", "MG Road", "Church Street", "Malleshwaram"]
+REST_TYPES = ["Casual Dining", "Quick Bites", "Cafe", "Delivery", "Dessert Parlor", "Casual Dining, Bar",
+              "Fine Dining", "Bakery", "Pub", "Food Court"]
+CHAINS = ["Domino's", "McDonald's", "Empire", "Meghana Foods", "Truffles", "Onesta", "Chai Point", "KFC"]
+
+
+def make_restaurants(n, seed=0):
+    """Synthetic restaurants shaped like the Zomato dataset, including chains with many branches."""
+    rng = np.random.default_rng(seed)
+    names = np.array([f"Restaurant {i}" for i in range(n)], dtype=object)
+    # About 15% of rows are branches of a handful of chains
+    chain_rows = rng.random(n) < 0.15
+    names[chain_rows] = rng.choice(CHAINS, size=int(chain_rows.sum()))
+    cuisines = [", ".join(rng.choice(CUISINES, size=rng.integers(1, 4), replace=False)) for _ in range(n)]
+    rating = np.round(rng.uniform(2.5, 4.9, size=n), 1).astype(str)
+    rating = np.where(rng.random(n) < 0.05, "NEW", np.char.add(rating, "/5"))
+    return pd.DataFrame({
+        "name": names,
+        "cuisines": cuisines,
+        "location": rng.choice(LOCATIONS, size=n),
+        "rest_type": rng.choice(REST_TYPES, size=n),
+        "rate": rating,
+        "votes": rng.integers(0, 5000, size=n),
+        "approx_cost(for_two_people)": (rng.integers(2, 30, size=n) * 50).astype(str),
+        "url": [f"https://zomato.test/{i}" for i in range(n)],
+    })
+
+
+def make_queries(n, seed=1):
+    """Distinct free-text queries, so result and embedding caches don't short-circuit the run."""
+    rng = np.random.default_rng(seed)
+    return [
+        f"{rng.choice(CUISINES)} {rng.choice(REST_TYPES).lower()} in {rng.choice(LOCATIONS)} #{i}"
+        for i in range(n)
+    ]
+
+
+class HashingEncoder:
+    """
+    Deterministic offline stand-in for SentenceTransformer: each word is hashed to a
+    fixed random direction and a text is the normalized sum of its words.
+    """
+
+    def __init__(self, dimension=DIMENSION):
+        self.dimension = dimension
+        self._words = {}
+
+    def _word(self, word):
+        vector = self._words.get(word)
+        if vector is None:
+            seed = int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "little")
+            vector = np.random.default_rng(seed).standard_normal(self.dimension).astype('float32')
+            self._words[word] = vector
+        return vector
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        out = np.zeros((len(texts), self.dimension), dtype='float32')
+        for i, text in enumerate(texts):
+            for word in str(text).lower().replace(",", " ").replace(".", " ").split():
+                out[i] += self._word(word)
+            norm = np.linalg.norm(out[i])
+            if norm:
+                out[i] /= norm
+        return out
+
+
+def _completion(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+class StubGroq:
+    """Groq client stand-in that answers after a fixed latency."""
+
+    def __init__(self, latency_ms=DEFAULT_LLM_LATENCY_MS, text="Stub analysis."):
+        self.latency = latency_ms / 1000
+        self.text = text
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, messages, model, **kwargs):
+        time.sleep(self.latency)
+        return _completion(self.text)
+
+
+class StubAsyncGroq(StubGroq):
+    """AsyncGroq client stand-in that answers after a fixed latency."""
+
+    async def _create(self, messages, model, **kwargs):
+        await asyncio.sleep(self.latency)
+        return _completion(self.text)
+
+
+def percentiles(samples_ms):
+    """Summary of a list of latencies in milliseconds."""
+    samples = np.asarray(samples_ms, dtype=float)
+    if samples.size == 0:
+        return {"n": 0}
+    return {
+        "n": int(samples.size),
+        "mean_ms": round(float(samples.mean()), 4),
+        "p50_ms": round(float(np.percentile(samples, 50)), 4),
+        "p95_ms": round(float(np.percentile(samples, 95)), 4),
+        "p99_ms": round(float(np.percentile(samples, 99)), 4),
+    }
+
+
+def time_calls(fn, args_list):
+    """Calls fn once per argument tuple and returns the latencies in milliseconds."""
+    latencies = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def prepare_artifacts(data_dir, rows, index_type, encoder, seed=0):
+    """Runs the real ingestion pipeline over synthetic restaurants into data_dir."""
+    from backend.ingest_data import ingest_data
+
+    ingest_data(index_type=index_type, df=make_restaurants(rows, seed), data_dir=data_dir, model=encoder, full=True)
+
+
+def load_service(data_dir, encoder, llm_latency_ms, cache=False):
+    """Loads a RecommendationService from data_dir and swaps in stub Groq clients."""
+    from backend.core import RecommendationService
+    from backend.utils.llm_gateway import LLMGateway, AsyncLLMGateway
+
+    service = RecommendationService(data_dir=data_dir, embedding_model=encoder)
+    start = time.perf_counter()
+    service.load_resources()
+    startup = time.perf_counter() - start
+
+    # Stubs sit behind the real gateways, so retry/hedge/breaker overhead is measured too
+    service.groq_client = LLMGateway(StubGroq(llm_latency_ms))
+    service.async_groq_client = AsyncLLMGateway(StubAsyncGroq(llm_latency_ms))
+    if not cache:
+        service.embedding_cache = service.results_cache = service.analysis_cache = None
+    return service, startup
+
+
+def bench_stages(service, queries, top_k=5):
+    """Per-stage latency percentiles for one query at a time."""
+    vectors = service.embedding_model.encode(queries).astype('float32')
+    search_k = service._initial_search_k(top_k)
+    stages = {
+        "encode": time_calls(lambda q: service.embedding_model.encode([q]), [(q,) for q in queries]),
+        "faiss_search": time_calls(lambda v: service.faiss_index.search(v, search_k), [(v[None, :],) for v in vectors]),
+        "search_restaurants": time_calls(service.search_restaurants, [(q, top_k) for q in queries]),
+        "get_recommendations": time_calls(service.get_recommendations, [(q, top_k) for q in queries]),
+    }
+    return {name: percentiles(samples) for name, samples in stages.items()}
+
+
+async def _api_run(app, queries, concurrency, top_k):
+    import httpx
+
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(query):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/api/recommend", json={"query": query, "top_k": top_k})
+                latencies.append((time.perf_counter() - start) * 1000)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(q) for q in queries))
+        elapsed = time.perf_counter() - start
+    return latencies, elapsed
+
+
+def bench_api(service, queries, concurrency_levels, top_k=5):
+    """
+    Drives /api/recommend in-process (ASGI transport, no sockets) at each concurrency
+    level and returns throughput plus request latency percentiles.
+    """
+    from backend import main
+
+    main.rec_service = service
+    rows = []
+    for concurrency in concurrency_levels:
+        latencies, elapsed = asyncio.run(_api_run(main.app, queries, concurrency, top_k))
+        rows.append({
+            "concurrency": concurrency,
+            "requests": len(queries),
+            "throughput_rps": round(len(queries) / elapsed, 2),
+            **percentiles(latencies),
+        })
+    return rows
+
+
+def run_benchmark(rows=DEFAULT_ROWS, queries=DEFAULT_QUERIES, concurrency=DEFAULT_CONCURRENCY,
+                  index_type="flat", encoder="hash", llm_latency_ms=DEFAULT_LLM_LATENCY_MS,
+                  cache=False, data_dir=None, top_k=5):
+    """
+    Runs the whole suite and returns the results as a JSON-serializable dict.
+
+    Args:
+        rows (int): Synthetic restaurants to ingest.
+        queries (int): Distinct queries per stage and per concurrency level.
+        concurrency (list[int]): Concurrent in-flight API requests to measure.
+        index_type (str): Index built for the run (see vector_index.INDEX_TYPES).
+        encoder (str): "hash" for the offline HashingEncoder, "model" for MODEL_NAME on
+            PyTorch, "onnx" for the exported ONNX model (see backend.export_encoder).
+        llm_latency_ms (float): Simulated Groq response time.
+        cache (bool): Keep the query/result/analysis caches enabled.
+        data_dir (str): Where to write the synthetic artifacts (a temp dir by default).
+    """
+    if encoder in ("model", "onnx"):
+        from backend.utils.encoders import load_encoder
+        model = load_encoder("torch" if encoder == "model" else "onnx")
+    else:
+        model = HashingEncoder()
+
+    with tempfile.TemporaryDirectory(prefix="rec-bench-") as tmp:
+        data_dir = data_dir or tmp
+        prepare_artifacts(data_dir, rows, index_type, model)
+        service, startup = load_service(data_dir, model, llm_latency_ms, cache=cache)
+        rss_after_load = peak_rss_mb()
+
+        query_list = make_queries(queries)
+        stages = bench_stages(service, query_list, top_k)
+        throughput = bench_api(service, query_list, concurrency, top_k)
+        service.executor.shutdown(wait=False)
+
+    return {
+        "config": {
+            "rows": rows, "queries": queries, "concurrency": list(concurrency), "index_type": index_type,
+            "encoder": encoder, "llm_latency_ms": llm_latency_ms, "cache": cache, "top_k": top_k,
+        },
+        "environment": {
+            "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+        },
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "startup_s": round(startup, 4),
+        "stages": stages,
+        "throughput": throughput,
+        "peak_rss_mb": {"after_load": rss_after_load, "end": peak_rss_mb()},
+    }
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compares a run against a baseline run.
+
+    Returns:
+        list[dict]: One entry per metric that got worse by more than tolerance
+        (latencies and startup up, throughput down, peak RSS up).
+    """
+    checks = [("startup_s", results.get("startup_s"), baseline.get("startup_s"), True)]
+    for name, stage in results.get("stages", {}).items():
+        base = baseline.get("stages", {}).get(name, {})
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            checks.append((f"stages.{name}.{key}", stage.get(key), base.get(key), True))
+    base_throughput = {row["concurrency"]: row for row in baseline.get("throughput", [])}
+    for row in results.get("throughput", []):
+        base = base_throughput.get(row["concurrency"], {})
+        prefix = f"throughput.c{row['concurrency']}"
+        checks.append((f"{prefix}.throughput_rps", row.get("throughput_rps"), base.get("throughput_rps"), False))
+        checks.append((f"{prefix}.p95_ms", row.get("p95_ms"), base.get("p95_ms"), True))
+    checks.append(("peak_rss_mb.end", results.get("peak_rss_mb", {}).get("end"),
+                   baseline.get("peak_rss_mb", {}).get("end"), True))
+
+    regressions = []
+    for metric, value, base, lower_is_better in checks:
+        if value is None or not base:
+            continue
+        change = (value - base) / base
+        if (change > tolerance) if lower_is_better else (change < -tolerance):
+            regressions.append({"metric": metric, "baseline": base, "value": value, "change": round(change, 4)})
+    return regressions
+
+
+def format_results(results):
+    """Formats a run as a plain-text summary."""
+    lines = [f"startup: {results['startup_s']:.3f}s   peak RSS: {results['peak_rss_mb']['end']} MB", ""]
+    lines.append(f"{'stage':<22} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, stage in results["stages"].items():
+        lines.append(f"{name:<22} {stage['p50_ms']:>9.3f} {stage['p95_ms']:>9.3f} {stage['p99_ms']:>9.3f}")
+    lines.append("")
+    lines.append(f"{'concurrency':<12} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for row in results["throughput"]:
+        lines.append(
+            f"{row['concurrency']:<12} {row['throughput_rps']:>9.1f} {row['p50_ms']:>9.3f} "
+            f"{row['p95_ms']:>9.3f} {row['p99_ms']:>9.3f}"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    from backend.utils.vector_index import INDEX_TYPES
+
+    parser = argparse.ArgumentParser(description="Benchmark the recommendation hot path on synthetic data")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help="Synthetic restaurants to ingest")
+    parser.add_argument("--queries", type=int, default=DEFAULT_QUERIES, help="Queries per stage and concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=DEFAULT_CONCURRENCY, help="Concurrency levels")
+    parser.add_argument("--index-type", choices=sorted(INDEX_TYPES), default="flat", help="FAISS index type")
+    parser.add_argument("--encoder", choices=["hash", "model", "onnx"], default="hash",
+                        help="Offline hashing encoder, the real model on PyTorch, or its ONNX export")
+    parser.add_argument("--llm-latency-ms", type=float, default=DEFAULT_LLM_LATENCY_MS, help="Simulated Groq latency")
+    parser.add_argument("--cache", action="store_true", help="Keep the query/result/analysis caches enabled")
+    parser.add_argument("--out", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against a previous results JSON file")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed regression (fraction)")
+    args = parser.parse_args()
+
+    results = run_benchmark(
+        rows=args.rows, queries=args.queries, concurrency=args.concurrency, index_type=args.index_type,
+        encoder=args.encoder, llm_latency_ms=args.llm_latency_ms, cache=args.cache,
+    )
+    print(format_results(results))
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), tolerance=args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for r in regressions:
+                print(f"  {r['metric']}: {r['baseline']} -> {r['value']} ({r['change']:+.1%})")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.tolerance:.0%} against {args.baseline}.")
@@ -4,13 +4,19 @@ import json
 import sys
 
 API_URL = "http://localhost:8000/api/recommend"
+STREAM_URL = API_URL + "/stream"
+BATCH_URL = API_URL + "/batch"
+# Queries sent per /batch request when running a query file
+BATCH_CHUNK_SIZE = 1000
 
-def get_recommendation(query, top_k=5):
+def get_recommendation(query, top_k=5, filters=None):
     """Sends a recommendation request to the backend."""
     payload = {
         "query": query,
         "top_k": top_k
     }
+    # Structured filters: location, rest_type, max_cost, min_rating
+    payload.update({k: v for k, v in (filters or {}).items() if v not in (None, "")})
     
     try:
         response = requests.post(API_URL, json=payload, timeout=30)
@@ -20,21 +26,128 @@ def get_recommendation(query, top_k=5):
         print(f"Error communicating with backend: {e}")
         return None
 
-from backend.utils.formatter import format_recommendations_display
+def stream_recommendation(query, top_k=5, filters=None):
+    """
+    Requests a streamed recommendation and yields (event, data) pairs parsed
+    from the Server-Sent Events response.
+    """
+    payload = {
+        "query": query,
+        "top_k": top_k
+    }
+    payload.update({k: v for k, v in (filters or {}).items() if v not in (None, "")})
+
+    try:
+        with requests.post(STREAM_URL, json=payload, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            event = "message"
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    yield event, json.loads(line[len("data:"):].strip())
+                    event = "message"
+    except requests.exceptions.RequestException as e:
+        print(f"Error communicating with backend: {e}")
+
+def recommend_batch(queries, top_k=5, filters=None, analysis=False, chunk_size=BATCH_CHUNK_SIZE):
+    """
+    Sends queries to the batch endpoint chunk_size at a time and yields the parsed
+    NDJSON result objects. "index" refers to the position in `queries`.
+    """
+    payload = {"top_k": top_k, "analysis": analysis}
+    payload.update({k: v for k, v in (filters or {}).items() if v not in (None, "")})
+
+    for start in range(0, len(queries), chunk_size):
+        chunk = queries[start:start + chunk_size]
+        try:
+            with requests.post(BATCH_URL, json={**payload, "queries": chunk}, stream=True, timeout=300) as response:
+                response.raise_for_status()
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line:
+                        continue
+                    item = json.loads(line)
+                    if "index" in item:
+                        item["index"] += start
+                    yield item
+        except requests.exceptions.RequestException as e:
+            print(f"Error communicating with backend: {e}", file=sys.stderr)
+            return
+
+def read_queries(path):
+    """Reads one query per non-empty line from a file ('-' for stdin)."""
+    source = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        return [line.strip() for line in source if line.strip()]
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+def run_query_file(path, top_k=5, filters=None, analysis=False, output=None, chunk_size=BATCH_CHUNK_SIZE):
+    """Runs every query in a file through the batch endpoint, writing NDJSON to output (default stdout)."""
+    queries = read_queries(path)
+    out = open(output, "w", encoding="utf-8") if output else sys.stdout
+    count = 0
+    try:
+        for item in recommend_batch(queries, top_k, filters, analysis, chunk_size=chunk_size):
+            out.write(json.dumps(item) + "\n")
+            count += 1
+    finally:
+        if output:
+            out.close()
+    print(f"Wrote {count} of {len(queries)} results.", file=sys.stderr)
+    return count
+
+from backend.utils.formatter import (
+    format_recommendations_display, format_restaurants_section, format_ai_analysis_header
+)
 
 def display_results(data):
     """Formats and prints the recommendation results."""
     print("\n" + format_recommendations_display(data))
 
+def display_stream(events):
+    """Prints the restaurants as soon as they arrive, then the AI analysis as it streams in."""
+    for event, data in events:
+        if event == "restaurants":
+            print("\n" + format_restaurants_section(data.get("restaurants", [])))
+            print("\n" + format_ai_analysis_header())
+        elif event == "token":
+            print(data.get("text", ""), end="", flush=True)
+        elif event == "done":
+            print()
+        elif event == "error":
+            print(f"Error: {data.get('detail')}")
+
 
 def main():
     parser = argparse.ArgumentParser(description="Zomato AI Restaurant Recommender CLI")
     parser.add_argument("query", nargs="?", help="Your restaurant query (e.g., 'Spicy Italian in Bangalore')")
     parser.add_argument("--top_k", type=int, default=5, help="Number of recommendations to retrieve")
+    parser.add_argument("--location", help="Only restaurants in this area (e.g., Koramangala)")
+    parser.add_argument("--rest-type", help="Only this kind of place (e.g., Cafe, Quick Bites)")
+    parser.add_argument("--max-cost", type=float, help="Maximum cost for two")
+    parser.add_argument("--min-rating", type=float, help="Minimum rating out of 5")
+    parser.add_argument("--stream", action="store_true", help="Show restaurants immediately and stream the AI analysis")
+    parser.add_argument("--query-file", help="Run every query in this file (one per line, '-' for stdin) via the batch endpoint")
+    parser.add_argument("--analysis", action="store_true", help="With --query-file, also generate the AI analysis per query")
+    parser.add_argument("--output", help="With --query-file, write NDJSON results here instead of stdout")
     
     args = parser.parse_args()
     
     query = args.query
+    filters = {
+        "location": args.location,
+        "rest_type": args.rest_type,
+        "max_cost": args.max_cost,
+        "min_rating": args.min_rating,
+    }
+    if args.query_file:
+        run_query_file(args.query_file, args.top_k, filters, analysis=args.analysis, output=args.output)
+        return
+
     if not query:
         print("Welcome to Zomato AI Recommender!")
         print("Let's find you the perfect place to eat.")
@@ -47,23 +160,32 @@ def main():
         parts = []
         if cuisine:
             parts.append(f"{cuisine} food")
+        # Location and budget are also sent as filters so they are enforced, not just hinted
         if location:
             parts.append(f"in {location}")
+            filters["location"] = location
         if budget:
-            parts.append(f"budget around {budget}")
+            try:
+                filters["max_cost"] = float(budget.replace(",", ""))
+            except ValueError:
+                parts.append(f"budget around {budget}")
             
-        if not parts:
+        if not parts and not any(filters.values()):
             print("No preferences provided. Exiting.")
             return
             
-        query = " ".join(parts)
+        query = " ".join(parts) or "restaurants"
         
     if not query.strip():
         print("Empty query. Exiting.")
         return
 
     print(f"\nSearching for: '{query}'...")
-    result = get_recommendation(query, args.top_k)
+    if args.stream:
+        display_stream(stream_recommendation(query, args.top_k, filters))
+        return
+
+    result = get_recommendation(query, args.top_k, filters)
     display_results(result)
 
 if __name__ == "__main__":
@@ -1,12 +1,33 @@
 import os
-import streamlit as st
-import pickle
-import faiss
-import pandas as pd
-from sentence_transformers import SentenceTransformer
-from groq import Groq
+import asyncio
+import time
+import threading
+import contextvars
+import functools
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from backend.utils.llm_service import generate_restaurant_analysis
+from backend.utils.llm_service import (
+    generate_restaurant_analysis, agenerate_restaurant_analysis,
+    stream_restaurant_analysis, astream_restaurant_analysis, get_groq_client, get_async_groq_client
+)
+from backend.utils.llm_gateway import FALLBACK_PREFIX, reset_gateways
+from backend.utils.vector_index import (
+    load_index, search_selected, search_subset, search_reranked, supports_selector
+)
+from backend.utils.batching import MicroBatcher
+from backend.utils.cache import TieredCache, normalize_query, make_key
+from backend.utils.filters import FilterIndex, normalize_filters, describe_query
+from backend.utils.ranking import FusionRanker, budget_from_query, RANK_FUSION
+from backend.utils.lexical import LexicalIndex, reciprocal_rank_fusion, LEXICAL_INDEX_FILE
+from backend.utils.shards import ShardSet
+from backend.utils.multivector import ChunkIndex, max_sim
+from backend.utils.metrics import span, LLM_USAGE
+from backend.utils.encoders import MODEL_NAME, ENCODER_BACKEND, load_encoder
+from backend.utils.artifacts import (
+    load_metadata, load_vectors, build_result_columns, materialize_results, current_generation, generation_dir,
+    VECTORS_FILE as VECTORS_FILE_NAME
+)
 from typing import List, Optional
 
 # Load environment variables
@@ -14,124 +35,870 @@ load_dotenv()
 
 # Global variables for artifacts
 DATA_DIR = "backend/data"
-METADATA_PARTS = [
-    os.path.join(DATA_DIR, "restaurants_part1.parquet"),
-    os.path.join(DATA_DIR, "restaurants_part2.parquet")
-]
 INDEX_FILE = os.path.join(DATA_DIR, "faiss_index.bin")
-MODEL_NAME = "all-MiniLM-L6-v2"
+VECTORS_FILE = os.path.join(DATA_DIR, VECTORS_FILE_NAME)
+# Map artifacts read-only so uvicorn workers share one copy through the page cache
+ARTIFACT_MMAP = os.getenv("ARTIFACT_MMAP", "1") != "0"
+# Threads available for CPU-bound encode/search work off the event loop
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", "4"))
+# Micro-batching of concurrent queries; BATCH_MAX_SIZE=1 disables it
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "32"))
+BATCH_WINDOW_MS = float(os.getenv("BATCH_WINDOW_MS", "2"))
+# Candidates fetched per requested result before deduplication. When duplicates
+# (chains) still leave fewer than top_k restaurants, the search is widened by
+# OVERFETCH_GROWTH up to OVERFETCH_MAX_ROUNDS times.
+OVERFETCH_FACTOR = float(os.getenv("OVERFETCH_FACTOR", "2"))
+OVERFETCH_GROWTH = int(os.getenv("OVERFETCH_GROWTH", "4"))
+OVERFETCH_MAX_ROUNDS = int(os.getenv("OVERFETCH_MAX_ROUNDS", "4"))
+# Filtered searches over at most this many rows scan the raw vectors exactly
+# instead of running the ANN index with an IDSelector.
+FILTER_EXACT_MAX_ROWS = int(os.getenv("FILTER_EXACT_MAX_ROWS", "4096"))
+# "hybrid" fuses the vector shortlist with a BM25 keyword list (reciprocal rank fusion,
+# constant RRF_K) when the bundle has a lexical index; "vector" (default) uses FAISS alone.
+# A keyword rank counts RRF_LEXICAL_WEIGHT times a vector rank; at 1.0 the top keyword hits
+# (exact restaurant or dish names the embedding missed) enter the results even when FAISS
+# didn't shortlist them, while lower values only reorder the vector shortlist.
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "vector")
+RRF_K = int(os.getenv("RRF_K", "60"))
+RRF_LEXICAL_WEIGHT = float(os.getenv("RRF_LEXICAL_WEIGHT", "1.0"))
+# Region shards to serve instead of the monolithic index: "all", or a comma-separated list
+# of shard names (e.g. "btm,hsr"); unset uses faiss_index.bin. Shards load on first use.
+SEARCH_SHARDS = os.getenv("SEARCH_SHARDS", "")
+# MULTI_VECTOR=1 also matches queries against review/menu chunk vectors when the bundle has
+# them (max-sim per restaurant); off by default
+MULTI_VECTOR = os.getenv("MULTI_VECTOR", "0") == "1"
+# Caches for query embeddings, result lists and LLM analyses; CACHE_MAX_ENTRIES=0 disables them.
+# Set CACHE_DB_PATH (e.g. backend/data/cache.sqlite3) to add an on-disk tier that survives restarts.
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "3600"))
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH")
+CACHE_DISK_MAX_ENTRIES = int(os.getenv("CACHE_DISK_MAX_ENTRIES", "100000"))
+# Bulk requests: queries encoded/searched per matrix, and concurrent LLM calls when analysis is on
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "512"))
+BULK_LLM_CONCURRENCY = int(os.getenv("BULK_LLM_CONCURRENCY", "4"))
+# Seconds between checks of data_dir/CURRENT for a newly published generation; 0 disables
+ARTIFACT_WATCH_SECONDS = float(os.getenv("ARTIFACT_WATCH_SECONDS", "0"))
 
 class RecommendationService:
-    def __init__(self):
+    def __init__(self, data_dir=DATA_DIR, embedding_model=None):
+        # Artifacts are read from data_dir (its current generation, if versioned);
+        # pass embedding_model to skip loading MODEL_NAME
+        self.data_dir = data_dir
+        self.generation = None
+        self.index_file = os.path.join(data_dir, os.path.basename(INDEX_FILE))
+        self.vectors_file = os.path.join(data_dir, VECTORS_FILE_NAME)
         self.df_restaurants = None
         self.faiss_index = None
-        self.embedding_model = None
+        self.index_meta = {}
+        self.vectors = None
+        # NumPy column arrays used to materialize results (see artifacts.build_result_columns)
+        self.result_columns = None
+        # Inverted indexes and numeric columns backing structured filters
+        self.filter_index = None
+        # Precomputed rating/votes/cost terms for score fusion (see ranking.FusionRanker)
+        self.ranker = None
+        # BM25 index over names, cuisines, types and liked dishes (hybrid retrieval)
+        self.lexical_index = None
+        # Region shards searched instead of faiss_index when SEARCH_SHARDS is set (see shards.ShardSet)
+        self.shards = None
+        # Global row ids of the rows a shard node serves; every row structure (metadata,
+        # filters, lexical and chunk ids) is numbered by position in it. None: all rows.
+        self.served_ids = None
+        # Review and menu chunk vectors with their owning rows (see multivector.ChunkIndex)
+        self.chunk_index = None
+        self.embedding_model = embedding_model
         self.groq_client = None
+        self.async_groq_client = None
+        self.executor = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="rec-search")
+        self.batcher = None
+        if BATCH_MAX_SIZE > 1:
+            self.batcher = MicroBatcher(
+                self._search_batch, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_WINDOW_MS, name="rec-batcher"
+            )
+
+        self.embedding_cache = None
+        self.results_cache = None
+        self.analysis_cache = None
+        if CACHE_MAX_ENTRIES > 0:
+            # Embeddings depend only on the encoder (part of their key), so they never expire
+            self.embedding_cache = TieredCache(
+                "embeddings", max_size=CACHE_MAX_ENTRIES, disk_path=CACHE_DB_PATH, disk_max_size=CACHE_DISK_MAX_ENTRIES
+            )
+            self.results_cache = TieredCache(
+                "results", max_size=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, disk_path=CACHE_DB_PATH,
+                disk_max_size=CACHE_DISK_MAX_ENTRIES
+            )
+            self.analysis_cache = TieredCache(
+                "analyses", max_size=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, disk_path=CACHE_DB_PATH,
+                disk_max_size=CACHE_DISK_MAX_ENTRIES
+            )
+        self._overfetch_lock = threading.Lock()
+        self._overfetch_stats = {
+            "searches": 0, "requested": 0, "fetched": 0, "widened": 0, "extra_rounds": 0, "underfilled": 0
+        }
+        # Identifies the loaded index so cached result lists never outlive a re-ingest
+        self.artifact_version = None
+        self.load_seconds = None
         self.loaded = False
+        self._load_lock = threading.Lock()
 
     def load_resources(self):
         """Loads all necessary resources for recommendation."""
         if self.loaded:
             return
 
-        # Load Data
-        df_parts = []
-        for part_path in METADATA_PARTS:
-            if os.path.exists(part_path):
-                print(f"Loading metadata part from {part_path}...")
-                df_parts.append(pd.read_parquet(part_path))
+        # Executor threads may race to load on first use; only one should do the work.
+        with self._load_lock:
+            if not self.loaded:
+                self._load_resources()
+
+    def _load_resources(self):
+        started = time.perf_counter()
+
+        # Resolve the generation once, so metadata, vectors and index come from the same bundle
+        self.generation = current_generation(self.data_dir)
+        artifact_dir = generation_dir(self.data_dir, self.generation)
+        self.index_file = os.path.join(artifact_dir, os.path.basename(INDEX_FILE))
+        self.vectors_file = os.path.join(artifact_dir, VECTORS_FILE_NAME)
+
+        # A shard node holds only its served rows, renumbered 0..n-1 in global id order
+        if SEARCH_SHARDS:
+            self.shards = ShardSet.load(artifact_dir, SEARCH_SHARDS, mmap=ARTIFACT_MMAP)
+            if self.shards is None:
+                print("WARNING: Bundle has no shards; serving the monolithic index.")
             else:
-                print(f"WARNING: Metadata part {part_path} not found.")
-        
-        if df_parts:
-            self.df_restaurants = pd.concat(df_parts)
+                self.served_ids = self.shards.served_ids()
+                self.shards.localize(self.served_ids)
+
+        # Load Data
+        self.df_restaurants = load_metadata(artifact_dir, mmap=ARTIFACT_MMAP, rows=self.served_ids)
+        if self.df_restaurants is None:
+            print("ERROR: No metadata found. Please run ingest_data.py first.")
         else:
-            print("ERROR: No metadata parts found.")
+            self.result_columns = build_result_columns(self.df_restaurants)
+            self.filter_index = FilterIndex(self.df_restaurants)
+            self.ranker = FusionRanker(self.df_restaurants) if RANK_FUSION else None
+
+        # A sharded node searches its shards' own vectors and indexes, so skips the global ones
+        if self.shards is None and os.path.exists(self.vectors_file):
+            self.vectors = load_vectors(self.vectors_file, mmap=ARTIFACT_MMAP)
             
+        lexical_file = os.path.join(artifact_dir, LEXICAL_INDEX_FILE)
+        if RETRIEVAL_MODE == "hybrid":
+            if os.path.exists(lexical_file):
+                self.lexical_index = LexicalIndex.load(lexical_file)
+                if self.served_ids is not None:
+                    self.lexical_index = self.lexical_index.subset(self.served_ids)
+            else:
+                print("WARNING: Lexical index not found; hybrid retrieval disabled until the next ingest.")
+
+        if MULTI_VECTOR:
+            self.chunk_index = ChunkIndex.load(artifact_dir, mmap=ARTIFACT_MMAP)
+            if self.chunk_index is not None and self.served_ids is not None:
+                self.chunk_index.subset(self.served_ids)
+            if self.chunk_index is not None:
+                print(f"Loaded {self.chunk_index.ntotal} review/menu chunk vectors.")
+
         # Load Index
-        if os.path.exists(INDEX_FILE):
-            print(f"Loading FAISS index from {INDEX_FILE}...")
-            self.faiss_index = faiss.read_index(INDEX_FILE)
+        if self.shards is not None:
+            print(f"Serving {len(self.shards.shards)} shards by '{self.shards.column}' ({self.shards.ntotal} rows).")
+            self.artifact_version = self.generation or f"shards-{os.path.getmtime(artifact_dir):.0f}-{self.shards.ntotal}"
+        elif os.path.exists(self.index_file):
+            print(f"Loading FAISS index from {self.index_file}...")
+            self.faiss_index, self.index_meta = load_index(self.index_file, mmap=ARTIFACT_MMAP)
+            print(f"Loaded {self.index_meta['index_type']} index with search params {self.index_meta['search_params']}.")
+            self.artifact_version = self.generation or f"{os.path.getmtime(self.index_file):.0f}-{self.faiss_index.ntotal}"
         else:
             print("WARNING: FAISS index not found.")
 
         # Load Model
-        print(f"Loading embedding model {MODEL_NAME}...")
-        self.embedding_model = SentenceTransformer(MODEL_NAME)
+        if self.embedding_model is None:
+            print(f"Loading embedding model {MODEL_NAME} ({ENCODER_BACKEND})...")
+            try:
+                self.embedding_model = load_encoder(ENCODER_BACKEND)
+            except (FileNotFoundError, ImportError) as e:
+                if ENCODER_BACKEND == "torch":
+                    raise
+                print(f"WARNING: {ENCODER_BACKEND} encoder unavailable ({e}); falling back to torch.")
+                self.embedding_model = load_encoder("torch")
         
-        # Initialize Groq Client
-        api_key = os.getenv("GROQ_API_KEY")
-        if api_key:
-            self.groq_client = Groq(api_key=api_key)
-        else:
+        # Initialize Groq Client (shared, pooled gateways)
+        self.groq_client = get_groq_client()
+        self.async_groq_client = get_async_groq_client()
+        if self.groq_client is None:
             print("WARNING: GROQ_API_KEY not found.")
             
         self.loaded = True
+        self.load_seconds = time.perf_counter() - started
+        print(f"Recommendation service loaded in {self.load_seconds:.1f}s.")
 
-    def get_recommendations(self, query: str, top_k: int = 5):
+    def after_fork(self):
         """
-        Core recommendation logic.
-        Returns a dict with 'restaurants' list and 'ai_analysis' string.
+        Re-creates the per-process parts of a service that was loaded before os.fork():
+        worker threads, SQLite connections and LLM connection pools. The loaded
+        metadata, index and model stay shared with the parent (copy-on-write).
+        """
+        self.executor = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="rec-search")
+        if self.batcher is not None:
+            self.batcher = MicroBatcher(
+                self._search_batch, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_WINDOW_MS, name="rec-batcher"
+            )
+        for cache in (self.embedding_cache, self.results_cache, self.analysis_cache):
+            if cache is not None:
+                cache.after_fork()
+        if self.shards is not None:
+            self.shards.after_fork()
+        reset_gateways()
+        if self.loaded:
+            self.groq_client = get_groq_client()
+            self.async_groq_client = get_async_groq_client()
+
+    def load_successor(self):
+        """
+        Loads the data_dir's current generation into a new service that shares this
+        one's embedding model, caches, LLM clients and worker threads, and warms it up.
+        Nothing about this service changes, so it keeps serving in the meantime.
+        """
+        successor = RecommendationService(data_dir=self.data_dir, embedding_model=self.embedding_model)
+        successor.executor.shutdown(wait=False)
+        successor.executor = self.executor
+        # Embeddings only depend on the model; cached results are keyed by artifact_version
+        successor.embedding_cache = self.embedding_cache
+        successor.results_cache = self.results_cache
+        successor.analysis_cache = self.analysis_cache
+        successor.load_resources()
+        if successor.shards is not None and self.shards is not None:
+            # Bring up the regions this node has been serving before taking traffic
+            successor.shards.preload(self.shards.loaded_names())
+        if successor.is_ready():
+            successor.warm_up()
+        return successor
+
+    def warm_up(self):
+        """Pulls the index and vectors into memory with one search, so the first real request isn't a cold one."""
+        started = time.perf_counter()
+        if self.shards is not None:
+            for shard in self.shards.shards.values():
+                shard.warm_up()
+        else:
+            query = np.zeros((1, self.faiss_index.d), dtype='float32')
+            self.faiss_index.search(query, 1)
+        if self.chunk_index is not None:
+            self.chunk_index.index.search(np.zeros((1, self.chunk_index.index.d), dtype='float32'), 1)
+        if self.vectors is not None:
+            # Touches every page of the mapped matrix
+            float(np.asarray(self.vectors[:, 0], dtype='float32').sum())
+        print(f"Warmed up generation {self.generation} in {time.perf_counter() - started:.2f}s.")
+
+    def retire(self):
+        """
+        Drains a service that has been swapped out: searches already queued on its
+        micro-batcher finish, later ones from requests still holding it run inline,
+        and its artifacts are released when the last such request lets go of it.
+        """
+        if self.batcher is not None:
+            self.batcher.close()
+
+    def is_ready(self):
+        """True once metadata, index and embedding model are all loaded."""
+        return (
+            self.loaded
+            and self.df_restaurants is not None
+            and self._has_index()
+            and self.embedding_model is not None
+        )
+
+    def health(self):
+        """Readiness details shared by the API /health endpoint and the Streamlit app."""
+        return {
+            "ready": self.is_ready(),
+            "data_loaded": self.df_restaurants is not None,
+            "index_loaded": self._has_index(),
+            "model_loaded": self.embedding_model is not None,
+            "llm_configured": self.groq_client is not None,
+            "restaurants": 0 if self.df_restaurants is None else len(self.df_restaurants),
+            "index_type": self.index_meta.get("index_type"),
+            "rerank": self.index_meta.get("rerank", 0),
+            "generation": self.generation,
+            "ranking": self.ranker.weights if self.ranker is not None else None,
+            "retrieval": "hybrid" if self._hybrid_enabled() else "vector",
+            "shards": self.shards.stats() if self.shards is not None else None,
+            "chunk_vectors": self.chunk_index.ntotal if self.chunk_index is not None else 0,
+            "encoder": getattr(self.embedding_model, "backend", None),
+            "load_seconds": None if self.load_seconds is None else round(self.load_seconds, 3),
+        }
+
+    def search_restaurants(self, query: str, top_k: int = 5, filters: Optional[dict] = None):
+        """
+        Retrieval half of the pipeline: query encoding, vector search and deduplication.
+        Optional structured filters (location, rest_type, max_cost, min_rating) restrict
+        the search to matching rows before ranking.
+        Returns a list of restaurant dicts, or None if the artifacts are missing.
         """
         if not self.loaded:
             self.load_resources()
             
-        if self.df_restaurants is None or self.faiss_index is None:
-            return {"error": "System not initialized. Data missing."}
+        if self.df_restaurants is None or not self._has_index():
+            return None
         
+        filters = normalize_filters(filters)
+        results_key, cached = self._get_cached_results(query, top_k, filters)
+        if cached is not None:
+            return cached
+
         # 1. Vector Search
         # Fetch more candidates to allow for deduplication
-        search_k = top_k * 3
-        query_vector = self.embedding_model.encode([query]).astype('float32')
-        distances, indices = self.faiss_index.search(query_vector, search_k)
-        
-        # 2. Retrieve Restaurants
-        results = []
-        seen_names = set()
-        
-        for idx in indices[0]:
-            if idx < 0 or idx >= len(self.df_restaurants):
-                continue
-            
-            row = self.df_restaurants.iloc[idx]
-            
-            # Handle potential missing keys safely
-            name = row.get('name', 'Unknown')
-            
-            # Deduplication check
-            if name in seen_names:
-                continue
-            seen_names.add(name)
-            
-            if len(results) >= top_k:
-                break
-
-            cuisine = row.get('cuisines', 'Unknown')
-            location = row.get('location', 'Unknown')
-            rating = str(row.get('rate', 'N/A'))
-            cost = str(row.get('approx_cost(for_two_people)', 'N/A'))
-            url = row.get('url', None)
-            
-            restaurant_data = {
-                "name": name,
-                "cuisine": cuisine,
-                "location": location,
-                "rating": rating,
-                "cost": cost,
-                "url": url
-            }
-            results.append(restaurant_data)
-        
+        selection = self._select(filters)
+        search_k = self._initial_search_k(top_k)
+        distances, indices = self._search_vectors(query, search_k, selection)
+
+        # 2. Re-rank, then retrieve restaurants, widening the search if duplicates ate the window
+        results = self._fill_results(query, top_k, search_k, distances, indices, selection, filters)
+        self._set_cached_results(results_key, results)
+        return results
+
+    def _get_cached_results(self, query, top_k, filters=None):
+        """Returns (key, results) for a (query, top_k, filters) triple; results is None on a miss."""
+        if self.results_cache is None:
+            return None, None
+        key = make_key(
+            self.artifact_version, self._hybrid_enabled(), top_k, normalize_query(query),
+            sorted((filters or {}).items())
+        )
+        cached = self.results_cache.get(key)
+        # Hand out copies so callers can't mutate the cached entries
+        return key, [dict(r) for r in cached] if cached is not None else None
+
+    def _set_cached_results(self, key, results):
+        if self.results_cache is not None:
+            self.results_cache.set(key, [dict(r) for r in results])
+
+    def _encode(self, queries):
+        """Encodes queries, reusing cached embeddings of previously seen normalized queries."""
+        if self.embedding_cache is None:
+            with span("encode"):
+                return self.embedding_model.encode(queries).astype('float32')
+
+        # Vectors from different models or backends live in different spaces, so the encoder is part of the key
+        encoder = getattr(self.embedding_model, "name", type(self.embedding_model).__name__)
+        texts = [normalize_query(q) for q in queries]
+        keys = [make_key(encoder, text) for text in texts]
+        vectors = [self.embedding_cache.get(key) for key in keys]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            with span("encode"):
+                encoded = self.embedding_model.encode([texts[i] for i in missing]).astype('float32')
+            for i, vector in zip(missing, encoded):
+                self.embedding_cache.set(keys[i], vector)
+                vectors[i] = vector
+        return np.vstack(vectors)
+
+    def _has_index(self):
+        return self.faiss_index is not None or self.shards is not None
+
+    def _ntotal(self):
+        return self.shards.ntotal if self.shards is not None else self.faiss_index.ntotal
+
+    def _encode_and_search(self, queries, k):
+        """Encodes a list of queries and searches them as a single matrix."""
+        return self._search_matrix(self._encode(queries), k)
+
+    def _search_matrix(self, query_vectors, k):
+        """Searches encoded queries in the index, or fans them out across the served shards."""
+        with span("faiss_search"):
+            if self.shards is not None:
+                hits = self.shards.search(query_vectors, k)
+            else:
+                hits = search_reranked(self.faiss_index, self.vectors, query_vectors, k, self._rerank_factor())
+        return self._add_chunk_hits(query_vectors, k, hits)
+
+    def _add_chunk_hits(self, query_vectors, k, hits, mask=None):
+        """Merges restaurant-level hits with the nearest review/menu chunks, scoring each restaurant by its best match."""
+        if self.chunk_index is None:
+            return hits
+        with span("chunk_search"):
+            chunk_hits = self.chunk_index.search(query_vectors, k, mask)
+        return max_sim([hits, chunk_hits], k, len(query_vectors))
+
+    def _rerank_factor(self):
+        """Shortlist multiple re-ranked exactly; needs the raw vectors, 0 without them."""
+        return self.index_meta.get("rerank", 0) if self.vectors is not None else 0
+
+    def _search_batch(self, requests):
+        """MicroBatcher callback: requests is a list of (query, k) tuples."""
+        queries = [query for query, _ in requests]
+        max_k = max(k for _, k in requests)
+        distances, indices = self._encode_and_search(queries, max_k)
+        # FAISS returns neighbours sorted by distance, so each caller's top-k is a prefix
+        return [(distances[i:i + 1, :k], indices[i:i + 1, :k]) for i, (_, k) in enumerate(requests)]
+
+    def _search_vectors(self, query, k, selection=None):
+        """
+        Searches a single query. Unfiltered queries coalesce with concurrent callers when
+        batching is enabled; filtered ones search only the selected rows.
+        """
+        if selection is not None:
+            return self._search_filtered(query, k, selection)
+        if self.batcher is not None:
+            return self.batcher((query, k))
+        return self._encode_and_search([query], k)
+
+    def _select(self, filters):
+        """Resolves structured filters to a FilterSelection (None when unfiltered)."""
+        if not filters:
+            return None
+        if self.filter_index is None:
+            self.filter_index = FilterIndex(self.df_restaurants)
+        with span("filter"):
+            return self.filter_index.select(filters)
+
+    def _search_filtered(self, query, k, selection):
+        """
+        Searches only the rows in the selection. Small selections, and any selection on
+        indexes that can't take an IDSelector, are scanned exactly from the raw vectors;
+        larger ones go through a FAISS IDSelector.
+        """
+        k = min(k, selection.count)
+        if k == 0:
+            return np.empty((1, 0), dtype='float32'), np.empty((1, 0), dtype=np.int64)
+        query_vectors = self._encode([query])
+        with span("faiss_search"):
+            if self.shards is not None:
+                # Only shards holding selected rows (e.g. the filtered location's regions) are searched
+                hits = self.shards.search(query_vectors, k, selection.mask)
+            elif self.vectors is not None and (
+                selection.count <= FILTER_EXACT_MAX_ROWS or not supports_selector(self.index_meta)
+            ):
+                hits = search_subset(self.vectors, selection.ids, query_vectors, k)
+            else:
+                hits = search_selected(
+                    self.faiss_index, query_vectors, k, selection.mask, vectors=self.vectors,
+                    rerank=self._rerank_factor()
+                )
+        return self._add_chunk_hits(query_vectors, k, hits, selection.mask)
+
+    def _initial_search_k(self, top_k):
+        return max(top_k, int(np.ceil(top_k * OVERFETCH_FACTOR)))
+
+    def _rank(self, query, distances, indices, filters=None):
+        """Re-orders a shortlist by score fusion (see ranking.FusionRanker); unchanged when RANK_FUSION=0."""
+        if not RANK_FUSION or indices.shape[1] < 2:
+            return indices
+        if self.ranker is None:
+            self.ranker = FusionRanker(self.df_restaurants)
+        budget = (filters or {}).get("max_cost") or budget_from_query(query)
+        with span("rank"):
+            return self.ranker.rank(distances, indices, budget)[1]
+
+    def _candidates(self, query, distances, indices, selection=None, filters=None):
+        """Final candidate order: score fusion over the vector shortlist, then lexical fusion."""
+        return self._fuse_lexical(query, self._rank(query, distances, indices, filters), selection)
+
+    def _hybrid_enabled(self):
+        return RETRIEVAL_MODE == "hybrid" and self.lexical_index is not None
+
+    def _fuse_lexical(self, query, indices, selection=None):
+        """Merges the (ranked) vector shortlist with the BM25 top list by reciprocal rank fusion."""
+        if not self._hybrid_enabled():
+            return indices
+        with span("lexical"):
+            lexical_ids = self.lexical_index.search(
+                query, indices.shape[1], mask=None if selection is None else selection.mask
+            )
+        if len(lexical_ids) == 0:
+            return indices
+        return reciprocal_rank_fusion([indices[0], lexical_ids], k=RRF_K, weights=[1.0, RRF_LEXICAL_WEIGHT])[None, :]
+
+    def _fill_results(self, query, top_k, search_k, distances, indices, selection=None, filters=None):
+        """
+        Ranks and materializes hits and, while chains fill the window with duplicates,
+        widens the search until top_k distinct restaurants are found or the index is exhausted.
+        """
+        results = self._materialize(self._candidates(query, distances, indices, selection, filters), top_k)
+        rounds = 1
+        ntotal = self._ntotal() if selection is None else selection.count
+        while len(results) < top_k and search_k < ntotal and rounds < OVERFETCH_MAX_ROUNDS:
+            search_k = min(search_k * OVERFETCH_GROWTH, ntotal)
+            distances, indices = self._search_vectors(query, search_k, selection)
+            results = self._materialize(self._candidates(query, distances, indices, selection, filters), top_k)
+            rounds += 1
+
+        with self._overfetch_lock:
+            stats = self._overfetch_stats
+            stats["searches"] += 1
+            stats["requested"] += top_k
+            stats["fetched"] += search_k
+            stats["widened"] += rounds > 1
+            stats["extra_rounds"] += rounds - 1
+            stats["underfilled"] += len(results) < top_k
+        return results
+
+    def get_overfetch_stats(self):
+        """How often deduplication forced a wider search; use it to tune OVERFETCH_FACTOR."""
+        with self._overfetch_lock:
+            stats = dict(self._overfetch_stats)
+        searches = stats["searches"]
+        stats["factor"] = OVERFETCH_FACTOR
+        stats["widened_ratio"] = round(stats["widened"] / searches, 4) if searches else 0.0
+        stats["mean_fetched_per_result"] = round(stats["fetched"] / stats["requested"], 3) if searches else 0.0
+        return stats
+
+    def _materialize(self, indices, top_k):
+        """Turns FAISS row ids into deduplicated restaurant dicts."""
+        if self.result_columns is None:
+            self.result_columns = build_result_columns(self.df_restaurants)
+        with span("materialize"):
+            return materialize_results(self.result_columns, indices[0], top_k)
+
+    def _analysis_key(self, query, results):
+        return make_key(normalize_query(query), *[r.get("url") or r.get("name") for r in results])
+
+    def _get_cached_analysis(self, query, results):
+        if self.analysis_cache is None:
+            return None, None
+        key = self._analysis_key(query, results)
+        return key, self.analysis_cache.get(key)
+
+    def _set_cached_analysis(self, key, analysis):
+        # Don't pin failures or fallback summaries; the next request should retry the LLM
+        if self.analysis_cache is None or analysis.startswith(
+            ("Error generating analysis", "Analysis unavailable", FALLBACK_PREFIX)
+        ):
+            return
+        self.analysis_cache.set(key, analysis)
+
+    def get_cache_stats(self):
+        """Size, hit/miss and eviction counters of every cache tier."""
+        caches = {"embeddings": self.embedding_cache, "results": self.results_cache, "analyses": self.analysis_cache}
+        return {name: cache.stats() for name, cache in caches.items() if cache is not None}
+
+    def get_llm_stats(self):
+        """
+        Call, retry, hedge and circuit-breaker state of the LLM gateway, plus per-call
+        token and latency usage (see metrics.LLMUsageStats) for tuning the prompt budgets.
+        """
+        usage = LLM_USAGE.stats()
+        if not hasattr(self.groq_client, "stats"):
+            return {"enabled": False, "usage": usage}
+        return {"enabled": True, **self.groq_client.stats(), "usage": usage}
+
+    def get_batching_stats(self):
+        """Batch size and queueing delay metrics of the query micro-batcher."""
+        if self.batcher is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.batcher.stats()}
+
+    def get_recommendations(self, query: str, top_k: int = 5, filters: Optional[dict] = None):
+        """
+        Core recommendation logic.
+        Returns a dict with 'restaurants' list and 'ai_analysis' string.
+        """
+        with span("retrieval"):
+            results = self.search_restaurants(query, top_k, filters)
+        if results is None:
+            return {"error": "System not initialized. Data missing."}
+
         # 3. LLM Generation
-        ai_analysis = generate_restaurant_analysis(query, results, client=self.groq_client)
+        ai_analysis = self._analyze(query, results, filters)
                 
         return {"restaurants": results, "ai_analysis": ai_analysis}
 
-# Singleton instance cached for Streamlit
-@st.cache_resource
-def get_rec_service():
-    service = RecommendationService()
-    service.load_resources()
+    async def aget_recommendations(self, query: str, top_k: int = 5, filters: Optional[dict] = None):
+        """
+        Async variant of get_recommendations for the API.
+        Encoding and search run on the micro-batcher or the bounded executor; the LLM call uses the async client.
+        """
+        with span("retrieval"):
+            results = await self.asearch_restaurants(query, top_k, filters)
+        if results is None:
+            return {"error": "System not initialized. Data missing."}
+
+        ai_analysis = await self._aanalyze(query, results, filters)
+
+        return {"restaurants": results, "ai_analysis": ai_analysis}
+
+    async def asearch_restaurants(self, query: str, top_k: int = 5, filters: Optional[dict] = None):
+        """Async variant of search_restaurants that keeps CPU work off the event loop."""
+        if not self.loaded:
+            await self._run_in_executor(self.load_resources)
+
+        if self.df_restaurants is None or not self._has_index():
+            return None
+
+        filters = normalize_filters(filters)
+        results_key, results = self._get_cached_results(query, top_k, filters)
+        if results is None:
+            search_k = self._initial_search_k(top_k)
+            selection = self._select(filters)
+            if selection is None and self.batcher is not None:
+                # Wait on the batcher's future directly instead of parking an executor thread
+                distances, indices = await asyncio.wrap_future(self.batcher.submit((query, search_k)))
+            else:
+                distances, indices = await self._run_in_executor(self._search_vectors, query, search_k, selection)
+            results = await self._run_in_executor(
+                self._fill_results, query, top_k, search_k, distances, indices, selection, filters
+            )
+            self._set_cached_results(results_key, results)
+        return results
+
+    def search_restaurants_batch(self, queries: List[str], top_k: int = 5, filters: Optional[dict] = None):
+        """
+        Bulk variant of search_restaurants: cache misses are encoded as one matrix and,
+        when unfiltered, searched with a single FAISS call. The same filters apply to
+        every query. Returns one result list per query, or None if the artifacts are missing.
+        """
+        if not self.loaded:
+            self.load_resources()
+
+        if self.df_restaurants is None or not self._has_index():
+            return None
+
+        filters = normalize_filters(filters)
+        results = [None] * len(queries)
+        keys = [None] * len(queries)
+        for i, query in enumerate(queries):
+            keys[i], results[i] = self._get_cached_results(query, top_k, filters)
+        misses = [i for i, cached in enumerate(results) if cached is None]
+        if not misses:
+            return results
+
+        selection = self._select(filters)
+        search_k = self._initial_search_k(top_k)
+        # Warms the embedding cache for the filtered path, which searches per query
+        query_vectors = self._encode([queries[i] for i in misses])
+        if selection is None:
+            distances, indices = self._search_matrix(query_vectors, search_k)
+        for row, i in enumerate(misses):
+            if selection is None:
+                dists, hits = distances[row:row + 1], indices[row:row + 1]
+            else:
+                dists, hits = self._search_filtered(queries[i], search_k, selection)
+            results[i] = self._fill_results(queries[i], top_k, search_k, dists, hits, selection, filters)
+            self._set_cached_results(keys[i], results[i])
+        return results
+
+    def iter_recommendations_batch(self, queries: List[str], top_k: int = 5, filters: Optional[dict] = None,
+                                   analysis: bool = False, concurrency: int = BULK_LLM_CONCURRENCY):
+        """
+        Yields {"index", "query", "restaurants"[, "ai_analysis"]} for each query, in input
+        order. Retrieval runs BULK_CHUNK_SIZE queries at a time; with analysis=True the LLM
+        calls of a chunk run on `concurrency` threads. Yields {"error": ...} once if the
+        artifacts are missing.
+        """
+        llm_pool = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="rec-bulk-llm") \
+            if analysis else None
+        try:
+            for start in range(0, len(queries), BULK_CHUNK_SIZE):
+                chunk = queries[start:start + BULK_CHUNK_SIZE]
+                with span("retrieval"):
+                    chunk_results = self.search_restaurants_batch(chunk, top_k, filters)
+                if chunk_results is None:
+                    yield {"error": "System not initialized. Data missing."}
+                    return
+                analyses = llm_pool.map(lambda args: self._analyze(*args, filters), zip(chunk, chunk_results)) \
+                    if llm_pool is not None else None
+                for offset, (query, results) in enumerate(zip(chunk, chunk_results)):
+                    item = {"index": start + offset, "query": query, "restaurants": results}
+                    if analyses is not None:
+                        item["ai_analysis"] = next(analyses)
+                    yield item
+        finally:
+            if llm_pool is not None:
+                llm_pool.shutdown(wait=False, cancel_futures=True)
+
+    async def aiter_recommendations_batch(self, queries: List[str], top_k: int = 5, filters: Optional[dict] = None,
+                                          analysis: bool = False, concurrency: int = BULK_LLM_CONCURRENCY):
+        """
+        Async variant of iter_recommendations_batch for the API. Retrieval runs on the
+        executor; with analysis=True at most `concurrency` LLM calls are in flight, and
+        items are yielded as they complete (use "index" to restore input order).
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def analyze(item):
+            async with semaphore:
+                item["ai_analysis"] = await self._aanalyze(item["query"], item["restaurants"], filters)
+            return item
+
+        for start in range(0, len(queries), BULK_CHUNK_SIZE):
+            chunk = queries[start:start + BULK_CHUNK_SIZE]
+            with span("retrieval"):
+                chunk_results = await self._run_in_executor(self.search_restaurants_batch, chunk, top_k, filters)
+            if chunk_results is None:
+                yield {"error": "System not initialized. Data missing."}
+                return
+            items = [
+                {"index": start + offset, "query": query, "restaurants": results}
+                for offset, (query, results) in enumerate(zip(chunk, chunk_results))
+            ]
+            if not analysis:
+                for item in items:
+                    yield item
+                continue
+            for next_item in asyncio.as_completed([analyze(item) for item in items]):
+                yield await next_item
+
+    def _analyze(self, query, results, filters=None):
+        """LLM analysis of one result list, through the analysis cache."""
+        llm_query = describe_query(query, filters)
+        analysis_key, ai_analysis = self._get_cached_analysis(llm_query, results)
+        if ai_analysis is None:
+            ai_analysis = generate_restaurant_analysis(llm_query, results, client=self.groq_client)
+            self._set_cached_analysis(analysis_key, ai_analysis)
+        return ai_analysis
+
+    async def _aanalyze(self, query, results, filters=None):
+        """Async variant of _analyze."""
+        llm_query = describe_query(query, filters)
+        analysis_key, ai_analysis = self._get_cached_analysis(llm_query, results)
+        if ai_analysis is None:
+            ai_analysis = await agenerate_restaurant_analysis(llm_query, results, client=self.async_groq_client)
+            self._set_cached_analysis(analysis_key, ai_analysis)
+        return ai_analysis
+
+    def _run_in_executor(self, fn, *args):
+        """Runs fn on the search executor, carrying the caller's context (request timing spans)."""
+        context = contextvars.copy_context()
+        return asyncio.get_running_loop().run_in_executor(self.executor, functools.partial(context.run, fn, *args))
+
+    def stream_recommendations(self, query: str, top_k: int = 5, filters: Optional[dict] = None):
+        """
+        Streaming variant of get_recommendations.
+        Yields ("restaurants", list) as soon as retrieval is done, then ("token", str)
+        chunks of the analysis, then ("done", full_analysis). Yields ("error", message)
+        instead if the artifacts are missing.
+        """
+        with span("retrieval"):
+            results = self.search_restaurants(query, top_k, filters)
+        if results is None:
+            yield "error", "System not initialized. Data missing."
+            return
+        yield "restaurants", results
+
+        llm_query = describe_query(query, filters)
+        analysis_key, ai_analysis = self._get_cached_analysis(llm_query, results)
+        if ai_analysis is not None:
+            yield "token", ai_analysis
+        else:
+            chunks = []
+            for text in stream_restaurant_analysis(llm_query, results, client=self.groq_client):
+                chunks.append(text)
+                yield "token", text
+            ai_analysis = "".join(chunks)
+            self._set_cached_analysis(analysis_key, ai_analysis)
+        yield "done", ai_analysis
+
+    async def astream_recommendations(self, query: str, top_k: int = 5, filters: Optional[dict] = None):
+        """Async variant of stream_recommendations, yielding the same events."""
+        with span("retrieval"):
+            results = await self.asearch_restaurants(query, top_k, filters)
+        if results is None:
+            yield "error", "System not initialized. Data missing."
+            return
+        yield "restaurants", results
+
+        llm_query = describe_query(query, filters)
+        analysis_key, ai_analysis = self._get_cached_analysis(llm_query, results)
+        if ai_analysis is not None:
+            yield "token", ai_analysis
+        else:
+            chunks = []
+            async for text in astream_restaurant_analysis(llm_query, results, client=self.async_groq_client):
+                chunks.append(text)
+                yield "token", text
+            ai_analysis = "".join(chunks)
+            self._set_cached_analysis(analysis_key, ai_analysis)
+        yield "done", ai_analysis
+
+# One service (and one copy of every artifact) per process, shared by the
+# FastAPI app, the Streamlit app and any other caller.
+_rec_service = None
+_rec_service_lock = threading.Lock()
+
+def get_rec_service(load=True):
+    """
+    Returns the process-wide RecommendationService. Nothing is built at import time:
+    the service is created on first call and, unless load=False, its artifacts are
+    loaded before returning.
+    """
+    global _rec_service
+    if _rec_service is None:
+        with _rec_service_lock:
+            if _rec_service is None:
+                _rec_service = RecommendationService()
+    if load:
+        _rec_service.load_resources()
+    return _rec_service
+
+def warm_up_in_background():
+    """
+    Returns the process-wide service immediately and loads its artifacts on a daemon
+    thread. Callers check `service.loaded` (or is_ready()) before serving.
+    """
+    service = get_rec_service(load=False)
+
+    def warm_up():
+        try:
+            service.load_resources()
+        except Exception as e:
+            print(f"ERROR: Background warm-up failed: {e}")
+
+    threading.Thread(target=warm_up, name="rec-warmup", daemon=True).start()
     return service
 
-rec_service = get_rec_service()
+_reload_lock = threading.Lock()
+_watcher = None
+
+def reload_rec_service(force=False):
+    """
+    Swaps in the data_dir's current generation without a restart: it is loaded and
+    warmed beside the serving service, the process-wide reference is switched in one
+    assignment, and the old service is retired (see RecommendationService.retire).
+
+    Args:
+        force (bool): Reload even if CURRENT still names the serving generation
+            (e.g. for the unversioned layout, which has no generation names).
+
+    Returns:
+        tuple: (service now serving, whether a swap happened)
+    """
+    global _rec_service
+    with _reload_lock:
+        current = get_rec_service(load=False)
+        if not current.loaded:
+            # Still starting up; the first load picks up the newest generation anyway
+            return current, False
+        if not force and current_generation(current.data_dir) == current.generation:
+            return current, False
+
+        successor = current.load_successor()
+        if not successor.is_ready():
+            print(f"WARNING: Generation {successor.generation} failed to load; still serving {current.generation}.")
+            return current, False
+        _rec_service = successor
+        current.retire()
+        print(f"Swapped generation {current.generation} for {successor.generation}.")
+        return successor, True
+
+def watch_artifacts(interval=ARTIFACT_WATCH_SECONDS, on_swap=None):
+    """
+    Starts (once per process) a daemon thread that reloads whenever a new generation
+    is published. on_swap(service) is called after each swap.
+    """
+    global _watcher
+
+    def watch():
+        while True:
+            time.sleep(interval)
+            try:
+                service, swapped = reload_rec_service()
+                if swapped and on_swap is not None:
+                    on_swap(service)
+            except Exception as e:
+                print(f"ERROR: Artifact reload failed: {e}")
+
+    with _reload_lock:
+        if _watcher is None and interval > 0:
+            _watcher = threading.Thread(target=watch, name="rec-artifact-watch", daemon=True)
+            _watcher.start()
+    return _watcher
@@ -0,0 +1,58 @@
+import sys
+import json
+import argparse
+from backend.benchmark import make_queries, percentiles, time_calls
+from backend.utils.encoders import (
+    MODEL_NAME, ONNX_MODEL_DIR, ENCODER_THREADS, PARITY_MIN_COSINE,
+    TorchEncoder, OnnxEncoder, export_onnx, parity_check
+)
+
+# Queries used for the parity check and the per-query latency comparison
+DEFAULT_SAMPLES = 200
+
+
+def compare_encoders(model_dir=ONNX_MODEL_DIR, model_name=MODEL_NAME, quantized=False, threads=ENCODER_THREADS,
+                     samples=DEFAULT_SAMPLES, min_cosine=PARITY_MIN_COSINE):
+    """
+    Checks the exported ONNX model against the PyTorch model and times single-query encodes.
+
+    Returns:
+        dict: {"parity": parity_check(...), "torch": latency summary, "onnx": latency summary}
+    """
+    texts = make_queries(samples)
+    reference = TorchEncoder(model_name, threads=threads)
+    candidate = OnnxEncoder(model_dir, quantized=quantized, threads=threads)
+    calls = [([text],) for text in texts]
+    return {
+        "parity": parity_check(reference, candidate, texts, min_cosine=min_cosine),
+        "torch": percentiles(time_calls(reference.encode, calls)),
+        "onnx": percentiles(time_calls(candidate.encode, calls)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the query encoder to ONNX and check it against PyTorch")
+    parser.add_argument("--model-dir", default=ONNX_MODEL_DIR, help="Where to write the ONNX model and tokenizer")
+    parser.add_argument("--quantize", action="store_true", help="Also write a dynamically int8-quantized model")
+    parser.add_argument("--threads", type=int, default=ENCODER_THREADS, help="Intra-op threads (0 = all cores)")
+    parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES, help="Queries used for the parity check")
+    parser.add_argument("--min-cosine", type=float, default=PARITY_MIN_COSINE, help="Lowest acceptable cosine similarity")
+    parser.add_argument("--skip-check", action="store_true", help="Export only")
+    args = parser.parse_args()
+
+    export_onnx(args.model_dir, quantize=args.quantize)
+    if args.skip_check:
+        sys.exit(0)
+
+    failed = False
+    for quantized in ([False, True] if args.quantize else [False]):
+        report = compare_encoders(
+            args.model_dir, quantized=quantized, threads=args.threads, samples=args.samples, min_cosine=args.min_cosine
+        )
+        print(f"\n{'int8' if quantized else 'fp32'} ONNX vs PyTorch:")
+        print(json.dumps(report, indent=2))
+        failed = failed or not report["parity"]["passed"]
+
+    if failed:
+        print(f"\nParity check failed: some embeddings fell below cosine {args.min_cosine}.")
+        sys.exit(1)
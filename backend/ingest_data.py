@@ -1,19 +1,53 @@
 import os
+import glob
+import json
+import shutil
+import argparse
 import pandas as pd
-import faiss
 import numpy as np
-import pickle
-from datasets import load_dataset
-from sentence_transformers import SentenceTransformer
+from backend.utils.vector_index import (
+    INDEX_TYPES, build_index, save_index, load_index, read_index_meta, apply_search_params, recall_latency_report,
+    format_report
+)
+from backend.utils.features import add_numeric_features
+from backend.utils.lexical import LexicalIndex, LEXICAL_INDEX_FILE
+from backend.utils.shards import write_shards, shards_dir, SHARD_COLUMN, SHARDS_DIR
+from backend.utils.multivector import (
+    iter_chunks, build_chunk_index, CHUNK_VECTORS_FILE, CHUNK_OWNERS_FILE, CHUNK_HASHES_FILE, CHUNK_INDEX_FILE,
+    CHUNK_INDEX_TYPE, CHUNK_BLOCK_SIZE
+)
+from backend.utils.artifacts import (
+    write_metadata_table, write_vectors, load_metadata_table, load_vectors, slim_metadata,
+    generation_dir, new_generation, publish_generation, prune_generations,
+    METADATA_TABLE_FILE, VECTORS_FILE as VECTORS_FILE_NAME
+)
 
 # Constants
 DATASET_NAME = "ManikaSaini/zomato-restaurant-recommendation"
 MODEL_NAME = "all-MiniLM-L6-v2"
 DATA_DIR = "backend/data"
-METADATA_FILE = os.path.join(DATA_DIR, "restaurants.pkl")
+METADATA_FILE = os.path.join(DATA_DIR, METADATA_TABLE_FILE)
+VECTORS_FILE = os.path.join(DATA_DIR, VECTORS_FILE_NAME)
 INDEX_FILE = os.path.join(DATA_DIR, "faiss_index.bin")
+REPORT_FILE = os.path.join(DATA_DIR, "index_report.json")
+INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+
+# Embedding pipeline settings
+CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "4096"))   # rows embedded (and checkpointed) per chunk
+BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))     # encoder batch size
+ENCODE_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))     # >1 starts a multi-process encoding pool
+CHECKPOINT_DIRNAME = ".ingest_checkpoint"
+# Storage type of vectors.npy (used for exact re-ranking and filtered scans); float16 halves it
+VECTORS_DTYPE = os.getenv("VECTORS_DTYPE", "float32")
+# Also embed review and menu chunks as extra vectors per restaurant (see multivector.py)
+MULTI_VECTOR = os.getenv("INGEST_MULTI_VECTOR", "0") == "1"
+
+TEXT_COLUMNS = ['name', 'cuisines', 'location', 'rest_type']
+
+def load_restaurants():
+    """Downloads the dataset and applies basic cleaning. Returns None on failure."""
+    from datasets import load_dataset
 
-def ingest_data():
     print(f"Loading dataset from {DATASET_NAME}...")
     try:
         dataset = load_dataset(DATASET_NAME, split="train")
@@ -21,59 +55,414 @@ def ingest_data():
         print(f"Loaded {len(df)} records.")
     except Exception as e:
         print(f"Error loading dataset: {e}")
-        return
+        return None
 
     # Basic cleaning
     print("Cleaning data...")
     # Inspect columns
     print("Columns:", df.columns.tolist())
-    
-    # Fill NaN values for critical columns
-    # Adjust column names based on actual dataset if needed, assuming standard names for now based on typical Zomato datasets
+
     # Typical columns: 'name', 'address', 'rate', 'votes', 'phone', 'location', 'rest_type', 'dish_liked', 'cuisines', 'approx_cost(for two people)', 'reviews_list', 'menu_item', 'listed_in(type)', 'listed_in(city)'
-    
     # Standardize column names if needed
     df.columns = [c.lower().replace(' ', '_') for c in df.columns]
-    
-    text_columns = ['name', 'cuisines', 'location', 'rest_type']
-    for col in text_columns:
-        if col in df.columns:
-            df[col] = df[col].fillna('')
-    
-    # Create a combined text field for embedding
+    return df
+
+def build_combined_text(df):
+    """
+    Builds the text embedded for each restaurant with vectorized string concatenation:
+    "Name: [name]. Cuisine: [cuisine]. Location: [location]. Type: [type]"
+    """
     # We want to search by Cuisines, Location, and Name primarily.
     # Reviews could be useful but might be too long/noisy for basic retrieval.
-    
+    def column(name):
+        if name not in df.columns:
+            return pd.Series("", index=df.index, dtype="string")
+        return df[name].astype("string").fillna("")
+
+    return (
+        "Name: " + column('name')
+        + ". Cuisine: " + column('cuisines')
+        + ". Location: " + column('location')
+        + ". Type: " + column('rest_type')
+    )
+
+def hash_texts(texts):
+    """Stable 64-bit hash per text, used to detect new or changed restaurants between runs."""
+    return pd.util.hash_pandas_object(pd.Series(texts, dtype="string"), index=False).to_numpy(dtype=np.uint64)
+
+def lookup_hashes(known_hashes, hashes):
+    """Returns, for each hash, the position of a matching row in known_hashes, or -1."""
+    if len(known_hashes) == 0:
+        return np.full(len(hashes), -1, dtype=np.int64)
+    order = np.argsort(known_hashes, kind='stable')
+    sorted_hashes = known_hashes[order]
+    positions = np.searchsorted(sorted_hashes, hashes)
+    clipped = np.minimum(positions, len(sorted_hashes) - 1)
+    found = sorted_hashes[clipped] == hashes
+    return np.where(found, order[clipped], -1)
+
+def load_previous_artifacts(data_dir):
+    """Returns (text_hashes, vectors) from the last successful run, or empty arrays."""
+    data_dir = generation_dir(data_dir)
+    metadata_file = os.path.join(data_dir, METADATA_TABLE_FILE)
+    vectors_file = os.path.join(data_dir, VECTORS_FILE_NAME)
+    if not (os.path.exists(metadata_file) and os.path.exists(vectors_file)):
+        return np.empty(0, dtype=np.uint64), None
+
+    table = load_metadata_table(metadata_file)
+    if "text_hash" in table.column_names:
+        hashes = table.column("text_hash").to_numpy().astype(np.uint64)
+    elif "combined_text" in table.column_names:
+        hashes = hash_texts(table.column("combined_text").to_pandas())
+    else:
+        return np.empty(0, dtype=np.uint64), None
+
+    vectors = load_vectors(vectors_file)
+    if len(vectors) != len(hashes):
+        print("WARNING: Previous vectors don't match previous metadata; re-embedding everything.")
+        return np.empty(0, dtype=np.uint64), None
+    return hashes, vectors
+
+def load_checkpoint(checkpoint_dir):
+    """Returns (hashes, vectors) embedded by an interrupted run, so it can resume."""
+    hashes, vectors = [], []
+    for path in sorted(glob.glob(os.path.join(checkpoint_dir, "chunk_*.npz"))):
+        with np.load(path) as chunk:
+            hashes.append(chunk["hashes"])
+            vectors.append(chunk["vectors"])
+    if not hashes:
+        return np.empty(0, dtype=np.uint64), None
+    return np.concatenate(hashes), np.concatenate(vectors)
+
+def embed_in_chunks(model, texts, hashes, checkpoint_dir, chunk_size=CHUNK_SIZE, batch_size=BATCH_SIZE, pool=None):
+    """
+    Embeds texts chunk by chunk, saving each finished chunk to checkpoint_dir so an
+    interrupted run only redoes the chunk it was working on.
+    """
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    first_chunk = len(glob.glob(os.path.join(checkpoint_dir, "chunk_*.npz")))
+    for n, start in enumerate(range(0, len(texts), chunk_size)):
+        chunk_texts = texts[start:start + chunk_size]
+        if pool is not None:
+            vectors = model.encode(chunk_texts, batch_size=batch_size, pool=pool)
+        else:
+            vectors = model.encode(chunk_texts, batch_size=batch_size)
+        path = os.path.join(checkpoint_dir, f"chunk_{first_chunk + n:05d}.npz")
+        np.savez(path + ".tmp.npz", hashes=hashes[start:start + chunk_size], vectors=np.asarray(vectors, dtype='float32'))
+        os.replace(path + ".tmp.npz", path)
+        print(f"Embedded {min(start + chunk_size, len(texts))}/{len(texts)} new texts...")
+
+def compute_embeddings(texts, hashes, data_dir, full=False, chunk_size=CHUNK_SIZE, batch_size=BATCH_SIZE,
+                       workers=ENCODE_WORKERS, model=None):
+    """
+    Returns the float32 embedding matrix for texts, re-embedding only texts whose hash
+    is not in the previous run's artifacts or in an interrupted run's checkpoint.
+
+    Returns:
+        tuple: (embeddings, number of newly embedded texts)
+    """
+    checkpoint_dir = os.path.join(data_dir, CHECKPOINT_DIRNAME)
+    previous_hashes, previous_vectors = (np.empty(0, dtype=np.uint64), None) if full else load_previous_artifacts(data_dir)
+    checkpoint_hashes, checkpoint_vectors = load_checkpoint(checkpoint_dir)
+
+    # Identical texts (duplicate rows) only need one embedding
+    unique_hashes, first_rows = np.unique(hashes, return_index=True)
+    from_previous = lookup_hashes(previous_hashes, unique_hashes)
+    from_checkpoint = lookup_hashes(checkpoint_hashes, unique_hashes)
+    missing = (from_previous < 0) & (from_checkpoint < 0)
+    print(f"{len(unique_hashes)} unique texts: {int((from_previous >= 0).sum())} reused, "
+          f"{int(((from_previous < 0) & (from_checkpoint >= 0)).sum())} from checkpoint, {int(missing.sum())} to embed.")
+
+    if missing.any():
+        pool = None
+        if model is None:
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(MODEL_NAME)
+        if workers > 1:
+            pool = model.start_multi_process_pool(["cpu"] * workers)
+        try:
+            missing_rows = first_rows[missing]
+            embed_in_chunks(
+                model, [texts[i] for i in missing_rows], unique_hashes[missing], checkpoint_dir,
+                chunk_size=chunk_size, batch_size=batch_size, pool=pool,
+            )
+        finally:
+            if pool is not None:
+                model.stop_multi_process_pool(pool)
+        checkpoint_hashes, checkpoint_vectors = load_checkpoint(checkpoint_dir)
+        from_checkpoint = lookup_hashes(checkpoint_hashes, unique_hashes)
+
+    dimension = (previous_vectors if previous_vectors is not None and len(previous_vectors) else checkpoint_vectors).shape[1]
+    unique_vectors = np.empty((len(unique_hashes), dimension), dtype='float32')
+    use_previous = from_previous >= 0
+    if use_previous.any():
+        unique_vectors[use_previous] = previous_vectors[from_previous[use_previous]]
+    if (~use_previous).any():
+        unique_vectors[~use_previous] = checkpoint_vectors[from_checkpoint[~use_previous]]
+
+    rows_to_unique = np.searchsorted(unique_hashes, hashes)
+    return unique_vectors[rows_to_unique], int(missing.sum())
+
+def embed_review_chunks(df, model, out_dir, previous_dir=None, batch_size=BATCH_SIZE, block_size=CHUNK_BLOCK_SIZE,
+                        vectors_dtype=VECTORS_DTYPE, index_type=CHUNK_INDEX_TYPE):
+    """
+    Streams review and menu chunks through the encoder block by block into a memory-mapped
+    chunk_vectors.npy, so memory stays at one block of texts however many chunks there are.
+    Chunks whose text hash is in previous_dir's chunk_hashes.npy reuse the stored vector.
+
+    Returns:
+        tuple: (number of chunks, number of newly embedded chunks)
+    """
+    # First pass only counts, so the output file can be allocated up front
+    total = sum(1 for _ in iter_chunks(df))
+    owners = np.empty(total, dtype=np.int32)
+    hashes = np.empty(total, dtype=np.uint64)
+    if total == 0:
+        print("No review or menu text to chunk.")
+        return 0, 0
+
+    previous_hashes, previous_vectors = np.empty(0, dtype=np.uint64), None
+    if previous_dir and os.path.exists(os.path.join(previous_dir, CHUNK_HASHES_FILE)):
+        previous_hashes = np.load(os.path.join(previous_dir, CHUNK_HASHES_FILE))
+        previous_vectors = load_vectors(os.path.join(previous_dir, CHUNK_VECTORS_FILE))
+
+    vectors = None
+    embedded = 0
+    chunks = iter_chunks(df)
+    for start in range(0, total, block_size):
+        block = [chunk for _, chunk in zip(range(block_size), chunks)]
+        rows = np.fromiter((row for row, _ in block), dtype=np.int32, count=len(block))
+        texts = [text for _, text in block]
+        block_hashes = hash_texts(texts)
+        found = lookup_hashes(previous_hashes, block_hashes)
+        missing = np.flatnonzero(found < 0)
+
+        new_vectors = None
+        if len(missing):
+            new_vectors = np.asarray(model.encode([texts[i] for i in missing], batch_size=batch_size), dtype='float32')
+            embedded += len(missing)
+        if vectors is None:
+            dimension = (new_vectors if new_vectors is not None else previous_vectors).shape[1]
+            vectors = np.lib.format.open_memmap(
+                os.path.join(out_dir, CHUNK_VECTORS_FILE), mode="w+", dtype=vectors_dtype, shape=(total, dimension)
+            )
+        end = start + len(block)
+        reused = np.flatnonzero(found >= 0)
+        if len(reused):
+            vectors[start + reused] = previous_vectors[found[reused]]
+        if new_vectors is not None:
+            vectors[start + missing] = new_vectors
+        owners[start:end] = rows
+        hashes[start:end] = block_hashes
+        print(f"Chunks {end}/{total}: {len(missing)} embedded, {len(reused)} reused.")
+    vectors.flush()
+
+    np.save(os.path.join(out_dir, CHUNK_OWNERS_FILE), owners)
+    np.save(os.path.join(out_dir, CHUNK_HASHES_FILE), hashes)
+    print(f"Building chunk index over {total} vectors...")
+    build_chunk_index(vectors, os.path.join(out_dir, CHUNK_INDEX_FILE), index_type=index_type, block_size=block_size)
+    del vectors
+    return total, embedded
+
+def changed_build_params(index_meta, index_params):
+    """Build parameters given in index_params that differ from those the index was built with."""
+    built = index_meta.get("build_params", {})
+    return sorted(name for name, value in built.items()
+                  if index_params.get(name) is not None and index_params[name] != value)
+
+
+def update_or_build_index(embeddings, hashes, data_dir, index_type, full=False, **index_params):
+    """
+    Appends new rows to the existing index when the data only grew at the end and the
+    index type and build parameters are unchanged (reusing IVF training); otherwise
+    rebuilds from the vectors. The saved metadata keeps only configured search parameters,
+    never FAISS_* environment overrides applied at load time.
+    """
+    index_file = os.path.join(generation_dir(data_dir), os.path.basename(INDEX_FILE))
+    stored_meta = None if full else read_index_meta(index_file)
+    if stored_meta is not None and os.path.exists(index_file):
+        previous_hashes, _ = load_previous_artifacts(data_dir)
+        n_previous = len(previous_hashes)
+        changed = changed_build_params(stored_meta, index_params)
+        if stored_meta.get("index_type") != index_type or changed:
+            print(f"Index configuration changed ({stored_meta.get('index_type')} -> {index_type}"
+                  + (f", {', '.join(changed)}" if changed else "") + "); rebuilding.")
+        elif (stored_meta.get("ntotal") == n_previous and 0 < n_previous <= len(hashes)
+                and np.array_equal(previous_hashes, hashes[:n_previous])):
+            index, _ = load_index(index_file)
+            if n_previous < len(hashes):
+                print(f"Adding {len(hashes) - n_previous} new vectors to the existing {index_type} index...")
+                index.add(np.ascontiguousarray(embeddings[n_previous:]))
+            index_meta = dict(stored_meta, ntotal=int(index.ntotal))
+            search_params = dict(stored_meta.get("search_params", {}))
+            if index_params.get("nprobe") and "nprobe" in search_params:
+                search_params["nprobe"] = int(index_params["nprobe"])
+            if index_params.get("ef_search") and "efSearch" in search_params:
+                search_params["efSearch"] = int(index_params["ef_search"])
+            index_meta["search_params"] = search_params
+            apply_search_params(index, search_params)
+            if index_params.get("rerank") is not None:
+                index_meta["rerank"] = int(index_params["rerank"])
+            return index, index_meta
+
+    print(f"Building FAISS index ({index_type})...")
+    return build_index(embeddings, index_type=index_type, **index_params)
+
+def artifact_sizes(data_dir):
+    """Bytes on disk of each serving artifact in data_dir."""
+    names = [METADATA_TABLE_FILE, VECTORS_FILE_NAME, os.path.basename(INDEX_FILE), LEXICAL_INDEX_FILE,
+             CHUNK_VECTORS_FILE, CHUNK_INDEX_FILE]
+    sizes = {name: os.path.getsize(os.path.join(data_dir, name))
+             for name in names if os.path.exists(os.path.join(data_dir, name))}
+    if os.path.isdir(shards_dir(data_dir)):
+        sizes[SHARDS_DIR] = sum(os.path.getsize(os.path.join(root, f))
+                                for root, _, files in os.walk(shards_dir(data_dir)) for f in files)
+    return sizes
+
+def ingest_data(index_type=INDEX_TYPE, report=False, report_queries=500, full=False, chunk_size=CHUNK_SIZE,
+                batch_size=BATCH_SIZE, workers=ENCODE_WORKERS, data_dir=DATA_DIR, df=None, model=None,
+                vectors_dtype=VECTORS_DTYPE, shard_column=SHARD_COLUMN, multi_vector=MULTI_VECTOR, **index_params):
+    """
+    Downloads the dataset, embeds it and writes the metadata and FAISS index.
+
+    Runs are incremental: each row's text is hashed and only new or changed
+    restaurants are embedded; everything else reuses the previous run's vectors.
+    Embedding is chunked and checkpointed, so an interrupted run resumes where it stopped.
+    Each run writes a new generation under data_dir/generations/ and publishes it through
+    data_dir/CURRENT (see artifacts.publish_generation).
+
+    Args:
+        index_type (str): One of vector_index.INDEX_TYPES ("flat", "ivf_flat", "hnsw", "ivf_pq",
+            "sq8", "sq_fp16", "pq", "binary").
+        report (bool): Also write a recall-vs-latency report against the flat baseline.
+        report_queries (int): Number of sampled vectors used as report queries.
+        full (bool): Ignore previous artifacts and re-embed / rebuild everything.
+        chunk_size (int): Texts embedded and checkpointed per chunk.
+        batch_size (int): Encoder batch size.
+        workers (int): Encoding processes; >1 uses a multi-process pool.
+        data_dir (str): Where artifacts are read from and written to.
+        df (pd.DataFrame): Restaurants to ingest instead of downloading the dataset.
+        model: Encoder to use instead of loading MODEL_NAME.
+        vectors_dtype (str): Storage type of vectors.npy ("float32" or "float16").
+        shard_column (str): Metadata column to partition region shards by (see shards.py);
+            empty (the default) writes only the monolithic index.
+        multi_vector (bool): Also embed review and menu chunks as extra vectors per restaurant.
+        **index_params: Forwarded to vector_index.build_index (nlist, m, pq_m, nprobe, rerank, ...).
+    """
+    if df is None:
+        df = load_restaurants()
+        if df is None:
+            return
+
+    # Fill NaN values for critical columns
+    for col in TEXT_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].fillna('')
+
     print("Generating embeddings...")
-    # Combine fields: "Name: [name]. Cuisine: [cuisine]. Location: [location]. Type: [type]"
-    df['combined_text'] = df.apply(
-        lambda x: f"Name: {x.get('name', '')}. Cuisine: {x.get('cuisines', '')}. Location: {x.get('location', '')}. Type: {x.get('rest_type', '')}",
-        axis=1
+    df['combined_text'] = build_combined_text(df)
+    df['text_hash'] = hash_texts(df['combined_text'])
+    # Parsed once here so serving reads numeric rating/votes/cost columns directly
+    add_numeric_features(df)
+    texts = df['combined_text'].tolist()
+
+    if not os.path.exists(data_dir):
+        os.makedirs(data_dir)
+
+    embeddings, n_embedded = compute_embeddings(
+        texts, df['text_hash'].to_numpy(), data_dir, full=full,
+        chunk_size=chunk_size, batch_size=batch_size, workers=workers, model=model,
     )
-    
-    model = SentenceTransformer(MODEL_NAME)
-    embeddings = model.encode(df['combined_text'].tolist(), show_progress_bar=True)
-    embeddings = np.array(embeddings).astype('float32')
-
-    # Create FAISS index
-    print("Building FAISS index...")
-    dimension = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dimension)
-    index.add(embeddings)
-    
-    # Save artifacts
-    print(f"Saving data to {DATA_DIR}...")
-    if not os.path.exists(DATA_DIR):
-        os.makedirs(DATA_DIR)
-        
-    # Save metadata (DataFrame)
-    with open(METADATA_FILE, 'wb') as f:
-        pickle.dump(df, f)
-        
-    # Save index
-    faiss.write_index(index, INDEX_FILE)
-    
-    print("Ingestion complete!")
+
+    # Create or extend the FAISS index
+    index, index_meta = update_or_build_index(
+        embeddings, df['text_hash'].to_numpy(), data_dir, index_type, full=full, **index_params
+    )
+
+    # Save artifacts into a new generation directory and only then point CURRENT at it,
+    # so a crash never leaves a half-written bundle and running services can reload
+    # the new generation while still serving the old one.
+    previous_dir = generation_dir(data_dir)
+    generation, out_dir = new_generation(data_dir)
+    print(f"Saving data to {out_dir}...")
+    # Save slimmed metadata and raw vectors in memory-mappable formats
+    write_metadata_table(slim_metadata(df), os.path.join(out_dir, METADATA_TABLE_FILE))
+    write_vectors(embeddings, os.path.join(out_dir, VECTORS_FILE_NAME), dtype=vectors_dtype)
+    # Save index along with its type and search parameters
+    save_index(index, os.path.join(out_dir, os.path.basename(INDEX_FILE)), index_meta)
+    # BM25 index over names, cuisines, types and liked dishes for hybrid retrieval
+    print("Building lexical index...")
+    LexicalIndex.build(df).save(os.path.join(out_dir, LEXICAL_INDEX_FILE))
+    if shard_column:
+        print(f"Building shards by '{shard_column}'...")
+        write_shards(df, embeddings, out_dir, column=shard_column, index_type=index_type,
+                     vectors_dtype=vectors_dtype, **index_params)
+    if multi_vector:
+        if model is None:
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(MODEL_NAME)
+        print("Embedding review and menu chunks...")
+        n_chunks, n_chunks_embedded = embed_review_chunks(
+            df, model, out_dir, previous_dir=None if full else previous_dir,
+            batch_size=batch_size, vectors_dtype=vectors_dtype,
+        )
+        print(f"{n_chunks} chunk vectors, {n_chunks_embedded} newly embedded.")
+    publish_generation(data_dir, generation)
+    print(f"Published generation {generation}.")
+    for name in prune_generations(data_dir):
+        print(f"Removed old generation {name}.")
+
+    # The run finished, so the checkpoint is no longer needed
+    shutil.rmtree(os.path.join(data_dir, CHECKPOINT_DIRNAME), ignore_errors=True)
+
+    sizes = artifact_sizes(out_dir)
+    for name, size in sizes.items():
+        print(f"  {name}: {size / 1e6:.1f} MB")
+
+    if report:
+        print("Measuring recall vs latency against the flat baseline...")
+        rng = np.random.default_rng(0)
+        sample = rng.choice(len(embeddings), size=min(report_queries, len(embeddings)), replace=False)
+        rows = recall_latency_report(index, index_meta, embeddings, embeddings[sample])
+        print(format_report(rows))
+        with open(os.path.join(data_dir, os.path.basename(REPORT_FILE)), 'w') as f:
+            json.dump({"rows": rows, "artifact_bytes": sizes}, f, indent=2)
+
+    print(f"Ingestion complete! {len(df)} restaurants, {n_embedded} newly embedded.")
 
 if __name__ == "__main__":
-    ingest_data()
+    parser = argparse.ArgumentParser(description="Build the restaurant metadata and FAISS index")
+    parser.add_argument("--index-type", choices=sorted(INDEX_TYPES), default=INDEX_TYPE, help="FAISS index type to build")
+    parser.add_argument("--nlist", type=int, help="Number of IVF lists (ivf_flat, ivf_pq)")
+    parser.add_argument("--nprobe", type=int, help="Default IVF lists visited per query")
+    parser.add_argument("--m", type=int, default=32, help="HNSW graph degree")
+    parser.add_argument("--ef-search", type=int, default=64, help="Default HNSW search beam width")
+    parser.add_argument("--pq-m", type=int, default=48, help="PQ sub-quantizers (must divide 384)")
+    parser.add_argument("--rerank", type=int, help="Shortlist multiple re-ranked with exact distances (0 disables)")
+    parser.add_argument("--vectors-dtype", choices=["float32", "float16"], default=VECTORS_DTYPE, help="Storage type of vectors.npy")
+    parser.add_argument("--shard-column", default=SHARD_COLUMN, help="Column to partition region shards by, e.g. 'listed_in(city)' (default: no shards)")
+    parser.add_argument("--multi-vector", action="store_true", default=MULTI_VECTOR, help="Also embed review and menu chunks per restaurant")
+    parser.add_argument("--report", action="store_true", help="Write a recall-vs-latency report against the flat baseline")
+    parser.add_argument("--full", action="store_true", help="Re-embed everything and rebuild the index from scratch")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Texts embedded and checkpointed per chunk")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Encoder batch size")
+    parser.add_argument("--workers", type=int, default=ENCODE_WORKERS, help="Encoding processes (multi-process pool when > 1)")
+    args = parser.parse_args()
+
+    ingest_data(
+        index_type=args.index_type,
+        report=args.report,
+        full=args.full,
+        chunk_size=args.chunk_size,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        vectors_dtype=args.vectors_dtype,
+        shard_column=args.shard_column,
+        multi_vector=args.multi_vector,
+        nlist=args.nlist,
+        nprobe=args.nprobe,
+        m=args.m,
+        ef_search=args.ef_search,
+        pq_m=args.pq_m,
+        rerank=args.rerank,
+    )
@@ -1,35 +1,73 @@
 import os
-import pickle
-import faiss
-import numpy as np
-import pandas as pd
-from fastapi import FastAPI, HTTPException
+import json
+import time
+import asyncio
+from fastapi import FastAPI, HTTPException, Request, Header
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 from pydantic import BaseModel
-from sentence_transformers import SentenceTransformer
-from groq import Groq
 from dotenv import load_dotenv
 from typing import List, Optional
+from backend.utils.metrics import (
+    REGISTRY, PROMETHEUS_CONTENT_TYPE, REQUEST_SECONDS, REQUESTS_TOTAL, REQUESTS_IN_FLIGHT,
+    request_timings, format_server_timing, record_cache_stats
+)
 
 # Load environment variables
 load_dotenv()
 
-app = FastAPI(title="Zomato AI Restaurant Recommender")
+# Shared RecommendationService; owns the only copy of the metadata, index and model
+rec_service = None
 
-# Global variables for artifacts
-DATA_DIR = "backend/data"
-METADATA_FILE = os.path.join(DATA_DIR, "restaurants.pkl")
-INDEX_FILE = os.path.join(DATA_DIR, "faiss_index.bin")
-MODEL_NAME = "all-MiniLM-L6-v2"
-
-# In-memory storage
-df_restaurants = None
-faiss_index = None
-embedding_model = None
-groq_client = None
+# Endpoints whose latency, status and in-flight count are exported on /metrics
+INSTRUMENTED_PATHS = {"/api/recommend", "/api/recommend/stream", "/api/recommend/batch"}
+# Upper bound on queries per /api/recommend/batch request
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "50000"))
+# Cap on the per-request LLM concurrency a batch caller may ask for
+BATCH_MAX_LLM_CONCURRENCY = int(os.getenv("BATCH_MAX_LLM_CONCURRENCY", "16"))
+# Set SERVER_TIMING=1 to return per-stage durations in a Server-Timing response header
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+# "blocking" loads artifacts before accepting requests; "background" starts serving at
+# once (health and recommendations return 503 until the warm-up thread finishes)
+API_WARMUP = os.getenv("API_WARMUP", "blocking")
+# Token required by POST /admin/reload (sent as X-Admin-Token); the endpoint is disabled when unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
 
 class RecommendationRequest(BaseModel):
     query: str
     top_k: int = 5
+    # Optional structured filters, applied before vector ranking
+    location: Optional[str] = None
+    rest_type: Optional[str] = None
+    max_cost: Optional[float] = None
+    min_rating: Optional[float] = None
+
+    def filters(self):
+        return {
+            "location": self.location,
+            "rest_type": self.rest_type,
+            "max_cost": self.max_cost,
+            "min_rating": self.min_rating,
+        }
+
+class BatchRecommendationRequest(BaseModel):
+    queries: List[str]
+    top_k: int = 5
+    # Structured filters applied to every query
+    location: Optional[str] = None
+    rest_type: Optional[str] = None
+    max_cost: Optional[float] = None
+    min_rating: Optional[float] = None
+    # LLM analysis per query is off by default; when on, at most `concurrency` calls run at once
+    analysis: bool = False
+    concurrency: int = 4
+
+    def filters(self):
+        return {
+            "location": self.location,
+            "rest_type": self.rest_type,
+            "max_cost": self.max_cost,
+            "min_rating": self.min_rating,
+        }
 
 class Restaurant(BaseModel):
     name: str
@@ -47,61 +85,192 @@ from contextlib import asynccontextmanager
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global df_restaurants, faiss_index, embedding_model, groq_client
-    
-    # Load Data
-    if os.path.exists(METADATA_FILE):
-        print(f"Loading metadata from {METADATA_FILE}...")
-        with open(METADATA_FILE, 'rb') as f:
-            df_restaurants = pickle.load(f)
-    else:
-        print("WARNING: Metadata file not found. Please run ingest_data.py first.")
-        
-    # Load Index
-    if os.path.exists(INDEX_FILE):
-        print(f"Loading FAISS index from {INDEX_FILE}...")
-        faiss_index = faiss.read_index(INDEX_FILE)
-    else:
-        print("WARNING: FAISS index not found. Please run ingest_data.py first.")
-
-    # Load Model
-    print(f"Loading embedding model {MODEL_NAME}...")
-    embedding_model = SentenceTransformer(MODEL_NAME)
-    
-    # Initialize Groq Client
-    api_key = os.getenv("GROQ_API_KEY")
-    if api_key:
-        groq_client = Groq(api_key=api_key)
+    global rec_service
+    # Imported here so that importing the app stays cheap
+    from backend.core import get_rec_service, warm_up_in_background, watch_artifacts, ARTIFACT_WATCH_SECONDS
+
+    if API_WARMUP == "background":
+        rec_service = warm_up_in_background()
     else:
-        print("WARNING: GROQ_API_KEY not found in environment variables.")
-    
+        # Load artifacts once, off the event loop, through the shared registry
+        rec_service = await asyncio.to_thread(get_rec_service)
+    if ARTIFACT_WATCH_SECONDS > 0:
+        watch_artifacts(on_swap=set_rec_service)
+
     yield
     # Clean up if needed
 
 app = FastAPI(title="Zomato AI Restaurant Recommender", lifespan=lifespan)
 
+def set_rec_service(service):
+    """Points new requests at `service`; requests already running keep the one they started with."""
+    global rec_service
+    rec_service = service
+
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    """Records latency, status and in-flight requests, and optionally a Server-Timing header."""
+    endpoint = request.url.path
+    if endpoint not in INSTRUMENTED_PATHS:
+        return await call_next(request)
+
+    REQUESTS_IN_FLIGHT.inc(endpoint=endpoint)
+    start = time.perf_counter()
+
+    def finish(status):
+        REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+        REQUESTS_TOTAL.inc(endpoint=endpoint, status=str(status))
+        REQUESTS_IN_FLIGHT.dec(endpoint=endpoint)
+
+    try:
+        with request_timings() as timings:
+            response = await call_next(request)
+    except BaseException:
+        finish(500)
+        raise
+    if SERVER_TIMING:
+        # Time to headers; a streamed body is still being produced
+        timings["total"] = time.perf_counter() - start
+        response.headers["Server-Timing"] = format_server_timing(timings)
+    # call_next returns once the headers are ready, so SSE and NDJSON bodies are still
+    # streaming here; the request is counted when its body ends (or fails)
+    response.body_iterator = _finish_after(response.body_iterator, response.status_code, finish)
+    return response
+
+
+async def _finish_after(body, status, finish):
+    """Passes a response body through, calling finish(status) once it is fully sent or fails."""
+    try:
+        async for chunk in body:
+            yield chunk
+    except BaseException:
+        status = 500
+        raise
+    finally:
+        finish(status)
+
 
 @app.get("/health")
 def health_check():
-    return {"status": "ok", "data_loaded": df_restaurants is not None}
+    details = rec_service.health() if rec_service is not None else {"ready": False, "data_loaded": False}
+    if not details["ready"]:
+        return JSONResponse(status_code=503, content={"status": "unavailable", **details})
+    return {"status": "ok", **details}
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint: stage histograms, request metrics, cache ratios and LLM tokens."""
+    if rec_service is not None:
+        record_cache_stats(rec_service.get_cache_stats())
+    return Response(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.get("/stats/llm")
+def llm_stats():
+    """LLM gateway state and token/latency usage (p50/p95/p99 call time, tokens per call, max_tokens hits)."""
+    if rec_service is None:
+        raise HTTPException(status_code=503, detail="Service not loaded.")
+    return rec_service.get_llm_stats()
+
+@app.post("/admin/reload")
+async def admin_reload(force: bool = False, x_admin_token: Optional[str] = Header(None)):
+    """
+    Loads the newest published artifact generation beside the serving one and swaps it
+    in. With several worker processes each one must be reloaded; ARTIFACT_WATCH_SECONDS
+    makes every worker pick up new generations on its own.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
+    from backend.core import reload_rec_service
+
+    started = time.perf_counter()
+    service, swapped = await asyncio.to_thread(reload_rec_service, force)
+    set_rec_service(service)
+    return {
+        "swapped": swapped,
+        "generation": service.generation,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
 
 @app.post("/api/recommend", response_model=RecommendationResponse)
 async def recommend(request: RecommendationRequest):
-    # Delegate to RecService
-    from backend.core import rec_service
-    
-    result = rec_service.get_recommendations(request.query, request.top_k)
-    
+    # A reload may swap rec_service at any await; this request stays on one generation
+    service = rec_service
+    if service is None or not service.loaded:
+        raise HTTPException(status_code=503, detail="Service is starting up.")
+
+    result = await service.aget_recommendations(request.query, request.top_k, filters=request.filters())
+
     if "error" in result:
         raise HTTPException(status_code=503, detail=result["error"])
-        
+
     # Convert dicts back to Pydantic models
     restaurants = [
         Restaurant(**r) for r in result.get("restaurants", [])
     ]
-    
+
     return RecommendationResponse(restaurants=restaurants, ai_analysis=result.get("ai_analysis", ""))
 
+def format_sse(event, data):
+    """Formats one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/api/recommend/stream")
+async def recommend_stream(request: RecommendationRequest):
+    """
+    Server-Sent Events variant of /api/recommend. Emits a `restaurants` event as soon
+    as retrieval finishes, `token` events while the AI analysis is generated, then `done`.
+    """
+    service = rec_service
+    if service is None or not service.is_ready():
+        raise HTTPException(status_code=503, detail="System not initialized. Data missing.")
+
+    async def events():
+        async for kind, payload in service.astream_recommendations(
+            request.query, request.top_k, filters=request.filters()
+        ):
+            if kind == "restaurants":
+                data = {"restaurants": [Restaurant(**r).model_dump() for r in payload]}
+            elif kind == "token":
+                data = {"text": payload}
+            elif kind == "done":
+                data = {"ai_analysis": payload}
+            else:
+                data = {"detail": payload}
+            yield format_sse(kind, data)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Disable proxy buffering so tokens reach the client as they are produced
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/api/recommend/batch")
+async def recommend_batch(request: BatchRecommendationRequest):
+    """
+    Bulk recommendations as NDJSON: one {"index", "query", "restaurants"[, "ai_analysis"]}
+    object per line. Queries are encoded and searched as matrices; with analysis on,
+    lines arrive as their LLM calls finish, so use "index" to restore input order.
+    """
+    service = rec_service
+    if service is None or not service.is_ready():
+        raise HTTPException(status_code=503, detail="System not initialized. Data missing.")
+    if len(request.queries) > BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_QUERIES} queries per request.")
+
+    async def lines():
+        async for item in service.aiter_recommendations_batch(
+            request.queries, request.top_k, filters=request.filters(),
+            analysis=request.analysis, concurrency=max(1, min(request.concurrency, BATCH_MAX_LLM_CONCURRENCY)),
+        ):
+            if "restaurants" in item:
+                item["restaurants"] = [Restaurant(**r).model_dump() for r in item["restaurants"]]
+            yield json.dumps(item) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,165 @@
+import os
+import gc
+import sys
+import time
+import signal
+import socket
+import argparse
+
+# Pre-fork multi-worker server. The parent process loads the metadata, index and
+# embedding model once, freezes them out of the garbage collector, binds the
+# listening socket and forks the workers. Each worker runs its own uvicorn event
+# loop on the inherited socket, so the kernel hands every new connection to
+# whichever worker accepts it first, and the loaded artifacts stay shared
+# copy-on-write (mmap'ed artifacts are shared through the page cache anyway).
+# The parent only supervises: it restarts workers that die and forwards shutdown.
+#
+#     python -m backend.serve --workers 8 --port 8000
+#
+# Each worker keeps its own /metrics registry and caches.
+
+SERVE_HOST = os.getenv("SERVE_HOST", "0.0.0.0")
+SERVE_PORT = int(os.getenv("SERVE_PORT", "8000"))
+# 0 starts one worker per core
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", "0"))
+SERVE_BACKLOG = int(os.getenv("SERVE_BACKLOG", "2048"))
+# A worker that dies sooner than this after starting is restarted with a delay
+RESTART_MIN_UPTIME = 1.0
+
+
+def worker_count(workers=SERVE_WORKERS):
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def threads_per_worker(workers):
+    """Splits the cores between workers so their numeric thread pools don't oversubscribe the box."""
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def limit_threads(threads):
+    """
+    Caps BLAS/OpenMP, encoder and FAISS threads. Environment defaults must be set
+    before numpy/torch are imported, so this runs first in the parent; libraries
+    that are already loaded are also capped directly (again in each worker).
+    """
+    for name in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "ENCODER_THREADS"):
+        os.environ.setdefault(name, str(threads))
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(threads)
+    if "faiss" in sys.modules:
+        sys.modules["faiss"].omp_set_num_threads(threads)
+
+
+def bind_socket(host=SERVE_HOST, port=SERVE_PORT, backlog=SERVE_BACKLOG):
+    """Listening socket shared by every worker."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def preload():
+    """Loads the service and the app in the parent, then freezes them for copy-on-write sharing."""
+    from backend.core import get_rec_service
+    import backend.main  # noqa: F401  (imported once here instead of in every worker)
+
+    service = get_rec_service()
+    # Objects that survive to here live for the whole process. Freezing moves them out
+    # of the collector's generations, so collections in the workers don't write to
+    # their pages (refcounts and GC headers) and un-share them.
+    gc.collect()
+    gc.freeze()
+    return service
+
+
+def run_worker(sock, service, threads):
+    """Body of a forked worker: rebuilds per-process state and serves until told to stop."""
+    import uvicorn
+    from backend.main import app
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    limit_threads(threads)
+    service.after_fork()
+
+    config = uvicorn.Config(app, lifespan="on", log_level=os.getenv("SERVE_LOG_LEVEL", "info"))
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class Supervisor:
+    """Forks the workers, restarts the ones that exit and stops them all on SIGTERM/SIGINT."""
+
+    def __init__(self, sock, service, workers, threads):
+        self.sock = sock
+        self.service = service
+        self.workers = workers
+        self.threads = threads
+        self.children = {}  # pid -> start time
+        self.stopping = False
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(self.sock, self.service, self.threads)
+            except BaseException as e:
+                print(f"ERROR: Worker {os.getpid()} crashed: {e}")
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = time.monotonic()
+        print(f"Started worker {pid}.")
+
+    def stop(self, signum=None, frame=None):
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.workers):
+            self.spawn()
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self.children.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            print(f"WARNING: Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}; restarting.")
+            if time.monotonic() - started < RESTART_MIN_UPTIME:
+                time.sleep(RESTART_MIN_UPTIME)
+            self.spawn()
+        self.sock.close()
+
+
+def serve(host=SERVE_HOST, port=SERVE_PORT, workers=SERVE_WORKERS):
+    workers = worker_count(workers)
+    threads = threads_per_worker(workers)
+    limit_threads(threads)
+
+    started = time.perf_counter()
+    service = preload()
+    print(f"Artifacts loaded in {time.perf_counter() - started:.1f}s; "
+          f"starting {workers} workers x {threads} threads on {host}:{port}.")
+    Supervisor(bind_socket(host, port), service, workers, threads).run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the API from several pre-forked worker processes")
+    parser.add_argument("--host", default=SERVE_HOST, help="Interface to bind")
+    parser.add_argument("--port", type=int, default=SERVE_PORT, help="Port to bind")
+    parser.add_argument("--workers", type=int, default=SERVE_WORKERS, help="Worker processes (0 = one per core)")
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.workers)
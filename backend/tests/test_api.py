@@ -1,3 +1,4 @@
+import asyncio
 from fastapi.testclient import TestClient
 from backend.main import app
 import pytest
@@ -41,3 +42,155 @@ def test_recommendation_results_content():
             assert "cuisine" in restaurant
             assert "location" in restaurant
             assert "rating" in restaurant
+
+def test_recommend_stream_sse(monkeypatch):
+    """The SSE endpoint sends restaurants first, then analysis tokens."""
+    from backend import main
+
+    class FakeService:
+        def is_ready(self):
+            return True
+
+        async def astream_recommendations(self, query, top_k, filters=None):
+            yield "restaurants", [{"name": "R1", "cuisine": "C1", "location": "L1", "rating": "4.0", "cost": "500"}]
+            yield "token", "Try "
+            yield "token", "R1!"
+            yield "done", "Try R1!"
+
+    monkeypatch.setattr(main, "rec_service", FakeService())
+    # No context manager: skip the lifespan so the real artifacts aren't loaded
+    client = TestClient(app)
+    response = client.post("/api/recommend/stream", json={"query": "Pizza", "top_k": 1})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [line[len("event: "):] for line in response.text.splitlines() if line.startswith("event: ")]
+    assert events == ["restaurants", "token", "token", "done"]
+    assert '"R1"' in response.text
+
+def test_metrics_and_server_timing(monkeypatch):
+    """Stage spans show up in /metrics and, when enabled, in the Server-Timing header."""
+    from backend import main
+    from backend.utils.metrics import span
+
+    class FakeService:
+        loaded = True
+
+        async def aget_recommendations(self, query, top_k, filters=None):
+            with span("retrieval"):
+                pass
+            return {"restaurants": [], "ai_analysis": "None found."}
+
+        def get_cache_stats(self):
+            return {"results": {"memory": {"hit_ratio": 0.25, "size": 3}}}
+
+    monkeypatch.setattr(main, "rec_service", FakeService())
+    monkeypatch.setattr(main, "SERVER_TIMING", True)
+    client = TestClient(app)
+    response = client.post("/api/recommend", json={"query": "Pizza"})
+
+    assert response.status_code == 200
+    assert "retrieval;dur=" in response.headers["Server-Timing"]
+    assert "total;dur=" in response.headers["Server-Timing"]
+
+    metrics = client.get("/metrics")
+    assert metrics.headers["content-type"].startswith("text/plain")
+    assert 'rec_stage_seconds_count{stage="retrieval"}' in metrics.text
+    assert 'rec_requests_total{endpoint="/api/recommend",status="200"}' in metrics.text
+    assert 'rec_requests_in_flight{endpoint="/api/recommend"} 0' in metrics.text
+    assert 'rec_cache_hit_ratio{cache="results",tier="memory"} 0.25' in metrics.text
+
+def test_streamed_requests_are_timed_until_the_body_ends(monkeypatch):
+    """SSE requests stay in flight, and are timed, until their last event is sent."""
+    from backend import main
+    from backend.utils.metrics import REQUESTS_IN_FLIGHT, REQUEST_SECONDS
+
+    endpoint = "/api/recommend/stream"
+    seen = []
+
+    class FakeService:
+        def is_ready(self):
+            return True
+
+        async def astream_recommendations(self, query, top_k, filters=None):
+            yield "restaurants", []
+            await asyncio.sleep(0.05)
+            seen.append(REQUESTS_IN_FLIGHT.value(endpoint=endpoint))
+            yield "done", ""
+
+    monkeypatch.setattr(main, "rec_service", FakeService())
+    before = REQUESTS_IN_FLIGHT.value(endpoint=endpoint)
+    timed_before = (REQUEST_SECONDS.snapshot(endpoint=endpoint) or {"sum": 0.0})["sum"]
+    client = TestClient(app)
+    response = client.post(endpoint, json={"query": "Pizza", "top_k": 1})
+
+    assert response.status_code == 200
+    assert seen == [before + 1]
+    assert REQUESTS_IN_FLIGHT.value(endpoint=endpoint) == before
+    assert REQUEST_SECONDS.snapshot(endpoint=endpoint)["sum"] - timed_before >= 0.05
+
+def test_recommend_batch_ndjson(monkeypatch):
+    """The batch endpoint streams one JSON object per line."""
+    import json
+    from backend import main
+
+    class FakeService:
+        def is_ready(self):
+            return True
+
+        async def aiter_recommendations_batch(self, queries, top_k, filters=None, analysis=False, concurrency=4):
+            for i, query in enumerate(queries):
+                yield {"index": i, "query": query, "restaurants": [
+                    {"name": f"R{i}", "cuisine": "C", "location": "L", "rating": "4.0", "cost": "500"}
+                ]}
+
+    monkeypatch.setattr(main, "rec_service", FakeService())
+    client = TestClient(app)
+    response = client.post("/api/recommend/batch", json={"queries": ["Pizza", "Sushi"], "top_k": 1})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    items = [json.loads(line) for line in response.text.splitlines()]
+    assert [item["query"] for item in items] == ["Pizza", "Sushi"]
+    assert items[1]["restaurants"][0]["name"] == "R1"
+
+    monkeypatch.setattr(main, "BATCH_MAX_QUERIES", 1)
+    assert client.post("/api/recommend/batch", json={"queries": ["a", "b"]}).status_code == 413
+
+def test_admin_reload(monkeypatch):
+    from backend import main
+    import backend.core as core
+
+    class FakeService:
+        generation = "20260101T000000-000000001"
+
+    new_service = FakeService()
+    monkeypatch.setattr(core, "reload_rec_service", lambda force=False: (new_service, True))
+    monkeypatch.setattr(main, "rec_service", object())
+    client = TestClient(app)
+
+    monkeypatch.setattr(main, "ADMIN_TOKEN", None)
+    assert client.post("/admin/reload").status_code == 404
+
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    assert client.post("/admin/reload", headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+    response = client.post("/admin/reload", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert response.json()["swapped"] is True
+    assert response.json()["generation"] == new_service.generation
+    assert main.rec_service is new_service
+
+def test_llm_stats(monkeypatch):
+    from backend import main
+
+    class FakeService:
+        def get_llm_stats(self):
+            return {"enabled": False, "usage": {"calls": 2, "p95_ms": 850.0}}
+
+    client = TestClient(app)
+    monkeypatch.setattr(main, "rec_service", None)
+    assert client.get("/stats/llm").status_code == 503
+
+    monkeypatch.setattr(main, "rec_service", FakeService())
+    assert client.get("/stats/llm").json()["usage"]["p95_ms"] == 850.0
@@ -0,0 +1,114 @@
+import os
+import pickle
+import numpy as np
+import pandas as pd
+import faiss
+import pytest
+from backend.utils.artifacts import (
+    write_metadata_table, write_vectors, load_metadata_table, load_vectors, load_metadata,
+    build_result_columns, materialize_results, slim_metadata,
+    METADATA_TABLE_FILE, VECTORS_FILE
+)
+from backend.utils.vector_index import build_index, save_index, load_index
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        "name": ["Truffles", "Meghana Foods", "Empire"],
+        "url": ["https://zomato.test/1", None, "https://zomato.test/3"],
+        "votes": [1200, 900, 450],
+    })
+
+def test_metadata_table_round_trip(tmp_path, df):
+    path = str(tmp_path / METADATA_TABLE_FILE)
+    write_metadata_table(df, path)
+
+    loaded = load_metadata(str(tmp_path))
+    assert list(loaded["name"]) == list(df["name"])
+    assert loaded.iloc[1]["name"] == "Meghana Foods"
+    assert load_metadata_table(path).num_rows == 3
+
+def test_slim_metadata_is_dictionary_encoded(tmp_path):
+    df = pd.DataFrame({
+        "name": ["A", "B", "C"],
+        "location": ["BTM", "BTM", "Indiranagar"],
+        "combined_text": ["Name: A", "Name: B", "Name: C"],
+    })
+    path = str(tmp_path / METADATA_TABLE_FILE)
+    table = write_metadata_table(slim_metadata(df), path)
+    assert "combined_text" not in table.column_names
+    assert table.column("location").num_chunks == 1
+
+    loaded = load_metadata(str(tmp_path))
+    assert isinstance(loaded["location"].dtype, pd.CategoricalDtype)
+    assert build_result_columns(loaded)["location"].tolist() == ["BTM", "BTM", "Indiranagar"]
+
+def test_load_metadata_falls_back_to_pickle(tmp_path, df):
+    with open(tmp_path / "restaurants.pkl", 'wb') as f:
+        pickle.dump(df, f)
+    assert list(load_metadata(str(tmp_path))["name"]) == list(df["name"])
+    assert load_metadata(str(tmp_path / "missing")) is None
+
+def test_vectors_are_memory_mapped(tmp_path):
+    path = str(tmp_path / VECTORS_FILE)
+    vectors = np.random.default_rng(0).random((10, 4), dtype='float32')
+    write_vectors(vectors, path)
+
+    mapped = load_vectors(path)
+    assert isinstance(mapped, np.memmap)
+    assert not mapped.flags.writeable
+    np.testing.assert_array_equal(mapped, vectors)
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf_flat"])
+def test_index_can_be_memory_mapped(tmp_path, index_type):
+    vectors = np.random.default_rng(0).random((500, 8), dtype='float32')
+    index, meta = build_index(vectors, index_type=index_type, nlist=4)
+    index_file = str(tmp_path / "faiss_index.bin")
+    save_index(index, index_file, meta)
+
+    mapped, _ = load_index(index_file, mmap=True)
+    _, expected = index.search(vectors[:3], 2)
+    _, actual = mapped.search(vectors[:3], 2)
+    np.testing.assert_array_equal(actual, expected)
+
+def test_materialize_results_dedupes_in_rank_order(tmp_path):
+    frame = pd.DataFrame({
+        "name": ["Domino's", "Truffles", "Domino's", "Empire"],
+        "cuisines": ["Pizza", "Burger", "Pizza", None],
+        "location": ["BTM", "Koramangala", "HSR", "Indiranagar"],
+        "rate": ["3.8/5", "4.5/5", "3.9/5", None],
+        "approx_cost(for_two_people)": ["400", "900", "400", "800"],
+        "url": ["https://zomato.test/0", "", "https://zomato.test/2", None],
+    })
+    # Exercise the zero-copy ArrowDtype path used in production
+    write_metadata_table(frame, str(tmp_path / METADATA_TABLE_FILE))
+    columns = build_result_columns(load_metadata(str(tmp_path)))
+
+    results = materialize_results(columns, np.array([2, 0, -1, 3, 1]), top_k=5)
+    assert [r["name"] for r in results] == ["Domino's", "Empire", "Truffles"]
+    assert results[0]["location"] == "HSR"
+    assert results[1]["cuisine"] == "Unknown"
+    assert results[1]["rating"] == "N/A"
+    assert results[1]["url"] is None
+    assert results[2]["url"] is None
+
+    assert len(materialize_results(columns, np.array([2, 0, 3, 1]), top_k=2)) == 2
+
+def test_generations_publish_and_prune(tmp_path):
+    from backend.utils.artifacts import (
+        current_generation, generation_dir, new_generation, publish_generation, prune_generations
+    )
+    data_dir = str(tmp_path)
+    # Unversioned layout: artifacts live in data_dir itself
+    assert current_generation(data_dir) is None
+    assert generation_dir(data_dir) == data_dir
+
+    names = [new_generation(data_dir)[0] for _ in range(4)]
+    assert names == sorted(names)
+    publish_generation(data_dir, names[1])
+    assert current_generation(data_dir) == names[1]
+    assert generation_dir(data_dir).endswith(names[1])
+
+    # The current generation survives even when it is among the oldest
+    assert prune_generations(data_dir, keep=2) == [names[0]]
+    assert sorted(os.listdir(tmp_path / "generations")) == names[1:]
@@ -0,0 +1,63 @@
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from backend.utils.batching import MicroBatcher
+
+def test_single_item_round_trip():
+    batcher = MicroBatcher(lambda items: [x * 2 for x in items], max_wait_ms=0)
+    assert batcher(21) == 42
+    assert batcher.stats()["items"] == 1
+
+def test_concurrent_items_are_coalesced():
+    calls = []
+    release = threading.Event()
+
+    def batch_fn(items):
+        calls.append(list(items))
+        # Hold the first batch so the remaining submissions pile up behind it
+        release.wait(timeout=5)
+        return [x + 1 for x in items]
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=8, max_wait_ms=50)
+    futures = [batcher.submit(i) for i in range(20)]
+    release.set()
+
+    assert [f.result(timeout=5) for f in futures] == [i + 1 for i in range(20)]
+    assert all(len(batch) <= 8 for batch in calls)
+    assert len(calls) < 20
+
+    stats = batcher.stats()
+    assert stats["items"] == 20
+    assert stats["batches"] == len(calls)
+    assert sum(size * count for size, count in stats["batch_size_histogram"].items()) == 20
+    assert stats["queue_delay_ms"]["max"] >= 0
+
+def test_results_routed_to_callers_from_many_threads():
+    batcher = MicroBatcher(lambda items: [x * x for x in items], max_batch_size=16, max_wait_ms=5)
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(batcher, range(100)))
+    assert results == [x * x for x in range(100)]
+
+def test_batch_errors_propagate_to_every_caller():
+    def failing(items):
+        raise ValueError("encoder down")
+
+    batcher = MicroBatcher(failing, max_wait_ms=0)
+    with pytest.raises(ValueError, match="encoder down"):
+        batcher(1)
+
+def test_close_drains_queue_then_runs_inline():
+    calls = []
+
+    def batch_fn(items):
+        calls.append((threading.current_thread().name, list(items)))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=8, max_wait_ms=1, name="closing-batcher")
+    assert batcher(1) == 2
+    batcher.close()
+    batcher._worker.join(timeout=2)
+    assert not batcher._worker.is_alive()
+
+    assert batcher(3) == 6
+    assert calls[-1] == (threading.current_thread().name, [3])
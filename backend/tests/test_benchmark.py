@@ -0,0 +1,29 @@
+import pytest
+from backend.benchmark import run_benchmark, compare, format_results, make_restaurants, HashingEncoder
+
+@pytest.fixture(scope="module")
+def results():
+    return run_benchmark(rows=400, queries=10, concurrency=[1, 4], llm_latency_ms=1)
+
+def test_run_benchmark_reports_every_stage(results):
+    assert set(results["stages"]) == {"encode", "faiss_search", "search_restaurants", "get_recommendations"}
+    for stage in results["stages"].values():
+        assert stage["n"] == 10
+        assert stage["p50_ms"] <= stage["p95_ms"] <= stage["p99_ms"]
+    assert [row["concurrency"] for row in results["throughput"]] == [1, 4]
+    assert results["startup_s"] > 0
+    assert results["peak_rss_mb"]["end"] > 0
+    assert "req/s" in format_results(results)
+
+def test_compare_flags_regressions(results):
+    assert compare(results, results) == []
+
+    slower = {**results, "stages": {name: {**stage, "p95_ms": stage["p95_ms"] * 2 + 1}
+                                    for name, stage in results["stages"].items()}}
+    regressions = compare(slower, results)
+    assert {r["metric"] for r in regressions} == {f"stages.{name}.p95_ms" for name in results["stages"]}
+
+def test_synthetic_data_has_chains():
+    df = make_restaurants(500)
+    assert df["name"].duplicated().any()
+    assert HashingEncoder().encode(["Pizza in BTM"]).shape == (1, 384)
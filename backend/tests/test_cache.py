@@ -0,0 +1,76 @@
+import time
+import numpy as np
+from backend.utils.cache import LRUCache, SQLiteCache, TieredCache, normalize_query, make_key
+
+def test_normalize_query():
+    assert normalize_query("  North Indian   food in\tKoramangala ") == "north indian food in koramangala"
+    assert make_key(5, "pizza") == make_key(5, "pizza")
+    assert make_key(5, "pizza") != make_key(3, "pizza")
+
+def test_lru_eviction_and_counters():
+    cache = LRUCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" becomes most recently used
+    cache.set("c", 3)           # evicts "b"
+
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+    stats = cache.stats()
+    assert stats["size"] == 2
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["evictions"] == 1
+    assert stats["hit_ratio"] == round(2 / 3, 4)
+
+def test_lru_ttl_expiry():
+    cache = LRUCache(max_size=10, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+def test_sqlite_cache_survives_reopen(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SQLiteCache(path, "embeddings", max_size=10)
+    cache.set("pizza", np.arange(4, dtype='float32'))
+
+    reopened = SQLiteCache(path, "embeddings", max_size=10)
+    np.testing.assert_array_equal(reopened.get("pizza"), np.arange(4, dtype='float32'))
+    # Namespaces are isolated
+    assert SQLiteCache(path, "analyses").get("pizza") is None
+
+def test_sqlite_cache_evicts_least_recently_accessed(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"), "results", max_size=2, evict_every=1)
+    cache.set("a", 1)
+    time.sleep(0.01)
+    cache.set("b", 2)
+    time.sleep(0.01)
+    cache.get("a")
+    time.sleep(0.01)
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert len(cache) == 2
+    assert cache.stats()["evictions"] == 1
+
+def test_sqlite_cache_evicts_every_n_writes(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"), "results", max_size=1, evict_every=3)
+    for key in "ab":
+        cache.set(key, 1)
+    # No size check yet, so the tier runs over max_size until the third write
+    assert len(cache) == 2
+    cache.set("c", 1)
+    assert len(cache) == 1 and cache.get("c") == 1
+
+def test_tiered_cache_promotes_disk_hits(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    TieredCache("analyses", disk_path=path).set("k", "Great pizza!")
+
+    # A fresh process starts with an empty memory tier
+    cache = TieredCache("analyses", disk_path=path)
+    assert cache.get("k") == "Great pizza!"
+    assert cache.memory.get("k") == "Great pizza!"
+    assert cache.stats()["disk"]["hits"] == 1
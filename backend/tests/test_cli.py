@@ -47,3 +47,57 @@ def test_display_results_capsys(capsys):
     assert "TOP RESTAURANTS" in captured.out
     assert "Test Resto" in captured.out
     assert "Test Cuisine" in captured.out
+
+@patch('backend.cli_client.requests.post')
+def test_stream_recommendation_parses_sse(mock_post, capsys):
+    from backend.cli_client import stream_recommendation, display_stream
+
+    mock_response = MagicMock()
+    mock_response.iter_lines.return_value = [
+        'event: restaurants',
+        'data: {"restaurants": [{"name": "Test Resto", "cuisine": "Pizza"}]}',
+        '',
+        'event: token',
+        'data: {"text": "Great "}',
+        '',
+        'event: token',
+        'data: {"text": "choice!"}',
+        '',
+        'event: done',
+        'data: {"ai_analysis": "Great choice!"}',
+    ]
+    mock_post.return_value.__enter__.return_value = mock_response
+
+    events = list(stream_recommendation("Pizza", filters={"location": "BTM", "max_cost": None}))
+    assert [event for event, _ in events] == ["restaurants", "token", "token", "done"]
+    assert mock_post.call_args[1]["json"] == {"query": "Pizza", "top_k": 5, "location": "BTM"}
+
+    display_stream(events)
+    captured = capsys.readouterr()
+    assert "Test Resto" in captured.out
+    assert "Great choice!" in captured.out
+
+@patch('backend.cli_client.requests.post')
+def test_run_query_file_writes_ndjson(mock_post, tmp_path):
+    """Query files are sent in chunks and results keep their position in the file."""
+    import json
+    from backend.cli_client import run_query_file
+
+    def respond(url, **kwargs):
+        response = MagicMock()
+        response.__enter__.return_value = response
+        response.iter_lines.return_value = [
+            json.dumps({"index": i, "query": q, "restaurants": []}) for i, q in enumerate(kwargs["json"]["queries"])
+        ]
+        return response
+
+    mock_post.side_effect = respond
+    queries = tmp_path / "queries.txt"
+    queries.write_text("Pizza\n\nSushi\nBiryani\n")
+    output = tmp_path / "out.ndjson"
+
+    assert run_query_file(str(queries), output=str(output), chunk_size=2) == 3
+
+    items = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [(item["index"], item["query"]) for item in items] == [(0, "Pizza"), (1, "Sushi"), (2, "Biryani")]
+    assert mock_post.call_count == 2
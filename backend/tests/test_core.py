@@ -0,0 +1,315 @@
+import asyncio
+import numpy as np
+import pandas as pd
+import faiss
+import pytest
+from unittest.mock import patch
+from backend.core import RecommendationService
+from backend.utils.lexical import LexicalIndex
+
+class StubEncoder:
+    """Deterministic stand-in for SentenceTransformer: hashes each query into a vector."""
+    def __init__(self, dimension=8):
+        self.dimension = dimension
+        self.calls = 0
+
+    def encode(self, texts, **kwargs):
+        self.calls += 1
+        vectors = []
+        for text in texts:
+            rng = np.random.default_rng(sum(map(ord, text)))
+            vectors.append(rng.random(self.dimension))
+        return np.array(vectors, dtype='float32')
+
+@pytest.fixture
+def service():
+    names = ["Domino's", "Domino's", "Truffles", "Meghana Foods", "Empire", "Onesta"]
+    df = pd.DataFrame({
+        "name": names,
+        "cuisines": ["Pizza", "Pizza", "Burger", "Biryani", "North Indian", "Pizza"],
+        "location": ["BTM", "HSR", "Koramangala", "Jayanagar", "Indiranagar", "BTM"],
+        "rate": ["3.8/5", "3.9/5", "4.5/5", "4.4/5", "4.0/5", "4.1/5"],
+        "approx_cost(for_two_people)": ["400", "400", "900", "600", "800", "500"],
+        "url": [f"https://zomato.test/{i}" for i in range(len(names))],
+    })
+    encoder = StubEncoder()
+    index = faiss.IndexFlatL2(encoder.dimension)
+    index.add(encoder.encode(df["name"] + " " + df["location"]))
+
+    svc = RecommendationService()
+    svc.df_restaurants = df
+    svc.faiss_index = index
+    svc.embedding_model = encoder
+    svc.artifact_version = "test"
+    svc.loaded = True
+    return svc
+
+def test_health_reports_ready(service):
+    health = service.health()
+    assert health["ready"] is True
+    assert health["restaurants"] == 6
+
+def test_search_deduplicates_names(service):
+    results = service.search_restaurants("Domino's BTM", top_k=3)
+    names = [r["name"] for r in results]
+    assert len(names) == len(set(names))
+    assert {"name", "cuisine", "location", "rating", "cost", "url"} <= set(results[0])
+
+def test_repeated_queries_hit_caches(service):
+    first = service.search_restaurants("Truffles Koramangala", top_k=2)
+    calls = service.embedding_model.calls
+    second = service.search_restaurants("  truffles   koramangala ", top_k=2)
+
+    assert first == second
+    assert service.embedding_model.calls == calls
+    assert service.get_cache_stats()["results"]["memory"]["hits"] == 1
+
+def test_embedding_cache_is_per_encoder(service):
+    service._encode(["Truffles"])
+    # A different model or backend must not be served the first encoder's vectors
+    other = StubEncoder()
+    other.name = "onnx:all-MiniLM-L6-v2:int8"
+    service.embedding_model = other
+    service._encode(["Truffles"])
+    assert other.calls == 1
+
+@patch("backend.core.generate_restaurant_analysis", return_value="Try Truffles!")
+def test_get_recommendations_caches_analysis(mock_llm, service):
+    first = service.get_recommendations("Burgers", top_k=2)
+    second = service.get_recommendations("burgers", top_k=2)
+
+    assert first["ai_analysis"] == second["ai_analysis"] == "Try Truffles!"
+    mock_llm.assert_called_once()
+
+def test_aget_recommendations(service):
+    async def fake_analysis(query, restaurants, client=None):
+        return f"{len(restaurants)} picks"
+
+    with patch("backend.core.agenerate_restaurant_analysis", fake_analysis):
+        result = asyncio.run(service.aget_recommendations("Pizza BTM", top_k=2))
+
+    assert len(result["restaurants"]) == 2
+    assert result["ai_analysis"] == "2 picks"
+
+def test_request_timings_cover_executor_stages(service):
+    from backend.utils.metrics import request_timings
+
+    async def fake_analysis(query, restaurants, client=None):
+        return "ok"
+
+    service.batcher = None
+    with patch("backend.core.agenerate_restaurant_analysis", fake_analysis), request_timings() as timings:
+        asyncio.run(service.aget_recommendations("Pizza BTM", top_k=2, filters={"location": "BTM"}))
+
+    # Stages run on executor threads still land in the request's timings
+    assert {"retrieval", "filter", "encode", "faiss_search", "materialize"} <= set(timings)
+
+def test_missing_artifacts_return_error():
+    svc = RecommendationService()
+    svc.loaded = True
+    assert "error" in svc.get_recommendations("Pizza")
+    assert svc.health()["ready"] is False
+
+def test_search_widens_when_chains_fill_the_window():
+    # Ten branches of one chain sit right next to the query; distinct restaurants are further away
+    vectors = np.vstack([
+        np.full((10, 4), 0.01 * np.arange(10)[:, None], dtype='float32'),
+        np.full((3, 4), [[5.0], [6.0], [7.0]], dtype='float32'),
+    ])
+    names = ["Domino's"] * 10 + ["Truffles", "Empire", "Onesta"]
+    df = pd.DataFrame({"name": names, "url": [None] * len(names)})
+
+    class ZeroEncoder:
+        def encode(self, texts):
+            return np.zeros((len(texts), 4), dtype='float32')
+
+    svc = RecommendationService()
+    svc.df_restaurants = df
+    svc.faiss_index = faiss.IndexFlatL2(4)
+    svc.faiss_index.add(vectors)
+    svc.embedding_model = ZeroEncoder()
+    svc.loaded = True
+
+    results = svc.search_restaurants("pizza", top_k=3)
+    assert [r["name"] for r in results] == ["Domino's", "Truffles", "Empire"]
+
+    stats = svc.get_overfetch_stats()
+    assert stats["searches"] == 1
+    assert stats["widened"] == 1
+    assert stats["underfilled"] == 0
+
+def test_filtered_search_respects_structured_filters(service):
+    results = service.search_restaurants("Pizza", top_k=5, filters={"location": "BTM"})
+    assert results
+    assert all(r["location"] == "BTM" for r in results)
+
+    cheap = service.search_restaurants("Pizza", top_k=5, filters={"max_cost": 500, "min_rating": 4.0})
+    assert [r["name"] for r in cheap] == ["Onesta"]
+
+    assert service.search_restaurants("Pizza", top_k=5, filters={"location": "Whitefield"}) == []
+
+def test_filtered_search_uses_exact_scan_with_vectors(service):
+    service.vectors = np.vstack([service.faiss_index.reconstruct(i) for i in range(service.faiss_index.ntotal)])
+    results = service.search_restaurants("Truffles", top_k=2, filters={"location": "koramangala"})
+    assert [r["name"] for r in results] == ["Truffles"]
+
+def test_hybrid_search_brings_exact_name_matches_forward(service):
+    import backend.core as core
+
+    # The stub encoder's vectors carry no meaning, so only the lexical list can find "Meghana"
+    service.lexical_index = LexicalIndex.build(service.df_restaurants)
+    with patch.object(core, "RETRIEVAL_MODE", "hybrid"):
+        results = service.search_restaurants("Meghana", top_k=1)
+        assert [r["name"] for r in results] == ["Meghana Foods"]
+        assert service.health()["retrieval"] == "hybrid"
+
+        filtered = service.search_restaurants("Meghana Truffles", top_k=1, filters={"location": "Koramangala"})
+        assert [r["name"] for r in filtered] == ["Truffles"]
+    assert service.health()["retrieval"] == "vector"
+
+def test_hybrid_search_finds_names_outside_the_vector_shortlist():
+    import backend.core as core
+
+    df = pd.DataFrame({
+        "name": [f"Cafe {i}" for i in range(199)] + ["Zzyzx Kitchen"],
+        "cuisines": ["Cafe"] * 200,
+        "location": ["BTM"] * 200,
+    })
+    encoder = StubEncoder()
+    index = faiss.IndexFlatL2(encoder.dimension)
+    index.add(encoder.encode((df["name"] + " " + df["location"]).tolist()))
+    svc = RecommendationService(embedding_model=encoder)
+    svc.df_restaurants, svc.faiss_index, svc.loaded = df, index, True
+    svc.lexical_index = LexicalIndex.build(df)
+
+    # Vector search alone doesn't shortlist it among 200 rows...
+    assert "Zzyzx Kitchen" not in [r["name"] for r in svc.search_restaurants("Zzyzx Kitchen", top_k=3)]
+    # ...but the keyword list brings it into the hybrid results
+    with patch.object(core, "RETRIEVAL_MODE", "hybrid"):
+        results = svc.search_restaurants("Zzyzx Kitchen", top_k=3)
+    assert "Zzyzx Kitchen" in [r["name"] for r in results[:2]]
+
+class WordEncoder:
+    """Bag-of-words encoder over a fixed vocabulary, so vector search respects cuisine and location."""
+    def __init__(self, vocabulary):
+        self.vocabulary = [w.lower() for w in vocabulary]
+        self.dimension = len(self.vocabulary)
+
+    def encode(self, texts, **kwargs):
+        vectors = np.zeros((len(texts), self.dimension), dtype='float32')
+        for i, text in enumerate(texts):
+            words = text.lower().replace(",", " ").split()
+            for j, term in enumerate(self.vocabulary):
+                vectors[i, j] = words.count(term)
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+
+def test_hybrid_search_keeps_location_precision():
+    import backend.core as core
+
+    locations, cuisines = ["BTM", "HSR", "Whitefield", "Bellandur"], ["Pizza", "Biryani", "Chinese"]
+    rows = [(f"{c} Place {l} {i}", c, l) for l in locations for c in cuisines for i in range(4)]
+    df = pd.DataFrame(rows, columns=["name", "cuisines", "location"])
+    encoder = WordEncoder(locations + cuisines)
+    index = faiss.IndexFlatL2(encoder.dimension)
+    index.add(encoder.encode((df["cuisines"] + " " + df["location"]).tolist()))
+
+    svc = RecommendationService(embedding_model=encoder)
+    svc.df_restaurants, svc.faiss_index, svc.loaded = df, index, True
+    svc.lexical_index = LexicalIndex.build(df)
+    with patch.object(core, "RETRIEVAL_MODE", "hybrid"):
+        for location in locations:
+            for cuisine in cuisines:
+                results = svc.search_restaurants(f"{cuisine} food in {location}", top_k=3)
+                assert [r["location"] for r in results] == [location] * 3
+                assert [r["cuisine"] for r in results] == [cuisine] * 3
+
+def test_stream_recommendations_sends_restaurants_first(service):
+    with patch("backend.core.stream_restaurant_analysis", return_value=iter(["Try ", "Truffles!"])):
+        events = list(service.stream_recommendations("Burgers", top_k=2))
+
+    assert events[0][0] == "restaurants"
+    assert [payload for kind, payload in events if kind == "token"] == ["Try ", "Truffles!"]
+    assert events[-1] == ("done", "Try Truffles!")
+
+    # The streamed analysis is cached like a regular one
+    again = list(service.stream_recommendations("Burgers", top_k=2))
+    assert ("token", "Try Truffles!") in again
+
+def test_search_restaurants_batch_matches_single_queries(service):
+    queries = ["Domino's BTM", "Truffles Koramangala", "Empire Indiranagar"]
+    expected = [service.search_restaurants(q, top_k=2) for q in queries]
+    service.results_cache = None
+    assert service.search_restaurants_batch(queries, top_k=2) == expected
+
+    # Unseen queries are encoded in one call
+    calls = service.embedding_model.calls
+    service.search_restaurants_batch(["Pizza HSR", "Biryani Jayanagar", "Burgers"], top_k=2)
+    assert service.embedding_model.calls == calls + 1
+
+    filtered = service.search_restaurants_batch(["Pizza", "Burger"], top_k=3, filters={"location": "BTM"})
+    assert all(r["location"] == "BTM" for results in filtered for r in results)
+
+@patch("backend.core.generate_restaurant_analysis", side_effect=lambda q, r, client=None: f"{q}: {len(r)}")
+def test_iter_recommendations_batch(mock_llm, service):
+    items = list(service.iter_recommendations_batch(["Pizza", "Burger"], top_k=2))
+    assert [item["index"] for item in items] == [0, 1]
+    assert "ai_analysis" not in items[0]
+    mock_llm.assert_not_called()
+
+    items = list(service.iter_recommendations_batch(["Pizza", "Burger"], top_k=2, analysis=True, concurrency=2))
+    assert [item["ai_analysis"] for item in items] == ["Pizza: 2", "Burger: 2"]
+
+def test_aiter_recommendations_batch_with_analysis(service):
+    async def fake_analysis(query, restaurants, client=None):
+        return f"{query}!"
+
+    async def collect():
+        return [item async for item in service.aiter_recommendations_batch(
+            ["Pizza", "Burger", "Biryani"], top_k=2, analysis=True, concurrency=2
+        )]
+
+    with patch("backend.core.agenerate_restaurant_analysis", fake_analysis):
+        items = asyncio.run(collect())
+    assert sorted((item["index"], item["ai_analysis"]) for item in items) == [
+        (0, "Pizza!"), (1, "Burger!"), (2, "Biryani!")
+    ]
+
+def test_warm_up_in_background_returns_before_loading():
+    import threading
+    import backend.core as core
+
+    release = threading.Event()
+    with patch.object(core, "_rec_service", None), \
+         patch.object(RecommendationService, "_load_resources", lambda self: release.wait(5)):
+        service = core.warm_up_in_background()
+        assert service is core.get_rec_service(load=False)
+        assert service.loaded is False
+        release.set()
+
+def test_reload_swaps_in_new_generation(tmp_path):
+    import backend.core as core
+    from backend.ingest_data import ingest_data
+
+    def restaurants(names):
+        return pd.DataFrame({
+            "name": names, "cuisines": ["Pizza"] * len(names), "location": ["BTM"] * len(names),
+            "rest_type": ["Cafe"] * len(names), "url": [None] * len(names),
+        })
+
+    encoder = StubEncoder()
+    ingest_data(df=restaurants(["Truffles", "Empire"]), data_dir=str(tmp_path), model=encoder)
+    old = RecommendationService(data_dir=str(tmp_path), embedding_model=encoder)
+    old.load_resources()
+
+    with patch.object(core, "_rec_service", old):
+        assert core.reload_rec_service() == (old, False)
+
+        ingest_data(df=restaurants(["Truffles", "Empire", "Onesta"]), data_dir=str(tmp_path), model=encoder)
+        new, swapped = core.reload_rec_service()
+        assert swapped and core.get_rec_service(load=False) is new
+        assert new.generation != old.generation
+        assert new.embedding_model is old.embedding_model and new.results_cache is old.results_cache
+        assert "Onesta" in [r["name"] for r in new.search_restaurants("Onesta BTM", top_k=3)]
+
+        # Requests still holding the retired service keep working on its generation
+        assert len(old.search_restaurants("Pizza", top_k=5)) == 2
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+from backend.utils.encoders import mean_pool, parity_check, load_encoder
+
+class FixedEncoder:
+    def __init__(self, vectors):
+        self.vectors = np.asarray(vectors, dtype=np.float32)
+
+    def encode(self, texts):
+        return self.vectors[:len(texts)]
+
+def test_mean_pool_ignores_padding_and_normalizes():
+    hidden = np.array([[[1.0, 0.0], [3.0, 0.0], [100.0, 100.0]]], dtype=np.float32)
+    mask = np.array([[1, 1, 0]])
+
+    assert np.allclose(mean_pool(hidden, mask, normalize=False), [[2.0, 0.0]])
+    assert np.allclose(mean_pool(hidden, mask), [[1.0, 0.0]])
+
+def test_parity_check():
+    reference = FixedEncoder([[1.0, 0.0], [0.0, 1.0]])
+    close = FixedEncoder([[0.999, 0.01], [0.0, 1.0]])
+    far = FixedEncoder([[0.0, 1.0], [0.0, 1.0]])
+
+    report = parity_check(reference, close, ["a", "b"])
+    assert report["passed"] is True
+    assert report["min_cosine"] > 0.99
+
+    report = parity_check(reference, far, ["a", "b"])
+    assert report["passed"] is False
+    assert report["min_cosine"] == pytest.approx(0.0)
+
+def test_load_encoder_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        load_encoder("tensorrt")
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import faiss
+import pytest
+from backend.utils.features import parse_rating, parse_number
+from backend.utils.filters import FilterIndex, normalize_filters, describe_query
+from backend.utils.vector_index import build_index, search_selected, search_subset
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        "name": ["Truffles", "Meghana Foods", "Empire", "Onesta"],
+        "location": ["Koramangala 5th Block", "Jayanagar", "Koramangala 7th Block", None],
+        "rest_type": ["Casual Dining, Bar", "Casual Dining", "Quick Bites", "Bar"],
+        "rate": ["4.5/5", "4.4 /5", "NEW", "-"],
+        "approx_cost(for_two_people)": ["900", "1,200", "400", None],
+    })
+
+def test_parse_numeric_columns():
+    np.testing.assert_allclose(parse_rating(["4.5/5", "3.9 /5", "NEW", None]), [4.5, 3.9, np.nan, np.nan])
+    np.testing.assert_allclose(parse_number(["1,200", "300", "", None]), [1200, 300, np.nan, np.nan])
+    np.testing.assert_allclose(parse_number([12, "4,005", "n/a"]), [12, 4005, np.nan])
+
+def test_location_matches_every_block(df):
+    selection = FilterIndex(df).select({"location": "koramangala"})
+    assert list(selection.ids) == [0, 2]
+
+def test_filters_combine(df):
+    index = FilterIndex(df)
+    assert list(index.select({"rest_type": "Bar"}).ids) == [0, 3]
+    assert list(index.select({"rest_type": "casual dining", "max_cost": 1000}).ids) == [0]
+    assert list(index.select({"min_rating": 4.4}).ids) == [0, 1]
+    assert index.select({"location": "Whitefield"}).count == 0
+
+def test_term_cache_is_bounded(df):
+    index = FilterIndex(df, term_cache_size=2)
+    for term in ["koramangala", "block", "nowhere", "jaya"]:
+        index.select({"location": term})
+    assert len(index._term_cache) == 2
+    # Evicted terms still resolve correctly
+    assert list(index.select({"location": "koramangala"}).ids) == [0, 2]
+
+def test_empty_filters_select_nothing_special(df):
+    assert FilterIndex(df).select({"location": "", "max_cost": None}) is None
+    assert normalize_filters({"location": "", "min_rating": 4}) == {"min_rating": 4}
+
+def test_describe_query():
+    assert describe_query("Pizza", None) == "Pizza"
+    assert describe_query("Pizza", {"location": "BTM", "max_cost": 500}) == "Pizza (location: BTM, max cost for two: 500)"
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf_flat", "hnsw"])
+def test_selected_search_only_returns_selected_rows(index_type):
+    vectors = np.random.default_rng(0).random((2000, 16), dtype='float32')
+    index, _ = build_index(vectors, index_type=index_type, nlist=8, nprobe=8)
+    mask = np.zeros(len(vectors), dtype=bool)
+    mask[::10] = True
+
+    _, ids = search_selected(index, vectors[:3], 5, mask)
+    assert (ids % 10 == 0).all()
+
+    _, exact_ids = search_subset(vectors, np.flatnonzero(mask), vectors[:3], 5)
+    assert (exact_ids % 10 == 0).all()
+    # vectors[0] is itself selected, so it is its own nearest neighbour
+    assert exact_ids[0, 0] == 0
+    if index_type == "flat":
+        np.testing.assert_array_equal(ids, exact_ids)
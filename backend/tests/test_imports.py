@@ -0,0 +1,31 @@
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+HEAVY_MODULES = ["faiss", "torch", "sentence_transformers", "groq", "streamlit"]
+
+def run_python(code):
+    return subprocess.run(
+        [sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+
+def test_cli_client_imports_quickly():
+    # Best of three, so one slow cold disk read doesn't fail the budget
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        run_python("import backend.cli_client")
+        best = min(best, time.perf_counter() - start)
+    assert best < 1.0, f"backend.cli_client took {best:.2f}s to import"
+
+def test_imports_do_not_load_heavy_dependencies():
+    code = (
+        "import sys, json\n"
+        "import backend.cli_client, backend.core, backend.main\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))\n"
+    )
+    loaded = json.loads(run_python(code).stdout.strip().splitlines()[-1])
+    assert loaded == []
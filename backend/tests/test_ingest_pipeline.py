@@ -0,0 +1,93 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from backend.ingest_data import (
+    build_combined_text, hash_texts, lookup_hashes, ingest_data, CHECKPOINT_DIRNAME
+)
+from backend.utils.artifacts import load_metadata_table, load_vectors, current_generation, generation_dir
+from backend.utils.vector_index import load_index, read_index_meta
+
+class CountingEncoder:
+    """Deterministic stand-in for SentenceTransformer that records what it embeds."""
+    def __init__(self, dim=8):
+        self.dim = dim
+        self.seen = []
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        self.seen.extend(texts)
+        rows = [np.random.default_rng(abs(hash(t)) % (2 ** 32)).random(self.dim) for t in texts]
+        return np.asarray(rows, dtype='float32').reshape(len(texts), self.dim)
+
+def make_df(names):
+    return pd.DataFrame({
+        "name": names,
+        "cuisines": ["Pizza"] * len(names),
+        "location": ["BTM"] * len(names),
+        "rest_type": [None] * len(names),
+        "url": [f"http://z/{n}" for n in names],
+    })
+
+def test_build_combined_text_matches_row_format():
+    df = make_df(["A"])
+    assert build_combined_text(df).iloc[0] == "Name: A. Cuisine: Pizza. Location: BTM. Type: "
+
+def test_lookup_hashes():
+    known = hash_texts(["a", "b", "c"])
+    found = lookup_hashes(known, hash_texts(["c", "x", "a"]))
+    assert found.tolist() == [2, -1, 0]
+
+def test_incremental_run_embeds_only_new_rows(tmp_path):
+    encoder = CountingEncoder()
+    ingest_data(df=make_df(["A", "B", "B"]), data_dir=str(tmp_path), model=encoder, chunk_size=1)
+    # Duplicate rows share one embedding
+    assert len(encoder.seen) == 2
+    first_generation = current_generation(str(tmp_path))
+    first_vectors = np.array(load_vectors(os.path.join(generation_dir(str(tmp_path)), "vectors.npy")))
+
+    encoder.seen.clear()
+    ingest_data(df=make_df(["A", "B", "B", "C"]), data_dir=str(tmp_path), model=encoder)
+    assert encoder.seen == ["Name: C. Cuisine: Pizza. Location: BTM. Type: "]
+
+    # The second run is published as a new generation; the first one is left intact
+    assert current_generation(str(tmp_path)) > first_generation
+    out_dir = generation_dir(str(tmp_path))
+    vectors = load_vectors(os.path.join(out_dir, "vectors.npy"))
+    np.testing.assert_array_equal(vectors[:3], first_vectors)
+    index, _ = load_index(os.path.join(out_dir, "faiss_index.bin"))
+    assert index.ntotal == 4
+    assert load_metadata_table(os.path.join(out_dir, "restaurants.arrow")).num_rows == 4
+    assert load_metadata_table(os.path.join(generation_dir(str(tmp_path), first_generation), "restaurants.arrow")).num_rows == 3
+    assert not os.path.exists(tmp_path / CHECKPOINT_DIRNAME)
+
+def test_incremental_run_keeps_configured_index_params(tmp_path, monkeypatch):
+    encoder = CountingEncoder()
+    ingest_data(df=make_df(["A", "B"]), data_dir=str(tmp_path), model=encoder, index_type="hnsw", m=8)
+
+    # A load-time override must not be written back by the append path
+    monkeypatch.setenv("FAISS_EF_SEARCH", "7")
+    ingest_data(df=make_df(["A", "B", "C"]), data_dir=str(tmp_path), model=encoder, index_type="hnsw", m=8)
+    index_file = os.path.join(generation_dir(str(tmp_path)), "faiss_index.bin")
+    meta = read_index_meta(index_file)
+    assert meta["ntotal"] == 3 and meta["search_params"] == {"efSearch": 64}
+
+    # Changed build parameters rebuild the index instead of appending to the old graph
+    ingest_data(df=make_df(["A", "B", "C", "D"]), data_dir=str(tmp_path), model=encoder, index_type="hnsw", m=16)
+    index_file = os.path.join(generation_dir(str(tmp_path)), "faiss_index.bin")
+    assert read_index_meta(index_file)["build_params"]["m"] == 16
+    assert load_index(index_file)[0].ntotal == 4
+
+def test_resumes_from_checkpoint(tmp_path):
+    class FailingEncoder(CountingEncoder):
+        def encode(self, texts, **kwargs):
+            if len(self.seen) >= 1:
+                raise RuntimeError("crash")
+            return super().encode(texts, **kwargs)
+
+    with pytest.raises(RuntimeError):
+        ingest_data(df=make_df(["A", "B"]), data_dir=str(tmp_path), model=FailingEncoder(), chunk_size=1)
+
+    encoder = CountingEncoder()
+    ingest_data(df=make_df(["A", "B"]), data_dir=str(tmp_path), model=encoder, chunk_size=1)
+    # Chunk "A" was checkpointed before the crash
+    assert len(encoder.seen) == 1
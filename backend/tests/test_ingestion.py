@@ -2,22 +2,42 @@ import os
 import pytest
 import pandas as pd
 import faiss
-from backend.ingest_data import DATA_DIR, METADATA_FILE, INDEX_FILE
+import numpy as np
+import pyarrow as pa
+from backend.ingest_data import DATA_DIR
+from backend.utils.artifacts import load_metadata_table, load_vectors, generation_dir, METADATA_TABLE_FILE, VECTORS_FILE as VECTORS_FILE_NAME
+
+# Artifacts of the generation currently published in DATA_DIR
+METADATA_FILE = os.path.join(generation_dir(DATA_DIR), METADATA_TABLE_FILE)
+VECTORS_FILE = os.path.join(generation_dir(DATA_DIR), VECTORS_FILE_NAME)
+INDEX_FILE = os.path.join(generation_dir(DATA_DIR), "faiss_index.bin")
 
 def test_data_artifacts_exist():
     """Test if ingestion script created necessary files."""
     assert os.path.exists(DATA_DIR), "Data directory missing"
-    assert os.path.exists(METADATA_FILE), "Metadata pickle file missing"
+    assert os.path.exists(METADATA_FILE), "Metadata table missing"
+    assert os.path.exists(VECTORS_FILE), "Vectors file missing"
     assert os.path.exists(INDEX_FILE), "FAISS index file missing"
 
 def test_metadata_integrity():
     """Test if metadata can be loaded and has correct columns."""
-    df = pd.read_pickle(METADATA_FILE)
-    assert not df.empty, "Metadata DataFrame is empty"
+    table = load_metadata_table(METADATA_FILE)
+    assert table.num_rows > 0, "Metadata table is empty"
     
-    expected_cols = ['name', 'url', 'combined_text']
+    expected_cols = ['name', 'url', 'text_hash']
     for col in expected_cols:
-        assert col in df.columns, f"Missing column: {col}"
+        assert col in table.column_names, f"Missing column: {col}"
+    # Embedding text is ingest-only; repetitive columns are dictionary-encoded
+    assert 'combined_text' not in table.column_names
+    assert pa.types.is_dictionary(table.schema.field('location').type)
+
+def test_vectors_match_index():
+    """Test if the mapped vectors line up with the metadata and index."""
+    vectors = load_vectors(VECTORS_FILE)
+    assert isinstance(vectors, np.memmap)
+    assert vectors.dtype == np.float32
+    assert vectors.shape[0] == load_metadata_table(METADATA_FILE).num_rows
+    assert vectors.shape[0] == faiss.read_index(INDEX_FILE).ntotal
 
 def test_faiss_index_integrity():
     """Test if FAISS index is readable and has correct dimensions."""
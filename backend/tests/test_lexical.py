@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+from backend.utils.lexical import LexicalIndex, reciprocal_rank_fusion, tokenize
+
+def make_df():
+    return pd.DataFrame({
+        "name": ["Truffles", "Meghana Foods", "Empire", "Burger King"],
+        "cuisines": ["Burger, American", "Biryani, Andhra", "North Indian, Biryani", "Burger, Fast Food"],
+        "rest_type": ["Cafe", "Casual Dining", "Quick Bites", "Quick Bites"],
+        "dish_liked": ["Cheese Burger, Fries", None, "Ghee Rice, Kebab", ""],
+    }, index=[10, 11, 12, 13])
+
+def test_tokenize():
+    assert tokenize("Domino's Pizza, BTM-2") == ["domino", "s", "pizza", "btm", "2"]
+
+def test_search_prefers_name_matches():
+    index = LexicalIndex.build(make_df())
+    assert index.search("Truffles burger", 4).tolist()[0] == 0
+    assert index.search("Meghana biryani", 2).tolist()[0] == 1
+    assert index.search("sushi", 3).size == 0
+
+    # Rows outside the mask are never returned
+    mask = np.array([False, False, True, True])
+    assert set(index.search("burger biryani", 4, mask=mask).tolist()) <= {2, 3}
+
+def test_save_and_load_round_trip(tmp_path):
+    index = LexicalIndex.build(make_df())
+    path = str(tmp_path / "lexical_index.npz")
+    index.save(path)
+    loaded = LexicalIndex.load(path)
+    np.testing.assert_allclose(loaded.scores("ghee rice"), index.scores("ghee rice"))
+
+def test_reciprocal_rank_fusion():
+    # 2 is in both lists; -1 padding is dropped
+    assert reciprocal_rank_fusion([[0, 1, 2, -1], [2, 3]]).tolist() == [2, 0, 1, 3]
+    assert reciprocal_rank_fusion([[5, 6], [7]], limit=2).tolist() == [5, 7]
+    # A down-weighted second list only breaks near-ties in the first
+    assert reciprocal_rank_fusion([[0, 1, 2], [2, 3]], weights=[1.0, 0.02]).tolist() == [0, 2, 1, 3]
+
+def test_subset_renumbers_rows_and_keeps_scores():
+    index = LexicalIndex.build(make_df())
+    subset = index.subset(np.array([1, 3]))
+    assert subset.n_docs == 2
+    # Meghana Foods (row 1) and Burger King (row 3) are now rows 0 and 1
+    assert sorted(subset.search("burger biryani", 4).tolist()) == [0, 1]
+    np.testing.assert_allclose(subset.scores("burger biryani"), index.scores("burger biryani")[[1, 3]])
@@ -36,3 +36,91 @@ def test_generate_analysis_exception():
     result = generate_restaurant_analysis("Pizza", [], client=mock_client)
     assert "Error generating analysis" in result
     assert "API Error" in result
+
+def test_agenerate_analysis_success():
+    import asyncio
+    from unittest.mock import AsyncMock
+    from backend.utils.llm_service import agenerate_restaurant_analysis
+
+    mock_client = MagicMock()
+    mock_completion = MagicMock()
+    mock_completion.choices[0].message.content = "Async pizza places!"
+    mock_client.chat.completions.create = AsyncMock(return_value=mock_completion)
+
+    restaurants = [
+        {"name": "Pizza Hut", "cuisine": "Italian", "location": "BTM", "rating": "4.0", "cost": "500"}
+    ]
+
+    result = asyncio.run(agenerate_restaurant_analysis("Pizza", restaurants, client=mock_client))
+
+    assert result == "Async pizza places!"
+    call_args = mock_client.chat.completions.create.call_args
+    assert "Pizza Hut" in call_args[1]['messages'][0]['content']
+
+def test_agenerate_analysis_timeout():
+    import asyncio
+    from backend.utils.llm_service import agenerate_restaurant_analysis
+
+    async def slow_create(**kwargs):
+        await asyncio.sleep(1)
+
+    mock_client = MagicMock()
+    mock_client.chat.completions.create = slow_create
+
+    result = asyncio.run(agenerate_restaurant_analysis("Pizza", [], client=mock_client, timeout=0.01))
+    assert "timed out" in result
+
+def _chunk(text):
+    chunk = MagicMock()
+    chunk.choices[0].delta.content = text
+    return chunk
+
+def test_stream_analysis_yields_chunks():
+    from backend.utils.llm_service import stream_restaurant_analysis
+
+    mock_client = MagicMock()
+    mock_client.chat.completions.create.return_value = iter([_chunk("Great "), _chunk(None), _chunk("pizza!")])
+
+    chunks = list(stream_restaurant_analysis("Pizza", [], client=mock_client))
+    assert chunks == ["Great ", "pizza!"]
+    assert mock_client.chat.completions.create.call_args[1]["stream"] is True
+
+def test_astream_analysis_yields_chunks():
+    import asyncio
+    from unittest.mock import AsyncMock
+    from backend.utils.llm_service import astream_restaurant_analysis
+
+    async def fake_stream():
+        for text in ["Async ", "pizza!"]:
+            yield _chunk(text)
+
+    mock_client = MagicMock()
+    mock_client.chat.completions.create = AsyncMock(return_value=fake_stream())
+
+    async def collect():
+        return [text async for text in astream_restaurant_analysis("Pizza", [], client=mock_client)]
+
+    assert asyncio.run(collect()) == ["Async ", "pizza!"]
+
+def test_analysis_sends_max_tokens_and_records_usage():
+    from backend.utils.metrics import LLM_USAGE
+    from backend.utils.prompts import output_budget
+
+    class Usage:
+        prompt_tokens = 150
+        completion_tokens = 60
+
+    mock_client = MagicMock()
+    mock_completion = MagicMock()
+    mock_completion.choices[0].message.content = "Try Pizza Hut."
+    mock_completion.usage = Usage()
+    mock_client.chat.completions.create.return_value = mock_completion
+    restaurants = [{"name": "Pizza Hut", "cuisine": "Italian", "location": "BTM", "rating": "4.0", "cost": "500"}] * 3
+
+    before = LLM_USAGE.stats()["calls"]
+    generate_restaurant_analysis("Pizza", restaurants, client=mock_client)
+
+    assert mock_client.chat.completions.create.call_args[1]["max_tokens"] == output_budget(3)
+    stats = LLM_USAGE.stats()
+    assert stats["calls"] == before + 1
+    assert stats["p95_ms"] is not None and "prompt_estimate_ratio" in stats
@@ -0,0 +1,117 @@
+import time
+import asyncio
+import pytest
+from types import SimpleNamespace
+from backend.utils.llm_gateway import (
+    LLMGateway, AsyncLLMGateway, CircuitBreaker, LLMUnavailableError, template_summary, FALLBACK_PREFIX
+)
+from backend.utils.llm_service import generate_restaurant_analysis
+
+class APIError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+def completion(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+class ScriptedClient:
+    """Groq-shaped client that plays back a list of (delay, result or exception) steps."""
+    def __init__(self, steps):
+        self.steps = list(steps)
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        delay, outcome = self.steps[min(self.calls, len(self.steps) - 1)]
+        self.calls += 1
+        time.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return completion(outcome)
+
+class AsyncScriptedClient(ScriptedClient):
+    async def create(self, **kwargs):
+        delay, outcome = self.steps[min(self.calls, len(self.steps) - 1)]
+        self.calls += 1
+        await asyncio.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return completion(outcome)
+
+def gateway(client, cls=LLMGateway, **kwargs):
+    options = {"deadline": 2.0, "max_retries": 2, "backoff_base": 0.001, "hedge": False}
+    options.update(kwargs)
+    return cls(client, **options)
+
+def test_retries_transient_errors():
+    client = ScriptedClient([(0, APIError(503)), (0, TimeoutError()), (0, "ok")])
+    gw = gateway(client)
+    assert gw.chat.completions.create(messages=[], model="m").choices[0].message.content == "ok"
+    assert client.calls == 3
+    assert gw.stats()["retries"] == 2
+
+def test_client_errors_are_not_retried():
+    client = ScriptedClient([(0, APIError(401))])
+    gw = gateway(client)
+    with pytest.raises(APIError):
+        gw.create(messages=[], model="m")
+    assert client.calls == 1
+    assert gw.breaker.state == CircuitBreaker.CLOSED
+
+def test_deadline_bounds_slow_calls():
+    gw = gateway(ScriptedClient([(1.0, "late")]), deadline=0.05, max_retries=0)
+    start = time.monotonic()
+    with pytest.raises(LLMUnavailableError):
+        gw.create(messages=[], model="m")
+    assert time.monotonic() - start < 0.5
+
+def test_circuit_opens_and_recovers():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    client = ScriptedClient([(0, APIError(500))])
+    gw = gateway(client, max_retries=0, breaker=breaker)
+    for _ in range(2):
+        with pytest.raises(LLMUnavailableError):
+            gw.create(messages=[], model="m")
+    assert breaker.state == CircuitBreaker.OPEN
+
+    calls = client.calls
+    with pytest.raises(LLMUnavailableError, match="circuit open"):
+        gw.create(messages=[], model="m")
+    assert client.calls == calls
+
+    time.sleep(0.06)
+    client.steps = [(0, "back")]
+    assert gw.create(messages=[], model="m").choices[0].message.content == "back"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_hedge_after_p95():
+    client = ScriptedClient([(0.5, "slow"), (0, "fast")])
+    gw = gateway(client, hedge=True, hedge_min_samples=3)
+    for _ in range(3):
+        gw.latency.add(0.01)
+
+    start = time.monotonic()
+    assert gw.create(messages=[], model="m").choices[0].message.content == "fast"
+    assert time.monotonic() - start < 0.4
+    assert gw.stats()["hedge_wins"] == 1
+
+def test_async_hedge_and_retry():
+    client = AsyncScriptedClient([(0, APIError(429)), (0.5, "slow"), (0, "fast")])
+    gw = gateway(client, cls=AsyncLLMGateway, hedge=True, hedge_min_samples=1)
+    gw.latency.add(0.01)
+
+    result = asyncio.run(gw.create(messages=[], model="m"))
+    assert result.choices[0].message.content == "fast"
+    stats = gw.stats()
+    assert stats["retries"] == 1
+    assert stats["hedges"] == 1
+
+def test_analysis_falls_back_to_template():
+    gw = gateway(ScriptedClient([(0, APIError(502))]), max_retries=0)
+    restaurants = [{"name": "Truffles", "cuisine": "Burger", "location": "Koramangala", "rating": "4.5", "cost": "900"}]
+
+    text = generate_restaurant_analysis("Burgers", restaurants, client=gw)
+    assert text.startswith(FALLBACK_PREFIX)
+    assert "Truffles" in text
+    assert template_summary("Burgers", []).startswith(FALLBACK_PREFIX)
@@ -0,0 +1,63 @@
+import pytest
+from backend.utils.metrics import (
+    MetricsRegistry, span, request_timings, format_server_timing, record_llm_usage, LLM_TOKENS, STAGE_SECONDS,
+    LLMUsageStats
+)
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "Latency.", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, stage="encode")
+
+    text = registry.render()
+    assert '# TYPE latency_seconds histogram' in text
+    assert 'latency_seconds_bucket{stage="encode",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{stage="encode",le="1"} 2' in text
+    assert 'latency_seconds_bucket{stage="encode",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{stage="encode"} 3' in text
+
+def test_labels_are_checked():
+    registry = MetricsRegistry()
+    counter = registry.counter("hits_total", "Hits.", ["cache"])
+    with pytest.raises(ValueError):
+        counter.inc(tier="memory")
+    with pytest.raises(ValueError):
+        registry.counter("hits_total", "Again.")
+
+def test_spans_fill_request_timings():
+    before = (STAGE_SECONDS.snapshot(stage="unit") or {"count": 0})["count"]
+    with request_timings() as timings:
+        with span("unit"):
+            pass
+        with span("unit"):
+            pass
+    with span("unit"):
+        pass
+
+    assert list(timings) == ["unit"]
+    assert STAGE_SECONDS.snapshot(stage="unit")["count"] == before + 3
+    assert format_server_timing({"encode": 0.0015}) == "encode;dur=1.50"
+
+def test_record_llm_usage():
+    class Usage:
+        prompt_tokens = 120
+        completion_tokens = 30
+
+    before = LLM_TOKENS.value(kind="prompt")
+    record_llm_usage(Usage())
+    record_llm_usage(None)
+    assert LLM_TOKENS.value(kind="prompt") == before + 120
+
+def test_llm_usage_stats():
+    usage = LLMUsageStats(window=100)
+    assert usage.stats() == {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "seconds": 0.0, "window": 0}
+    for i in range(1, 21):
+        usage.record(i / 10, prompt_tokens=200, completion_tokens=100 if i % 4 else 150, estimated_prompt_tokens=100,
+                     max_tokens=150)
+
+    stats = usage.stats()
+    assert stats["calls"] == 20 and stats["prompt_tokens"] == 4000
+    assert stats["p50_ms"] == 1000.0 and stats["p95_ms"] == 1900.0
+    assert stats["hit_max_tokens_ratio"] == 0.25
+    assert stats["prompt_estimate_ratio"] == 2.0
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+from unittest.mock import patch
+import backend.utils.multivector as multivector
+from backend.utils.multivector import clean_text, iter_chunks, max_sim, build_chunk_index, ChunkIndex
+from backend.tests.test_core import StubEncoder
+
+REVIEWS = "[('Rated 4.0', 'RATED\\n  Amazing ghee roast and filter coffee'), ('Rated 2.0', 'RATED\\n  Slow service')]"
+
+def make_df():
+    return pd.DataFrame({
+        "name": ["Truffles", "Empire", "Onesta"],
+        "cuisines": ["Burger", "North Indian", "Pizza"],
+        "location": ["Koramangala", "BTM", "BTM"],
+        "rest_type": ["Cafe"] * 3,
+        "url": [None] * 3,
+        "reviews_list": [REVIEWS, "[]", None],
+        "menu_item": ["[]", "['Chicken Biryani', 'Kebab Platter']", "[]"],
+    })
+
+def test_clean_text():
+    assert clean_text(REVIEWS) == "Amazing ghee roast and filter coffee Slow service"
+    assert clean_text("[]") == ""
+    assert clean_text(None) == ""
+
+def test_iter_chunks_caps_per_restaurant():
+    chunks = list(iter_chunks(make_df(), words=3, max_chunks=2))
+    assert chunks == [(0, "Review: Amazing ghee roast"), (0, "Review: and filter coffee"),
+                      (1, "Menu: Chicken Biryani Kebab"), (1, "Menu: Platter")]
+
+def test_max_sim_keeps_each_restaurants_best_match():
+    rows = (np.array([[0.4, 0.9]], dtype='float32'), np.array([[5, 6]]))
+    chunks = (np.array([[0.1, 0.2, 0.3]], dtype='float32'), np.array([[6, 6, -1]]))
+    distances, indices = max_sim([rows, chunks], 3)
+    assert indices.tolist() == [[6, 5, -1]]
+    np.testing.assert_allclose(distances[0, :2], [0.1, 0.4])
+
+def test_chunk_index_is_built_in_blocks(tmp_path):
+    vectors = np.random.default_rng(0).random((600, 8), dtype=np.float32)
+    with patch.object(multivector, "CHUNK_MIN_ANN_ROWS", 100):
+        index, meta = build_chunk_index(vectors, str(tmp_path / "chunk_index.bin"), index_type="ivf_flat",
+                                        block_size=128, train_size=300, nprobe=64)
+    assert meta["index_type"] == "ivf_flat" and index.ntotal == 600
+    _, ids = index.search(vectors[:5], 1)
+    assert ids.ravel().tolist() == [0, 1, 2, 3, 4]
+
+def test_ingest_and_search_review_chunks(tmp_path):
+    import backend.core as core
+    from backend.ingest_data import ingest_data
+    from backend.utils.artifacts import generation_dir
+
+    encoder = StubEncoder()
+    ingest_data(df=make_df(), data_dir=str(tmp_path), model=encoder, multi_vector=True)
+    chunks = ChunkIndex.load(generation_dir(str(tmp_path)))
+    assert chunks.ntotal == 2 and chunks.owners.tolist() == [0, 1]
+
+    service = core.RecommendationService(data_dir=str(tmp_path), embedding_model=encoder)
+    with patch.object(core, "MULTI_VECTOR", True):
+        service.load_resources()
+    assert service.health()["chunk_vectors"] == 2
+    # The query matches Empire's menu chunk exactly, not any restaurant-level text
+    results = service.search_restaurants("Menu: Chicken Biryani Kebab Platter", top_k=1)
+    assert [r["name"] for r in results] == ["Empire"]
+    filtered = service.search_restaurants("Menu: Chicken Biryani Kebab Platter", top_k=1, filters={"location": "Koramangala"})
+    assert [r["name"] for r in filtered] == ["Truffles"]
+
+    # Unchanged chunks are reused on the next run
+    calls = []
+    encoder.encode = lambda texts, **kwargs: calls.append(texts) or StubEncoder.encode(encoder, texts)
+    ingest_data(df=make_df(), data_dir=str(tmp_path), model=encoder, multi_vector=True)
+    assert not any(t.startswith(("Review:", "Menu:")) for texts in calls for t in texts)
+
+def test_chunks_are_off_by_default(tmp_path):
+    import backend.core as core
+    from backend.ingest_data import ingest_data
+
+    encoder = StubEncoder()
+    ingest_data(df=make_df(), data_dir=str(tmp_path), model=encoder, multi_vector=True)
+    service = core.RecommendationService(data_dir=str(tmp_path), embedding_model=encoder)
+    service.load_resources()
+    assert service.health()["chunk_vectors"] == 0
+
+def test_shard_node_searches_only_served_chunks(tmp_path):
+    import backend.core as core
+    from backend.ingest_data import ingest_data
+
+    df = make_df()
+    df["listed_in(city)"] = df["location"]
+    encoder = StubEncoder()
+    ingest_data(df=df, data_dir=str(tmp_path), model=encoder, multi_vector=True, shard_column="listed_in(city)")
+
+    with patch.object(core, "MULTI_VECTOR", True), patch.object(core, "SEARCH_SHARDS", "koramangala"):
+        service = core.RecommendationService(data_dir=str(tmp_path), embedding_model=encoder)
+        service.load_resources()
+    assert service.health()["chunk_vectors"] == 2
+    # The query matches Empire's menu chunk exactly, but Empire is in BTM, which this node doesn't serve
+    results = service.search_restaurants("Menu: Chicken Biryani Kebab Platter", top_k=3)
+    assert [r["name"] for r in results] == ["Truffles"]
+    assert service.search_restaurants("Menu: Chicken Biryani Kebab Platter", top_k=3, filters={"location": "BTM"}) == []
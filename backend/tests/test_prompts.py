@@ -0,0 +1,30 @@
+from backend.utils.prompts import build_prompt, prompt_budget, output_budget, compact_restaurant, estimate_tokens
+
+def make_restaurants(n):
+    return [
+        {"name": f"Place {i}", "cuisine": "North Indian, Chinese, Biryani, Kebab", "location": "BTM",
+         "rating": "4.1/5", "cost": "800"}
+        for i in range(n)
+    ]
+
+def test_budgets_scale_with_results():
+    assert prompt_budget(10) > prompt_budget(3)
+    assert output_budget(3) < output_budget(5) <= output_budget(100)
+    assert output_budget(100) == output_budget(1000)
+
+def test_compact_restaurant():
+    line = compact_restaurant(make_restaurants(1)[0])
+    assert line == "Place 0 | North Indian, Chinese, Biryani | BTM | 4.1 | 800"
+
+def test_prompt_fits_budget_and_keeps_best_matches():
+    restaurants = make_restaurants(5)
+    prompt, included = build_prompt("  spicy   biryani ", restaurants)
+    assert included == 5
+    assert '"spicy biryani"' in prompt
+    assert "1. Place 0" in prompt and not prompt.startswith(" ")
+    assert estimate_tokens(prompt) <= prompt_budget(5)
+
+    # A tight budget drops the lowest-ranked restaurants, but never the best one
+    prompt, included = build_prompt("biryani", restaurants, max_tokens=1)
+    assert included == 1
+    assert "Place 0" in prompt and "Place 1" not in prompt
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+from backend.utils.features import add_numeric_features, numeric_features
+from backend.utils.ranking import FusionRanker, budget_from_query
+
+def make_df():
+    return pd.DataFrame({
+        "name": ["Close But Poor", "Slightly Further, Loved", "Few Votes Perfect", "Pricey"],
+        "rate": ["2.9/5", "4.6 /5", "5.0/5", "4.6/5"],
+        "votes": [800, 3000, 2, 3000],
+        "approx_cost(for_two_people)": ["300", "400", "350", "2,500"],
+    })
+
+def test_numeric_features_prefer_precomputed_columns():
+    df = add_numeric_features(make_df())
+    assert np.allclose(df["rating_value"], [2.9, 4.6, 5.0, 4.6])
+    assert df["votes_value"].tolist() == [800, 3000, 2, 3000]
+    df["rate"] = "garbage"
+    features = numeric_features(df)
+    assert np.allclose(features["rating"], [2.9, 4.6, 5.0, 4.6])
+    assert np.allclose(features["cost"], [300, 400, 350, 2500])
+
+def test_fusion_promotes_well_rated_candidates():
+    ranker = FusionRanker(make_df(), similarity=1.0, rating=1.0, votes=0.0, cost=0.0)
+    distances = np.array([[0.10, 0.12, 0.13, 0.90]], dtype='float32')
+    indices = np.array([[0, 1, 2, 3]])
+
+    _, ranked = ranker.rank(distances, indices)
+    # The 4.6 with thousands of votes overtakes the nearer 2.9; a 5.0 from 2 votes is shrunk
+    # towards the prior, so it ranks below the 4.6 but still above the 2.9
+    assert ranked[0].tolist() == [1, 2, 0, 3]
+    assert ranker.quality[2] < ranker.quality[1]
+
+def test_fusion_handles_missing_candidates_and_budgets():
+    ranker = FusionRanker(make_df(), similarity=1.0, rating=0.0, votes=0.0, cost=1.5)
+    distances = np.array([[0.1, 0.2, 3.4e38], [0.1, 0.2, 0.3]], dtype='float32')
+    indices = np.array([[3, 0, -1], [3, 1, 2]])
+
+    _, ranked = ranker.rank(distances, indices, budget=[500, None])
+    # Over-budget "Pricey" drops below the affordable candidate; -1 padding stays last
+    assert ranked[0].tolist() == [0, 3, -1]
+    # No budget for the second query: similarity order is kept
+    assert ranked[1].tolist() == [3, 1, 2]
+
+def test_budget_from_query():
+    assert budget_from_query("biryani under 1,200 in BTM") == 1200
+    assert budget_from_query("cheap eats near HSR") is not None
+    assert budget_from_query("rooftop dinner") is None
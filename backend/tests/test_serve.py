@@ -0,0 +1,32 @@
+import os
+import socket
+from backend import serve
+from backend.core import RecommendationService
+
+def test_threads_are_split_between_workers(monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 16)
+    assert serve.worker_count(0) == 16
+    assert serve.worker_count(4) == 4
+    assert serve.threads_per_worker(4) == 4
+    assert serve.threads_per_worker(32) == 1
+
+def test_bind_socket_is_inheritable():
+    sock = serve.bind_socket("127.0.0.1", 0)
+    try:
+        assert sock.get_inheritable()
+        assert sock.getsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR)
+    finally:
+        sock.close()
+
+def test_after_fork_replaces_per_process_state(tmp_path, monkeypatch):
+    monkeypatch.setattr("backend.core.CACHE_DB_PATH", str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr("backend.core.CACHE_MAX_ENTRIES", 10)
+    service = RecommendationService(data_dir=str(tmp_path))
+    executor, batcher, conn = service.executor, service.batcher, service.results_cache.disk._conn
+
+    service.after_fork()
+    assert service.executor is not executor
+    assert service.batcher is None or service.batcher is not batcher
+    assert service.results_cache.disk._conn is not conn
+    service.results_cache.set("k", [1])
+    assert service.results_cache.disk.get("k") == [1]
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import faiss
+from unittest.mock import patch
+from backend.utils.shards import ShardSet, write_shards, merge_results, shard_name
+
+AREAS = ["BTM", "HSR", "Koramangala 5th Block"]
+
+def make_bundle(tmp_path, n=60, dim=8):
+    rng = np.random.default_rng(0)
+    embeddings = rng.random((n, dim), dtype=np.float32)
+    df = pd.DataFrame({
+        "name": [f"R{i}" for i in range(n)],
+        "location": [AREAS[i % 3] for i in range(n)],
+        "listed_in(city)": [AREAS[i % 3] for i in range(n)],
+    })
+    write_shards(df, embeddings, str(tmp_path), column="listed_in(city)")
+    return df, embeddings
+
+def test_shard_name():
+    assert shard_name("Koramangala 5th Block") == "koramangala-5th-block"
+    assert shard_name("") == "unknown"
+
+def test_fan_out_matches_a_global_search(tmp_path):
+    df, embeddings = make_bundle(tmp_path)
+    shards = ShardSet.load(str(tmp_path))
+    assert sorted(shards.shards) == ["btm", "hsr", "koramangala-5th-block"]
+    assert shards.ntotal == len(df)
+
+    queries = np.random.default_rng(1).random((4, embeddings.shape[1]), dtype=np.float32)
+    expected_distances, expected = faiss.knn(queries, embeddings, 10)
+    distances, indices = shards.search(queries, 10)
+    np.testing.assert_array_equal(indices, expected)
+    np.testing.assert_allclose(distances, expected_distances, rtol=1e-5)
+
+def test_filtered_search_routes_and_loads_on_demand(tmp_path):
+    df, embeddings = make_bundle(tmp_path)
+    shards = ShardSet.load(str(tmp_path))
+    mask = (df["location"] == "HSR").to_numpy()
+    assert [shard.name for shard in shards.route(mask)] == ["hsr"]
+
+    _, indices = shards.search(embeddings[:1], 5, mask)
+    assert mask[indices[0]].all()
+    # Only the routed shard was loaded
+    assert shards.loaded_names() == ["hsr"]
+
+def test_serving_a_subset_of_shards(tmp_path):
+    df, embeddings = make_bundle(tmp_path)
+    shards = ShardSet.load(str(tmp_path), serve="BTM")
+    assert list(shards.shards) == ["btm"]
+    _, indices = shards.search(embeddings[:2], 5)
+    assert set(df["location"].to_numpy()[indices.ravel()]) == {"BTM"}
+
+def test_merge_results_pads_and_orders():
+    parts = [
+        (np.array([[0.5, 2.0]], dtype='float32'), np.array([[7, -1]])),
+        (np.array([[0.1]], dtype='float32'), np.array([[3]])),
+    ]
+    distances, indices = merge_results(parts, 3)
+    assert indices.tolist() == [[3, 7, -1]]
+    assert distances[0, 2] == np.inf
+    assert merge_results([], 3, n_queries=2)[1].shape == (2, 0)
+
+def test_service_searches_shards(tmp_path):
+    import backend.core as core
+    from backend.ingest_data import ingest_data
+    from backend.tests.test_core import StubEncoder
+
+    names = ["Truffles", "Empire", "Onesta", "Meghana Foods"]
+    areas = ["Koramangala", "BTM", "BTM", "Jayanagar"]
+    df = pd.DataFrame({
+        "name": names, "cuisines": ["Pizza"] * 4, "location": areas, "listed_in(city)": areas,
+        "rest_type": ["Cafe"] * 4, "url": [None] * 4,
+    })
+    encoder = StubEncoder()
+    ingest_data(df=df, data_dir=str(tmp_path), model=encoder, shard_column="listed_in(city)")
+
+    with patch.object(core, "SEARCH_SHARDS", "all"):
+        service = core.RecommendationService(data_dir=str(tmp_path), embedding_model=encoder)
+        service.load_resources()
+    assert service.is_ready() and service.faiss_index is None
+    assert service.health()["shards"]["served"] == 3
+
+    assert {r["name"] for r in service.search_restaurants("Pizza", top_k=4)} == set(names)
+    results = service.search_restaurants("Pizza", top_k=4, filters={"location": "BTM"})
+    assert {r["name"] for r in results} == {"Empire", "Onesta"}
+
+def test_shard_node_returns_only_served_regions(tmp_path):
+    import backend.core as core
+    from backend.ingest_data import ingest_data
+    from backend.tests.test_core import StubEncoder
+
+    names = ["Truffles", "Empire", "Onesta", "Meghana Foods", "Pizza Hut"]
+    areas = ["Koramangala", "BTM", "BTM", "Jayanagar", "HSR"]
+    df = pd.DataFrame({
+        "name": names, "cuisines": ["Pizza"] * 5, "location": areas, "listed_in(city)": areas,
+        "rest_type": ["Cafe"] * 5, "url": [None] * 5,
+    })
+    encoder = StubEncoder()
+    ingest_data(df=df, data_dir=str(tmp_path), model=encoder, shard_column="listed_in(city)")
+
+    with patch.object(core, "SEARCH_SHARDS", "btm,hsr"), patch.object(core, "RETRIEVAL_MODE", "hybrid"):
+        service = core.RecommendationService(data_dir=str(tmp_path), embedding_model=encoder)
+        service.load_resources()
+        assert service.health()["retrieval"] == "hybrid"
+        # Metadata and the per-row structures cover only the served rows
+        assert service.served_ids.tolist() == [1, 2, 4]
+        assert len(service.df_restaurants) == 3 and service.filter_index.size == 3
+        assert service.lexical_index.n_docs == 3
+        # "Meghana" only matches a Jayanagar row lexically; the node doesn't serve Jayanagar
+        results = service.search_restaurants("Meghana Pizza", top_k=5)
+        assert {r["location"] for r in results} == {"BTM", "HSR"}
+        assert service.search_restaurants("Pizza", top_k=5, filters={"location": "Jayanagar"}) == []
+
+def test_ingest_writes_no_shards_by_default(tmp_path):
+    from backend.ingest_data import ingest_data
+    from backend.utils.artifacts import generation_dir
+    from backend.tests.test_core import StubEncoder
+
+    df = pd.DataFrame({"name": ["Truffles"], "cuisines": ["Pizza"], "location": ["BTM"], "listed_in(city)": ["BTM"]})
+    ingest_data(df=df, data_dir=str(tmp_path), model=StubEncoder())
+    assert ShardSet.load(generation_dir(str(tmp_path))) is None
@@ -0,0 +1,92 @@
+import os
+import pytest
+import numpy as np
+from backend.utils.vector_index import (
+    build_index, save_index, load_index, index_meta_path, recall_latency_report, format_report,
+    search_reranked, search_selected, rerank_exact
+)
+
+@pytest.fixture(scope="module")
+def embeddings():
+    rng = np.random.default_rng(42)
+    return rng.random((3000, 32), dtype='float32')
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf_flat", "hnsw", "ivf_pq"])
+def test_build_index_types(embeddings, index_type):
+    index, meta = build_index(embeddings, index_type=index_type, nlist=16, pq_m=8, pq_bits=4)
+    assert index.ntotal == len(embeddings)
+    assert meta["index_type"] == index_type
+
+    _, indices = index.search(embeddings[:5], 1)
+    # Each vector should find itself (PQ is lossy, so only check the exact types)
+    if index_type != "ivf_pq":
+        assert list(indices[:, 0]) == [0, 1, 2, 3, 4]
+
+@pytest.mark.parametrize("index_type", ["sq8", "sq_fp16", "pq", "binary"])
+def test_quantized_index_reranks_exactly(embeddings, index_type):
+    index, meta = build_index(embeddings, index_type=index_type, pq_m=8, pq_bits=4)
+    assert meta["rerank"] > 0
+
+    _, indices = search_reranked(index, embeddings, embeddings[:5], 3, factor=32)
+    # Exact distances put each vector first in its own shortlist
+    assert list(indices[:, 0]) == [0, 1, 2, 3, 4]
+
+def test_rerank_exact_pads_short_candidate_lists(embeddings):
+    candidates = np.array([[7, 3, -1, -1]])
+    distances, indices = rerank_exact(embeddings, embeddings[3:4], candidates, 3)
+    assert list(indices[0]) == [3, 7, -1]
+    assert distances[0, 0] == 0
+
+def test_search_selected_with_rerank(embeddings):
+    index, meta = build_index(embeddings, index_type="sq8")
+    mask = np.zeros(len(embeddings), dtype=bool)
+    mask[::2] = True
+    _, indices = search_selected(index, embeddings[4:5], 5, mask, vectors=embeddings, rerank=meta["rerank"])
+    assert indices[0, 0] == 4
+    assert (indices[0] % 2 == 0).all()
+
+def test_unknown_index_type(embeddings):
+    with pytest.raises(ValueError):
+        build_index(embeddings, index_type="lsh")
+
+def test_save_and_load_round_trip(tmp_path, embeddings):
+    index, meta = build_index(embeddings, index_type="ivf_flat", nlist=16, nprobe=4)
+    index_file = str(tmp_path / "faiss_index.bin")
+    save_index(index, index_file, meta)
+    assert os.path.exists(index_meta_path(index_file))
+
+    loaded, loaded_meta = load_index(index_file)
+    assert loaded_meta["index_type"] == "ivf_flat"
+    assert loaded.nprobe == 4
+
+    overridden, overridden_meta = load_index(index_file, nprobe=8)
+    assert overridden.nprobe == 8
+    assert overridden_meta["search_params"]["nprobe"] == 8
+
+def test_load_index_without_sidecar_is_flat(tmp_path, embeddings):
+    import faiss
+    index = faiss.IndexFlatL2(embeddings.shape[1])
+    index.add(embeddings)
+    index_file = str(tmp_path / "legacy.bin")
+    faiss.write_index(index, index_file)
+
+    _, meta = load_index(index_file)
+    assert meta["index_type"] == "flat"
+
+def test_recall_latency_report(embeddings):
+    index, meta = build_index(embeddings, index_type="ivf_flat", nlist=16, nprobe=2)
+    rows = recall_latency_report(index, meta, embeddings, embeddings[:50], k=5, sweep=[1, 16])
+    assert rows[0]["index_type"] == "flat"
+    assert rows[0]["recall"] == 1.0
+    # Probing every list is exhaustive, so recall matches the baseline
+    assert rows[-1]["value"] == 16
+    assert rows[-1]["recall"] == pytest.approx(1.0)
+    assert index.nprobe == 2
+    assert "recall@10" in format_report(rows)
+
+def test_recall_report_includes_rerank_rows(embeddings):
+    index, meta = build_index(embeddings, index_type="pq", pq_m=8, pq_bits=4, rerank=8)
+    rows = recall_latency_report(index, meta, embeddings, embeddings[:50], k=5)
+    reranked = [row for row in rows if row["param"] == "rerank"]
+    assert [row["value"] for row in reranked] == [4, 8, 16]
+    assert reranked[-1]["recall"] > rows[1]["recall"]
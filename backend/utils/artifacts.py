@@ -0,0 +1,230 @@
+import os
+import time
+import shutil
+import pickle
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+# Memory-mappable artifact bundle written by ingest_data.py:
+#   restaurants.arrow  - metadata as an uncompressed Arrow IPC (Feather v2) file
+#   vectors.npy        - raw float32 embedding matrix
+#   faiss_index.bin    - FAISS index (+ faiss_index.json), readable with IO_FLAG_MMAP
+#   lexical_index.npz  - BM25 postings for hybrid retrieval (see lexical.py)
+# Uncompressed files let every worker process map the same pages from the OS page
+# cache instead of each holding a private, deserialized copy.
+METADATA_TABLE_FILE = "restaurants.arrow"
+VECTORS_FILE = "vectors.npy"
+
+# Columns only needed while ingesting (embedding text, long review/menu dumps);
+# they are left out of the serving table.
+INGEST_ONLY_COLUMNS = ["combined_text", "reviews_list", "menu_item"]
+# Low-cardinality text columns stored dictionary-encoded (pandas categoricals)
+CATEGORICAL_COLUMNS = ["location", "cuisines", "rest_type", "listed_in(type)", "listed_in(city)"]
+
+# Versioned layout: every ingest writes a complete bundle to generations/<name>/ and
+# then atomically rewrites CURRENT to name it, so a reader never sees a mix of old and
+# new files and a running service can load the new generation beside the old one.
+GENERATIONS_DIR = "generations"
+CURRENT_FILE = "CURRENT"
+KEEP_GENERATIONS = int(os.getenv("KEEP_GENERATIONS", "3"))
+
+# Older layouts, still accepted by load_metadata
+LEGACY_METADATA_PARTS = ["restaurants_part1.parquet", "restaurants_part2.parquet"]
+LEGACY_METADATA_FILE = "restaurants.pkl"
+
+
+def slim_metadata(df):
+    """
+    Returns the serving copy of the metadata: ingest-only columns dropped and
+    repetitive text columns converted to categoricals, which Arrow stores as
+    dictionary arrays (each distinct value once, plus small integer codes).
+    """
+    df = df.drop(columns=[c for c in INGEST_ONLY_COLUMNS if c in df.columns])
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype("category")
+    return df
+
+
+def write_metadata_table(df, path):
+    """Writes the metadata DataFrame as an uncompressed Arrow IPC file."""
+    table = pa.Table.from_pandas(df.reset_index(drop=True), preserve_index=False)
+    feather.write_feather(table, path, compression="uncompressed")
+    return table
+
+
+def write_vectors(embeddings, path, dtype='float32'):
+    """
+    Writes the embedding matrix as a raw .npy file that np.load can memory-map.
+    dtype='float16' halves the file; readers upcast rows to float32 as they use them.
+    """
+    # Pass a file object so np.save keeps the path as given (no ".npy" appended)
+    with open(path, 'wb') as f:
+        np.save(f, np.ascontiguousarray(embeddings, dtype=dtype))
+
+
+def load_metadata_table(path, mmap=True):
+    """
+    Opens an Arrow IPC file. With mmap=True the buffers point straight into the
+    page cache, so loading is near-instant and nothing is copied.
+    """
+    source = pa.memory_map(path, 'r') if mmap else pa.OSFile(path, 'r')
+    return pa.ipc.open_file(source).read_all()
+
+
+def table_to_dataframe(table):
+    """
+    Wraps an Arrow table in a DataFrame without copying (ArrowDtype-backed columns).
+    Dictionary-encoded columns become pandas categoricals.
+    """
+    return table.to_pandas(types_mapper=lambda t: None if pa.types.is_dictionary(t) else pd.ArrowDtype(t))
+
+
+def load_vectors(path, mmap=True):
+    """Loads the embedding matrix, memory-mapped read-only by default."""
+    return np.load(path, mmap_mode='r' if mmap else None)
+
+
+def load_metadata(data_dir, mmap=True, rows=None):
+    """
+    Loads restaurant metadata from the newest layout available in data_dir:
+    the Arrow bundle, then the split parquet parts, then the legacy pickle.
+    With rows (sorted row ids), only those rows are kept, renumbered from 0.
+
+    Returns:
+        pd.DataFrame or None if no metadata was found.
+    """
+    table_path = os.path.join(data_dir, METADATA_TABLE_FILE)
+    if os.path.exists(table_path):
+        print(f"Mapping metadata from {table_path}...")
+        table = load_metadata_table(table_path, mmap=mmap)
+        # take() copies just the selected rows out of the mapped file
+        return table_to_dataframe(table if rows is None else table.take(rows))
+
+    df_parts = []
+    for part in LEGACY_METADATA_PARTS:
+        part_path = os.path.join(data_dir, part)
+        if os.path.exists(part_path):
+            print(f"Loading metadata part from {part_path}...")
+            df_parts.append(pd.read_parquet(part_path))
+    if df_parts:
+        df = pd.concat(df_parts, ignore_index=True)
+        return df if rows is None else df.iloc[rows].reset_index(drop=True)
+
+    pickle_path = os.path.join(data_dir, LEGACY_METADATA_FILE)
+    if os.path.exists(pickle_path):
+        print(f"Loading metadata from {pickle_path}...")
+        with open(pickle_path, 'rb') as f:
+            df = pickle.load(f)
+        return df if rows is None else df.iloc[rows].reset_index(drop=True)
+
+    return None
+
+
+def current_generation(data_dir):
+    """Name of the generation CURRENT points at, or None for the flat (unversioned) layout."""
+    try:
+        with open(os.path.join(data_dir, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def generation_dir(data_dir, name=None):
+    """Directory holding a generation's bundle (the current one by default; data_dir itself if unversioned)."""
+    name = name or current_generation(data_dir)
+    return os.path.join(data_dir, GENERATIONS_DIR, name) if name else data_dir
+
+
+def new_generation(data_dir):
+    """Creates an empty, unpublished generation directory. Returns (name, path)."""
+    # UTC timestamp plus nanoseconds, so names sort in creation order
+    now = time.time_ns()
+    name = time.strftime("%Y%m%dT%H%M%S", time.gmtime(now // 10**9)) + f"-{now % 10**9:09d}"
+    path = generation_dir(data_dir, name)
+    os.makedirs(path)
+    return name, path
+
+
+def publish_generation(data_dir, name):
+    """Atomically points CURRENT at a fully written generation."""
+    path = os.path.join(data_dir, CURRENT_FILE)
+    with open(path + ".tmp", "w") as f:
+        f.write(name + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + ".tmp", path)
+
+
+def prune_generations(data_dir, keep=KEEP_GENERATIONS):
+    """
+    Deletes all but the newest `keep` generations (never the current one). Processes
+    still serving a deleted generation keep their open/mapped files until they swap.
+    """
+    root = os.path.join(data_dir, GENERATIONS_DIR)
+    if not os.path.isdir(root):
+        return []
+    current = current_generation(data_dir)
+    names = sorted(os.listdir(root))
+    removed = [name for name in names[:max(0, len(names) - keep)] if name != current]
+    for name in removed:
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+    return removed
+
+
+# Output field -> (metadata column, fallback) used when turning search hits into results
+RESULT_FIELDS = {
+    "name": ("name", "Unknown"),
+    "cuisine": ("cuisines", "Unknown"),
+    "location": ("location", "Unknown"),
+    "rating": ("rate", "N/A"),
+    "cost": ("approx_cost(for_two_people)", "N/A"),
+    "url": ("url", None),
+}
+
+
+def _string_column(df, column, fallback):
+    """Returns a column as a NumPy object array of str, with missing values replaced by fallback."""
+    if column not in df.columns:
+        return np.full(len(df), fallback, dtype=object)
+    values = df[column]
+    missing = values.isna().to_numpy(copy=True)
+    strings = values.astype(str).to_numpy(dtype=object, copy=True)
+    if fallback is None:
+        missing |= strings == ""
+    strings[missing] = fallback
+    return strings
+
+
+def build_result_columns(df):
+    """
+    Precomputes the columns needed to materialize results, so a search hit list can
+    be turned into restaurants with one NumPy take per field instead of per-row iloc.
+
+    Returns:
+        dict: RESULT_FIELDS keys -> object arrays, plus "name_code", an int32 array
+        where rows sharing a restaurant name share a code (used for deduplication).
+    """
+    columns = {field: _string_column(df, column, fallback) for field, (column, fallback) in RESULT_FIELDS.items()}
+    codes, _ = pd.factorize(columns["name"])
+    columns["name_code"] = codes.astype(np.int32)
+    return columns
+
+
+def materialize_results(columns, ids, top_k):
+    """
+    Turns FAISS row ids (best first) into at most top_k restaurant dicts, keeping the
+    best-ranked row of each restaurant name.
+    """
+    ids = np.asarray(ids).ravel()
+    ids = ids[(ids >= 0) & (ids < len(columns["name_code"]))]
+
+    # First occurrence of each name, in rank order
+    _, first = np.unique(columns["name_code"][ids], return_index=True)
+    keep = ids[np.sort(first)[:top_k]]
+
+    fields = list(RESULT_FIELDS)
+    values = [columns[field][keep] for field in fields]
+    return [dict(zip(fields, row)) for row in zip(*values)]
@@ -0,0 +1,144 @@
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-item requests into batched calls.
+
+    Callers submit one item at a time from any thread. A background worker waits up
+    to `max_wait_ms` after the first queued item (or until `max_batch_size` items are
+    queued), calls `batch_fn` once with the whole list and hands each caller its own
+    result through a Future.
+
+    Args:
+        batch_fn (callable): Takes a list of items and returns a list of results in the same order.
+        max_batch_size (int): Largest batch passed to batch_fn.
+        max_wait_ms (float): How long the first item in a batch may wait for company.
+        name (str): Name of the worker thread.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=32, max_wait_ms=2.0, name="micro-batcher"):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.name = name
+
+        self._queue = queue.Queue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+
+        # Metrics
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._batch_sizes = {}
+        self._queue_delays_ms = deque(maxlen=2048)
+
+    def submit(self, item):
+        """Queues an item and returns a Future that resolves to its result."""
+        future = Future()
+        # Checked and queued under the lock, so nothing lands behind close()'s stop marker
+        with self._start_lock:
+            if not self._closed:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._worker.start()
+                self._queue.put((item, future, time.perf_counter()))
+                return future
+
+        # Closed: no worker any more, so run the item on the caller's thread
+        try:
+            future.set_result(self.batch_fn([item])[0])
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def close(self):
+        """
+        Stops the worker once the items already queued have been processed. Items
+        submitted afterwards are processed one at a time on the submitting thread.
+        """
+        with self._start_lock:
+            self._closed = True
+            if self._worker is not None:
+                self._queue.put(None)
+
+    def __call__(self, item):
+        """Blocking convenience wrapper around submit()."""
+        return self.submit(item).result()
+
+    def _collect(self):
+        """Blocks for the first item, then gathers more until the window closes or the batch is full."""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+            if batch[-1] is None:
+                # close() was called: finish this batch, then stop
+                batch.pop()
+                self._queue.put(None)
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            started = time.perf_counter()
+            self._record(len(batch), [(started - queued_at) * 1000 for _, _, queued_at in batch])
+
+            items = [item for item, _, _ in batch]
+            try:
+                results = self.batch_fn(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"{self.name}: batch_fn returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+    def _record(self, batch_size, queue_delays_ms):
+        with self._stats_lock:
+            self._batches += 1
+            self._items += batch_size
+            self._batch_sizes[batch_size] = self._batch_sizes.get(batch_size, 0) + 1
+            self._queue_delays_ms.extend(queue_delays_ms)
+
+    def stats(self):
+        """Returns batch size and queueing delay metrics."""
+        with self._stats_lock:
+            delays = np.array(self._queue_delays_ms) if self._queue_delays_ms else np.zeros(1)
+            return {
+                "batches": self._batches,
+                "items": self._items,
+                "mean_batch_size": round(self._items / self._batches, 3) if self._batches else 0.0,
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+                "queue_delay_ms": {
+                    "mean": round(float(delays.mean()), 3),
+                    "p50": round(float(np.percentile(delays, 50)), 3),
+                    "p95": round(float(np.percentile(delays, 95)), 3),
+                    "max": round(float(delays.max()), 3),
+                },
+                "pending": self._queue.qsize(),
+            }
@@ -0,0 +1,239 @@
+import os
+import re
+import time
+import pickle
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+# The disk tier counts its rows and evicts once per this many writes rather than on every
+# write, so it may briefly hold up to that many entries over max_size
+DISK_EVICT_EVERY = int(os.getenv("CACHE_DISK_EVICT_EVERY", "256"))
+
+
+def normalize_query(query):
+    """Lowercases and collapses whitespace so trivially different queries share cache entries."""
+    return re.sub(r"\s+", " ", (query or "").strip().lower())
+
+
+def make_key(*parts):
+    """Builds a compact, stable cache key from arbitrary parts."""
+    return hashlib.sha1("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+class CacheStats:
+    """Hit/miss/eviction counters shared by the cache tiers."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def as_dict(self, size, max_size):
+        lookups = self.hits + self.misses
+        return {
+            "size": size,
+            "max_size": max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class LRUCache:
+    """
+    Thread-safe in-memory LRU cache with an optional time-to-live.
+
+    Args:
+        max_size (int): Maximum number of entries before the least recently used is evicted.
+        ttl (float): Seconds an entry stays valid. None means entries never expire.
+    """
+
+    def __init__(self, max_size=10000, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._stats.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._data[key]
+                self._stats.expirations += 1
+                self._stats.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self._stats.hits += 1
+            return value
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self._stats.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            return self._stats.as_dict(len(self._data), self.max_size)
+
+
+class SQLiteCache:
+    """
+    On-disk cache tier backed by SQLite so entries survive restarts.
+
+    Several namespaces (embeddings, results, analyses) can share one database file.
+    Values are pickled; the least recently accessed entries are evicted beyond max_size,
+    checked every evict_every writes.
+    """
+
+    def __init__(self, path, namespace, max_size=100000, ttl=None, evict_every=DISK_EVICT_EVERY):
+        self.path = path
+        self.namespace = namespace
+        self.max_size = max_size
+        self.ttl = ttl
+        self.evict_every = max(1, evict_every)
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._connect()
+
+    def _connect(self):
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, "
+            "expires_at REAL, accessed_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_lru ON cache (namespace, accessed_at)")
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            if row is None:
+                self._stats.misses += 1
+                return default
+            value, expires_at = row
+            if expires_at is not None and expires_at < now:
+                self._conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+                self._stats.expirations += 1
+                self._stats.misses += 1
+                return default
+            self._conn.execute(
+                "UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?", (now, self.namespace, key)
+            )
+            self._stats.hits += 1
+        return pickle.loads(value)
+
+    def set(self, key, value):
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl else None
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, blob, expires_at, now),
+            )
+            self._writes += 1
+            if self._writes % self.evict_every == 0:
+                self._evict()
+
+    def _evict(self):
+        overflow = self._size() - self.max_size
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache WHERE namespace = ? "
+                "ORDER BY accessed_at LIMIT ?)",
+                (self.namespace, overflow),
+            )
+            self._stats.evictions += overflow
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+
+    def reopen(self):
+        """Opens a fresh connection; a forked worker must not share its parent's SQLite connection."""
+        self._connect()
+
+    def _size(self):
+        return self._conn.execute("SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)).fetchone()[0]
+
+    def __len__(self):
+        with self._lock:
+            return self._size()
+
+    def stats(self):
+        with self._lock:
+            return self._stats.as_dict(self._size(), self.max_size)
+
+
+class TieredCache:
+    """
+    Memory LRU in front of an optional on-disk tier.
+    Disk hits are promoted into memory; writes go to both tiers.
+    """
+
+    def __init__(self, name, max_size=10000, ttl=None, disk_path=None, disk_max_size=100000):
+        self.name = name
+        self.memory = LRUCache(max_size=max_size, ttl=ttl)
+        self.disk = SQLiteCache(disk_path, name, max_size=disk_max_size, ttl=ttl) if disk_path else None
+
+    def get(self, key, default=None):
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+                return value
+        return default
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def after_fork(self):
+        if self.disk is not None:
+            self.disk.reopen()
+
+    def stats(self):
+        stats = {"memory": self.memory.stats()}
+        if self.disk is not None:
+            stats["disk"] = self.disk.stats()
+        return stats
@@ -0,0 +1,199 @@
+import os
+import json
+import numpy as np
+
+# Query encoders behind one interface: encode(texts, batch_size=...) -> float32 (n, dim).
+# "torch" runs the SentenceTransformer model; "onnx" runs the same model exported to
+# ONNX (optionally int8-quantized) with ONNX Runtime, which avoids loading torch.
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+ENCODER_BACKEND = os.getenv("ENCODER_BACKEND", "torch")
+# Intra-op threads per encode call; 0 keeps the runtime's default (all cores)
+ENCODER_THREADS = int(os.getenv("ENCODER_THREADS", "0"))
+# Where export_onnx() writes, and OnnxEncoder reads, the exported model
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "backend/data/onnx")
+ONNX_QUANTIZED = os.getenv("ONNX_QUANTIZED", "0") == "1"
+# Lowest acceptable cosine similarity between torch and ONNX embeddings of the same text
+PARITY_MIN_COSINE = float(os.getenv("PARITY_MIN_COSINE", "0.99"))
+
+ONNX_FILE = "model.onnx"
+ONNX_QUANTIZED_FILE = "model.int8.onnx"
+ONNX_CONFIG_FILE = "encoder_config.json"
+TOKENIZER_FILE = "tokenizer.json"
+
+ENCODER_BACKENDS = ("torch", "onnx")
+
+
+def mean_pool(hidden_states, attention_mask, normalize=True):
+    """Mean of the token embeddings over the attention mask, as SentenceTransformer's Pooling does."""
+    mask = attention_mask[..., None].astype(np.float32)
+    summed = (hidden_states * mask).sum(axis=1)
+    pooled = summed / np.clip(mask.sum(axis=1), 1e-9, None)
+    if normalize:
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+    return pooled.astype(np.float32)
+
+
+class TorchEncoder:
+    """SentenceTransformer model on CPU."""
+    backend = "torch"
+
+    def __init__(self, model_name=MODEL_NAME, threads=ENCODER_THREADS):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if threads:
+            torch.set_num_threads(threads)
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dimension = self.model.get_sentence_embedding_dimension()
+        # Identifies the embedding space (e.g. in cache keys)
+        self.name = f"torch:{model_name}"
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        return np.asarray(self.model.encode(texts, batch_size=batch_size, **kwargs), dtype=np.float32)
+
+
+class OnnxEncoder:
+    """The exported model (see export_onnx) run with ONNX Runtime and a fast tokenizer."""
+    backend = "onnx"
+
+    def __init__(self, model_dir=ONNX_MODEL_DIR, quantized=ONNX_QUANTIZED, threads=ENCODER_THREADS):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_dir, ONNX_CONFIG_FILE)) as f:
+            self.config = json.load(f)
+        model_path = os.path.join(model_dir, ONNX_QUANTIZED_FILE if quantized else ONNX_FILE)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"{model_path} not found; run python -m backend.export_encoder first.")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.inter_op_num_threads = 1
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=self.config["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.config["pad_token_id"], pad_token=self.config["pad_token"])
+        self.normalize = self.config["normalize"]
+        self.dimension = self.config["dimension"]
+        self.quantized = quantized
+        self.name = f"onnx:{self.config.get('model_name', MODEL_NAME)}" + (":int8" if quantized else "")
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        if isinstance(texts, str):
+            texts = [texts]
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(list(texts[start:start + batch_size]))
+            feeds = {
+                "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+                "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+            }
+            hidden = self.session.run(None, {name: feeds[name] for name in self.input_names})[0]
+            batches.append(mean_pool(hidden, feeds["attention_mask"], self.normalize))
+        if not batches:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        return np.vstack(batches)
+
+
+def load_encoder(backend=None, model_name=MODEL_NAME, threads=ENCODER_THREADS, model_dir=ONNX_MODEL_DIR,
+                 quantized=ONNX_QUANTIZED):
+    """Returns the encoder for `backend` ("torch" or "onnx"; ENCODER_BACKEND by default)."""
+    backend = backend or ENCODER_BACKEND
+    if backend == "torch":
+        return TorchEncoder(model_name, threads=threads)
+    if backend == "onnx":
+        return OnnxEncoder(model_dir, quantized=quantized, threads=threads)
+    raise ValueError(f"Unknown encoder backend '{backend}'. Choose from: {', '.join(ENCODER_BACKENDS)}")
+
+
+def export_onnx(model_dir=ONNX_MODEL_DIR, model_name=MODEL_NAME, quantize=False, opset=17):
+    """
+    Exports the SentenceTransformer's transformer to ONNX, saves its tokenizer and
+    pooling settings next to it, and optionally writes a dynamically int8-quantized copy.
+
+    Returns:
+        dict: Paths of the written model files.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize, Pooling
+
+    model = SentenceTransformer(model_name, device="cpu")
+    pooling = next((m for m in model if isinstance(m, Pooling)), None)
+    if pooling is None or pooling.get_pooling_mode_str() != "mean":
+        raise ValueError(f"{model_name} doesn't use mean pooling; only mean pooling is supported.")
+
+    transformer = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+    class HiddenStates(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, *inputs):
+            return self.inner(**dict(zip(input_names, inputs)))[0]
+
+    os.makedirs(model_dir, exist_ok=True)
+    model_path = os.path.join(model_dir, ONNX_FILE)
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+    print(f"Exporting {model_name} to {model_path}...")
+    with torch.no_grad():
+        torch.onnx.export(
+            HiddenStates(transformer), tuple(sample[name] for name in input_names), model_path,
+            input_names=input_names, output_names=["last_hidden_state"], dynamic_axes=dynamic_axes,
+            opset_version=opset, dynamo=False,
+        )
+
+    # tokenizer.json is read by the standalone `tokenizers` library at serving time
+    tokenizer.save_pretrained(model_dir)
+    config = {
+        "model_name": model_name,
+        "max_seq_length": model.max_seq_length,
+        "dimension": model.get_sentence_embedding_dimension(),
+        "normalize": any(isinstance(m, Normalize) for m in model),
+        "pad_token": tokenizer.pad_token,
+        "pad_token_id": tokenizer.pad_token_id,
+    }
+    with open(os.path.join(model_dir, ONNX_CONFIG_FILE), "w") as f:
+        json.dump(config, f, indent=2)
+
+    paths = {"model": model_path}
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        paths["quantized"] = os.path.join(model_dir, ONNX_QUANTIZED_FILE)
+        print(f"Writing int8 model to {paths['quantized']}...")
+        quantize_dynamic(model_path, paths["quantized"], weight_type=QuantType.QInt8)
+    return paths
+
+
+def parity_check(reference, candidate, texts, min_cosine=PARITY_MIN_COSINE):
+    """
+    Compares two encoders on the same texts.
+
+    Returns:
+        dict: min/mean cosine similarity, largest absolute difference, and whether
+        every text reached min_cosine.
+    """
+    a = np.asarray(reference.encode(texts), dtype=np.float32)
+    b = np.asarray(candidate.encode(texts), dtype=np.float32)
+    if a.shape != b.shape:
+        raise ValueError(f"Embedding shapes differ: {a.shape} vs {b.shape}")
+    cosine = (a * b).sum(axis=1) / np.clip(np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1), 1e-12, None)
+    return {
+        "texts": len(texts),
+        "min_cosine": float(cosine.min()),
+        "mean_cosine": float(cosine.mean()),
+        "max_abs_diff": float(np.abs(a - b).max()),
+        "passed": bool(cosine.min() >= min_cosine),
+    }
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+
+def parse_rating(values):
+    """
+    Parses Zomato ratings such as "4.1/5", "4.1 /5", "NEW" or "-" into floats.
+    Unrated restaurants become NaN.
+    """
+    text = pd.Series(values).astype("string").str.strip()
+    return pd.to_numeric(text.str.split("/", n=1).str[0].str.strip(), errors="coerce").to_numpy(dtype='float32', na_value=np.nan)
+
+
+def parse_number(values):
+    """
+    Parses counts and costs (ints or strings such as "1,200" or "800") into floats.
+    Missing or unparseable values become NaN.
+    """
+    text = pd.Series(values).astype("string").str.replace(",", "", regex=False).str.strip()
+    return pd.to_numeric(text, errors="coerce").to_numpy(dtype='float32', na_value=np.nan)
+
+
+# Numeric feature -> (raw metadata column, parser, precomputed column written by ingestion)
+NUMERIC_FEATURES = {
+    "rating": ("rate", parse_rating, "rating_value"),
+    "votes": ("votes", parse_number, "votes_value"),
+    "cost": ("approx_cost(for_two_people)", parse_number, "cost_value"),
+}
+
+
+def add_numeric_features(df):
+    """Adds the parsed rating/votes/cost columns (float32, NaN when unknown) that serving reads directly."""
+    for raw, parse, column in NUMERIC_FEATURES.values():
+        df[column] = parse(df[raw]) if raw in df.columns else np.full(len(df), np.nan, dtype='float32')
+    return df
+
+
+def numeric_features(df):
+    """
+    Returns {"rating", "votes", "cost"} float32 arrays aligned with df's rows, taken from
+    the precomputed columns when present and parsed from the raw strings otherwise.
+    """
+    features = {}
+    for name, (raw, parse, column) in NUMERIC_FEATURES.items():
+        if column in df.columns:
+            features[name] = df[column].to_numpy(dtype='float32', na_value=np.nan)
+        elif raw in df.columns:
+            features[name] = parse(df[raw])
+        else:
+            features[name] = np.full(len(df), np.nan, dtype='float32')
+    return features
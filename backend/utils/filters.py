@@ -0,0 +1,137 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+
+from backend.utils.features import numeric_features
+
+# Request filter -> metadata column backing its inverted index
+CATEGORICAL_FILTERS = {
+    "location": "location",
+    "rest_type": "rest_type",
+}
+# Columns holding comma-separated lists ("Casual Dining, Bar")
+MULTI_VALUE_COLUMNS = {"rest_type"}
+FILTER_FIELDS = ("location", "rest_type", "max_cost", "min_rating")
+# Resolved filter terms kept per FilterIndex (least recently used evicted first); terms
+# come straight from clients, so the cache must not grow with every distinct value sent
+FILTER_TERM_CACHE_SIZE = int(os.getenv("FILTER_TERM_CACHE_SIZE", "1024"))
+
+
+def normalize_filters(filters):
+    """Drops empty filter values so {"location": ""} behaves like no filter."""
+    return {key: value for key, value in (filters or {}).items() if key in FILTER_FIELDS and value not in (None, "")}
+
+
+def describe_query(query, filters):
+    """Appends active filters to the query text so the LLM knows the user's constraints."""
+    filters = normalize_filters(filters)
+    if not filters:
+        return query
+    labels = {
+        "location": "location", "rest_type": "type",
+        "max_cost": "max cost for two", "min_rating": "min rating",
+    }
+    constraints = ", ".join(f"{labels[key]}: {filters[key]}" for key in FILTER_FIELDS if key in filters)
+    return f"{query} ({constraints})"
+
+
+def _normalize_term(value):
+    return " ".join(str(value).lower().split())
+
+
+def _build_postings(df, column, multi_value=False):
+    """Maps each normalized value of a column to the sorted row ids holding it."""
+    if column not in df.columns:
+        return {}
+    values = df[column].astype("string").fillna("").str.lower().reset_index(drop=True)
+    if multi_value:
+        values = values.str.split(",").explode()
+    row_ids = values.index.to_numpy(dtype=np.int64)
+    values = values.str.strip().str.replace(r"\s+", " ", regex=True).to_numpy(dtype=object)
+    groups = pd.Series(row_ids).groupby(values).indices
+    return {key: row_ids[positions] for key, positions in groups.items() if key}
+
+
+class FilterSelection:
+    """Rows passing a set of structured filters, as a bitmap and as sorted ids."""
+
+    def __init__(self, mask):
+        self.mask = mask
+        self.ids = np.flatnonzero(mask)
+
+    @property
+    def count(self):
+        return len(self.ids)
+
+
+class FilterIndex:
+    """
+    Precomputed structures for structured pre-filtering:
+    inverted indexes for location and rest_type, numeric arrays for cost and rating.
+
+    Location and rest_type terms match any indexed value containing them, so
+    "Koramangala" selects every "Koramangala Nth Block".
+    """
+
+    def __init__(self, df, term_cache_size=FILTER_TERM_CACHE_SIZE):
+        self.size = len(df)
+        self.postings = {
+            name: _build_postings(df, column, multi_value=column in MULTI_VALUE_COLUMNS)
+            for name, column in CATEGORICAL_FILTERS.items()
+        }
+        features = numeric_features(df)
+        self.cost = features["cost"]
+        self.rating = features["rating"]
+        self._term_cache = OrderedDict()
+        self._term_cache_size = term_cache_size
+        self._term_lock = threading.Lock()
+
+    def values(self, name):
+        """Known values of a categorical filter, e.g. for UI suggestions."""
+        return sorted(self.postings.get(name, {}))
+
+    def _term_ids(self, name, term):
+        key = (name, _normalize_term(term))
+        postings = self.postings.get(name, {})
+        # Exact values are already in the postings; only substring matches are worth caching
+        if key[1] in postings:
+            return postings[key[1]]
+        with self._term_lock:
+            ids = self._term_cache.get(key)
+            if ids is not None:
+                self._term_cache.move_to_end(key)
+                return ids
+
+        matches = [ids for value, ids in postings.items() if key[1] in value]
+        ids = np.unique(np.concatenate(matches)) if matches else np.empty(0, dtype=np.int64)
+        if self._term_cache_size > 0:
+            with self._term_lock:
+                self._term_cache[key] = ids
+                while len(self._term_cache) > self._term_cache_size:
+                    self._term_cache.popitem(last=False)
+        return ids
+
+    def select(self, filters):
+        """
+        Returns a FilterSelection for the given filters, or None when no filter is set.
+
+        Args:
+            filters (dict): Any of location, rest_type, max_cost, min_rating.
+        """
+        filters = normalize_filters(filters)
+        if not filters:
+            return None
+
+        mask = np.ones(self.size, dtype=bool)
+        for name in CATEGORICAL_FILTERS:
+            if name in filters:
+                term_mask = np.zeros(self.size, dtype=bool)
+                term_mask[self._term_ids(name, filters[name])] = True
+                mask &= term_mask
+        if "max_cost" in filters:
+            mask &= self.cost <= float(filters["max_cost"])
+        if "min_rating" in filters:
+            mask &= self.rating >= float(filters["min_rating"])
+        return FilterSelection(mask)
@@ -3,7 +3,7 @@ def format_ai_analysis(analysis_text):
     if not analysis_text:
         return "No analysis available."
     
-    header = "=" * 50 + "\nAI ANALYSIS\n" + "=" * 50 + "\n"
+    header = format_ai_analysis_header() + "\n"
     return f"{header}{analysis_text}\n"
 
 def format_restaurant_card(index, restaurant):
@@ -39,14 +39,23 @@ def format_recommendations_display(data):
     output.append(format_ai_analysis(data.get("ai_analysis")))
     
     # Restaurants
+    output.append(format_restaurants_section(data.get("restaurants", [])))
+            
+    return "\n".join(output)
+
+def format_restaurants_section(restaurants):
+    """Formats the TOP RESTAURANTS header and one card per restaurant."""
     header = "=" * 50 + "\nTOP RESTAURANTS\n" + "=" * 50
-    output.append(header)
-    
-    restaurants = data.get("restaurants", [])
+    output = [header]
+
     if not restaurants:
         output.append("No restaurants found.")
     else:
         for i, r in enumerate(restaurants, 1):
             output.append(format_restaurant_card(i, r))
-            
+
     return "\n".join(output)
+
+def format_ai_analysis_header():
+    """Header printed before a streamed AI analysis."""
+    return "=" * 50 + "\nAI ANALYSIS\n" + "=" * 50
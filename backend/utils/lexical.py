@@ -0,0 +1,153 @@
+import os
+import re
+import numpy as np
+import pandas as pd
+
+# BM25 inverted index over the short, name-like text fields. Exact restaurant and dish
+# names ("Truffles", "Meghana", "ghee roast") get blurred in sentence embeddings; a
+# lexical list fused with the vector list (reciprocal rank fusion) brings them back.
+#
+# Stored CSR-style in one uncompressed .npz next to faiss_index.bin:
+#   vocab    - sorted terms
+#   indptr   - postings of term t are doc_ids/impacts[indptr[t]:indptr[t + 1]]
+#   doc_ids  - int32 row ids
+#   impacts  - float32 precomputed BM25 contribution of the term to the row
+# so scoring a query is one concatenation and one bincount.
+LEXICAL_INDEX_FILE = "lexical_index.npz"
+
+# Metadata column -> term-frequency weight (a name match counts more than a cuisine match).
+# Locations are indexed so "biryani in BTM" ranks BTM's biryani places above biryani anywhere.
+LEXICAL_FIELDS = {
+    "name": 3.0, "dish_liked": 1.0, "cuisines": 1.0, "rest_type": 1.0,
+    "location": 2.0, "listed_in(city)": 1.0,
+}
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+_TOKEN_PATTERN = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def tokenize(text):
+    """Lowercased alphanumeric tokens ("Domino's Pizza" -> ["domino", "s", "pizza"])."""
+    return _TOKEN_PATTERN.findall(str(text).lower())
+
+
+class LexicalIndex:
+    """BM25 index with precomputed per-posting impacts (see module comment for the layout)."""
+
+    def __init__(self, vocab, indptr, doc_ids, impacts, n_docs):
+        self.vocab = vocab
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.impacts = impacts
+        self.n_docs = int(n_docs)
+        self._term_ids = {term: i for i, term in enumerate(vocab.tolist())}
+
+    @classmethod
+    def build(cls, df, fields=LEXICAL_FIELDS, k1=BM25_K1, b=BM25_B):
+        """Tokenizes the fields of every row (vectorized with pandas) and computes BM25 impacts."""
+        parts = []
+        for column, weight in fields.items():
+            if column not in df.columns:
+                continue
+            # Positional index, so exploded rows carry row ids whatever df's index is
+            column_values = df[column].reset_index(drop=True)
+            tokens = column_values.astype("string").fillna("").str.lower().str.findall(_TOKEN_PATTERN.pattern)
+            terms = tokens.explode().dropna()
+            parts.append(pd.DataFrame({
+                "doc": terms.index.to_numpy(dtype=np.int64), "term": terms.to_numpy(dtype=object), "tf": weight,
+            }))
+        n_docs = len(df)
+        if not parts or not sum(len(p) for p in parts):
+            empty = np.empty(0, dtype=np.int32)
+            return cls(np.empty(0, dtype=str), np.zeros(1, dtype=np.int64), empty, empty.astype(np.float32), n_docs)
+
+        pairs = pd.concat(parts, ignore_index=True)
+        tf = pairs.groupby(["term", "doc"], sort=True)["tf"].sum()
+        terms = tf.index.get_level_values("term")
+        docs = tf.index.get_level_values("doc").to_numpy(dtype=np.int64)
+        tf = tf.to_numpy(dtype=np.float64)
+
+        doc_length = np.bincount(docs, weights=tf, minlength=n_docs)
+        avg_length = doc_length.mean() if n_docs else 1.0
+        vocab, term_codes = np.unique(terms.to_numpy(dtype=str), return_inverse=True)
+        doc_freq = np.bincount(term_codes, minlength=len(vocab))
+        idf = np.log1p((n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+        norm = k1 * (1.0 - b + b * doc_length[docs] / max(avg_length, 1e-9))
+        impacts = idf[term_codes] * tf * (k1 + 1.0) / (tf + norm)
+
+        # groupby sorted by (term, doc), so postings are already grouped per term
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum(doc_freq)
+        return cls(vocab, indptr, docs.astype(np.int32), impacts.astype(np.float32), n_docs)
+
+    def save(self, path):
+        # Pass a file object so np.savez keeps the path as given
+        with open(path, "wb") as f:
+            np.savez(f, vocab=self.vocab, indptr=self.indptr, doc_ids=self.doc_ids, impacts=self.impacts,
+                     n_docs=np.int64(self.n_docs))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["vocab"], data["indptr"], data["doc_ids"], data["impacts"], data["n_docs"])
+
+    def subset(self, rows):
+        """
+        Index over only the given sorted row ids, renumbered from 0. Impacts keep the
+        full corpus' statistics, so scores match the global index.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        positions = np.searchsorted(rows, self.doc_ids)
+        keep = positions < len(rows)
+        keep[keep] = rows[positions[keep]] == self.doc_ids[keep]
+        terms = np.repeat(np.arange(len(self.vocab)), np.diff(self.indptr))
+        indptr = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum(np.bincount(terms[keep], minlength=len(self.vocab)))
+        return LexicalIndex(self.vocab, indptr, positions[keep].astype(np.int32), self.impacts[keep], len(rows))
+
+    def scores(self, query):
+        """BM25 score of every row for the query (zeros where no term matches)."""
+        spans = [(self.indptr[t], self.indptr[t + 1]) for t in
+                 (self._term_ids.get(token) for token in tokenize(query)) if t is not None]
+        if not spans:
+            return None
+        doc_ids = np.concatenate([self.doc_ids[start:end] for start, end in spans])
+        impacts = np.concatenate([self.impacts[start:end] for start, end in spans])
+        return np.bincount(doc_ids, weights=impacts, minlength=self.n_docs)
+
+    def search(self, query, k, mask=None):
+        """Ids of the k best-scoring rows (only rows where mask is True, if given), best first."""
+        scores = self.scores(query)
+        if scores is None or k <= 0:
+            return np.empty(0, dtype=np.int64)
+        if mask is not None:
+            scores = np.where(mask, scores, 0.0)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[scores[top] > 0]
+        return top[np.argsort(-scores[top], kind="stable")].astype(np.int64)
+
+
+def reciprocal_rank_fusion(rankings, k=60, limit=None, weights=None):
+    """
+    Merges ranked id lists: each id scores sum(weight / (k + rank)) over the lists it
+    appears in (rank starting at 1; weights default to 1 per list). Ties go to the id
+    with the better single-list rank. Negative ids (FAISS padding) are ignored.
+    """
+    weights = [1.0] * len(rankings) if weights is None else weights
+    ids = np.concatenate([np.asarray(r, dtype=np.int64).ravel() for r in rankings])
+    ranks = np.concatenate([np.arange(1, len(np.ravel(r)) + 1) for r in rankings])
+    list_weights = np.concatenate([np.full(len(np.ravel(r)), w, dtype=np.float64) for r, w in zip(rankings, weights)])
+    keep = ids >= 0
+    ids, ranks, list_weights = ids[keep], ranks[keep], list_weights[keep]
+    if len(ids) == 0:
+        return ids
+
+    unique, inverse = np.unique(ids, return_inverse=True)
+    scores = np.bincount(inverse, weights=list_weights / (k + ranks))
+    best_rank = np.full(len(unique), np.iinfo(np.int64).max)
+    np.minimum.at(best_rank, inverse, ranks)
+    order = np.lexsort((best_rank, -scores))
+    fused = unique[order]
+    return fused[:limit] if limit else fused
@@ -0,0 +1,393 @@
+import os
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+
+from backend.utils.metrics import LLM_EVENTS, LLM_CIRCUIT_OPEN
+
+# Total time budget of one analysis, across retries and hedges
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "8"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+# Full-jitter exponential backoff: sleep uniform(0, base * 2 ** attempt) seconds
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.2"))
+# Send a second, identical request when the first is slower than the recent p95
+LLM_HEDGE = os.getenv("LLM_HEDGE", "1") == "1"
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+# Concurrent LLM calls allowed per process (also the connection pool size)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+# Consecutive failures that open the circuit, and how long it stays open
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("LLM_CIRCUIT_FAILURES", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", "30"))
+
+# First words of the template summary used when the LLM is unavailable
+FALLBACK_PREFIX = "AI analysis is temporarily unavailable"
+
+
+class LLMUnavailableError(Exception):
+    """The provider could not answer in time (deadline, retries exhausted or circuit open)."""
+
+
+class CircuitBreaker:
+    """
+    Stops calling a degraded provider. After `failure_threshold` consecutive failures
+    the circuit opens and calls are rejected for `reset_timeout` seconds; then one
+    trial call is let through (half-open) and its outcome closes or re-opens it.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_SECONDS):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self):
+        """True if a call may go out now."""
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+        LLM_CIRCUIT_OPEN.set(0)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                opened = True
+            else:
+                opened = False
+        if opened:
+            LLM_EVENTS.inc(event="circuit_open")
+            LLM_CIRCUIT_OPEN.set(1)
+
+
+class LatencyTracker:
+    """Sliding window of recent successful call latencies (seconds)."""
+
+    def __init__(self, window=200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q, min_samples=1):
+        with self._lock:
+            if len(self._samples) < max(1, min_samples):
+                return None
+            return float(np.percentile(self._samples, q))
+
+
+def template_summary(query, restaurants):
+    """Plain summary of the matches, served instead of an LLM answer when the provider is down."""
+    if not restaurants:
+        return f"{FALLBACK_PREFIX}, and no restaurants matched \"{query}\"."
+
+    def field(r, name, default):
+        return r.get(name, default) if isinstance(r, dict) else getattr(r, name, default)
+
+    lines = [f"{FALLBACK_PREFIX}, so here is a quick summary of the top matches for \"{query}\":"]
+    for r in restaurants:
+        lines.append(
+            f"- {field(r, 'name', 'Unknown')}: {field(r, 'cuisine', 'N/A')} in {field(r, 'location', 'N/A')}, "
+            f"rated {field(r, 'rating', 'N/A')}, about ₹{field(r, 'cost', 'N/A')} for two."
+        )
+    return "\n".join(lines)
+
+
+def _is_retryable(exc):
+    """Timeouts, connection errors, 429s and 5xx are worth retrying; other API errors are not."""
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        return True
+    return status == 429 or status >= 500
+
+
+class _GatewayBase:
+    """State shared by the sync and async gateways: policy, breaker, latency window and counters."""
+
+    def __init__(self, client, deadline=LLM_DEADLINE, max_retries=LLM_MAX_RETRIES, backoff_base=LLM_BACKOFF_BASE,
+                 hedge=LLM_HEDGE, hedge_min_samples=LLM_HEDGE_MIN_SAMPLES, max_concurrency=LLM_MAX_CONCURRENCY,
+                 breaker=None, latency=None):
+        self.client = client
+        self.deadline = deadline
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.max_concurrency = max(1, max_concurrency)
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = latency or LatencyTracker()
+        # Same call shape as a Groq client, so callers can use either
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+        self._stats_lock = threading.Lock()
+        self._stats = {"calls": 0, "failures": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "rejected": 0}
+
+    def _count(self, name, event=None):
+        with self._stats_lock:
+            self._stats[name] += 1
+        if event:
+            LLM_EVENTS.inc(event=event)
+
+    def _hedge_delay(self, stream):
+        if not self.hedge or stream:
+            return None
+        return self.latency.percentile(95, min_samples=self.hedge_min_samples)
+
+    def _backoff(self, attempt, remaining):
+        return min(random.uniform(0, self.backoff_base * 2 ** attempt), max(0.0, remaining))
+
+    def _check_circuit(self):
+        if not self.breaker.allow():
+            self._count("rejected", event="fallback")
+            raise LLMUnavailableError("circuit open")
+
+    def stats(self):
+        """Call, retry and hedge counters plus breaker state and recent latency percentiles."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        p50 = self.latency.percentile(50)
+        p95 = self.latency.percentile(95)
+        stats.update({
+            "circuit": self.breaker.state,
+            "p50_ms": None if p50 is None else round(p50 * 1000, 2),
+            "p95_ms": None if p95 is None else round(p95 * 1000, 2),
+        })
+        return stats
+
+
+class LLMGateway(_GatewayBase):
+    """
+    Wraps a (pooled) Groq client with a per-call deadline, jittered retries, a hedged
+    second request after the recent p95 latency, a concurrency limit and a circuit
+    breaker. Exposes the client's `chat.completions.create`; raises
+    LLMUnavailableError when no answer can be produced in time.
+    """
+
+    def __init__(self, client, **kwargs):
+        super().__init__(client, **kwargs)
+        self._limit = threading.BoundedSemaphore(self.max_concurrency)
+        # Primary + hedge per allowed call
+        self._pool = ThreadPoolExecutor(max_workers=self.max_concurrency * 2, thread_name_prefix="llm-gateway")
+
+    def _call(self, kwargs, timeout):
+        with self._limit:
+            start = time.monotonic()
+            result = self.client.chat.completions.create(**kwargs, timeout=timeout)
+            return result, time.monotonic() - start
+
+    def _attempt(self, kwargs, deadline, hedge_delay):
+        remaining = deadline - time.monotonic()
+        primary = self._pool.submit(self._call, kwargs, remaining)
+        pending = {primary}
+        if hedge_delay is not None and hedge_delay < remaining:
+            done, _ = wait(pending, timeout=hedge_delay)
+            if not done:
+                self._count("hedges", event="hedge")
+                pending.add(self._pool.submit(self._call, kwargs, deadline - time.monotonic()))
+
+        errors = []
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                try:
+                    result, elapsed = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                if future is not primary:
+                    self._count("hedge_wins", event="hedge_win")
+                for other in pending:
+                    other.cancel()
+                return result, elapsed
+        if errors:
+            raise errors[0]
+        raise TimeoutError(f"no response within {self.deadline:g}s")
+
+    def create(self, **kwargs):
+        self._check_circuit()
+        self._count("calls")
+        deadline = time.monotonic() + self.deadline
+        hedge_delay = self._hedge_delay(kwargs.get("stream"))
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._count("retries", event="retry")
+            try:
+                result, elapsed = self._attempt(kwargs, deadline, hedge_delay)
+            except Exception as e:
+                last_error = e
+                if not _is_retryable(e):
+                    # The provider answered; this is a request problem, not an outage
+                    self.breaker.record_success()
+                    raise
+                remaining = deadline - time.monotonic()
+                if attempt == self.max_retries or remaining <= 0:
+                    break
+                time.sleep(self._backoff(attempt, remaining))
+                continue
+            self.breaker.record_success()
+            if not kwargs.get("stream"):
+                self.latency.add(elapsed)
+            return result
+
+        self._count("failures", event="fallback")
+        self.breaker.record_failure()
+        raise LLMUnavailableError(str(last_error) or type(last_error).__name__) from last_error
+
+
+class AsyncLLMGateway(_GatewayBase):
+    """Async counterpart of LLMGateway for AsyncGroq clients."""
+
+    def __init__(self, client, **kwargs):
+        super().__init__(client, **kwargs)
+        # asyncio primitives are bound to a loop, so the limiter is created per loop
+        self._limits = {}
+
+    def _limit(self):
+        loop = asyncio.get_running_loop()
+        if loop not in self._limits:
+            self._limits = {loop: asyncio.Semaphore(self.max_concurrency)}
+        return self._limits[loop]
+
+    async def _call(self, kwargs, timeout):
+        async with self._limit():
+            start = time.monotonic()
+            result = await asyncio.wait_for(self.client.chat.completions.create(**kwargs, timeout=timeout), timeout)
+            return result, time.monotonic() - start
+
+    async def _attempt(self, kwargs, deadline, hedge_delay):
+        remaining = deadline - time.monotonic()
+        primary = asyncio.ensure_future(self._call(kwargs, remaining))
+        pending = {primary}
+        try:
+            if hedge_delay is not None and hedge_delay < remaining:
+                done, _ = await asyncio.wait(pending, timeout=hedge_delay)
+                if not done:
+                    self._count("hedges", event="hedge")
+                    pending.add(asyncio.ensure_future(self._call(kwargs, deadline - time.monotonic())))
+
+            errors = []
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(0.0, deadline - time.monotonic()), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break
+                for task in done:
+                    if task.exception() is not None:
+                        errors.append(task.exception())
+                        continue
+                    if task is not primary:
+                        self._count("hedge_wins", event="hedge_win")
+                    return task.result()
+            if errors:
+                raise errors[0]
+            raise asyncio.TimeoutError(f"no response within {self.deadline:g}s")
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def create(self, **kwargs):
+        self._check_circuit()
+        self._count("calls")
+        deadline = time.monotonic() + self.deadline
+        hedge_delay = self._hedge_delay(kwargs.get("stream"))
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._count("retries", event="retry")
+            try:
+                result, elapsed = await self._attempt(kwargs, deadline, hedge_delay)
+            except Exception as e:
+                last_error = e
+                if not _is_retryable(e):
+                    self.breaker.record_success()
+                    raise
+                remaining = deadline - time.monotonic()
+                if attempt == self.max_retries or remaining <= 0:
+                    break
+                await asyncio.sleep(self._backoff(attempt, remaining))
+                continue
+            self.breaker.record_success()
+            if not kwargs.get("stream"):
+                self.latency.add(elapsed)
+            return result
+
+        self._count("failures", event="fallback")
+        self.breaker.record_failure()
+        raise LLMUnavailableError(str(last_error) or type(last_error).__name__) from last_error
+
+
+_gateways = {}
+_gateways_lock = threading.Lock()
+
+
+def get_gateways(api_key):
+    """
+    Returns the process-wide (LLMGateway, AsyncLLMGateway) pair for api_key. Both wrap
+    long-lived Groq clients whose keep-alive connection pools are reused by every call,
+    and share one circuit breaker and latency window.
+    """
+    with _gateways_lock:
+        if api_key not in _gateways:
+            import httpx
+            from groq import Groq, AsyncGroq
+
+            limits = httpx.Limits(max_connections=LLM_MAX_CONCURRENCY * 2, max_keepalive_connections=LLM_MAX_CONCURRENCY)
+            # Retries and timeouts are handled by the gateway, not the SDK
+            client = Groq(api_key=api_key, max_retries=0, http_client=httpx.Client(limits=limits))
+            async_client = AsyncGroq(api_key=api_key, max_retries=0, http_client=httpx.AsyncClient(limits=limits))
+            breaker, latency = CircuitBreaker(), LatencyTracker()
+            _gateways[api_key] = (
+                LLMGateway(client, breaker=breaker, latency=latency),
+                AsyncLLMGateway(async_client, breaker=breaker, latency=latency),
+            )
+        return _gateways[api_key]
+
+
+def reset_gateways():
+    """
+    Drops the cached gateways so the next get_gateways() call builds new ones. Used
+    by forked workers, which must not share their parent's connection pools.
+    """
+    with _gateways_lock:
+        _gateways.clear()
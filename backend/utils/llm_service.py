@@ -1,64 +1,181 @@
 import os
-from groq import Groq
+import asyncio
+import time
+from backend.utils.metrics import span, record_llm_usage
+from backend.utils.prompts import build_prompt, output_budget, estimate_tokens
+from backend.utils.llm_gateway import get_gateways, template_summary, LLMUnavailableError
+
+# Seconds to wait for a Groq completion before giving up
+LLM_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", "20"))
 
 def get_groq_client():
+    """Shared LLMGateway (pooled Groq client with deadline, retries, hedging and circuit breaker)."""
     api_key = os.getenv("GROQ_API_KEY")
     if api_key:
-        return Groq(api_key=api_key)
+        return get_gateways(api_key)[0]
     return None
 
+def get_async_groq_client():
+    """Shared AsyncLLMGateway, the async counterpart of get_groq_client."""
+    api_key = os.getenv("GROQ_API_KEY")
+    if api_key:
+        return get_gateways(api_key)[1]
+    return None
+
+def prepare_request(query, restaurants):
+    """
+    Chat completion arguments for an analysis: the budgeted prompt (see prompts.build_prompt)
+    and max_tokens, both scaled to the number of restaurants.
+
+    Returns:
+        tuple: (kwargs for chat.completions.create without the model, estimated prompt tokens)
+    """
+    max_tokens = output_budget(len(restaurants))
+    prompt, _ = build_prompt(query, restaurants, output_tokens=max_tokens)
+    kwargs = {"messages": [{"role": "user", "content": prompt}], "max_tokens": max_tokens}
+    return kwargs, estimate_tokens(prompt)
+
+def get_model_name():
+    # Use configurable model or default to stable version
+    return os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+
 def generate_restaurant_analysis(query, restaurants, client=None):
     """
     Generates a recommendation explanation using Groq.
-    
+
     Args:
         query (str): The user's search query.
         restaurants (list): List of Restaurant objects or matching dicts.
         client: Groq client instance. If None, it attempts to create one.
-    
+
     Returns:
         str: The AI analysis text.
     """
     if client is None:
         client = get_groq_client()
-        
+
     if not client:
         return "Analysis unavailable (Groq API Key missing)."
 
-    context_text = ""
-    for r in restaurants:
-        # Handle both object and dict access for flexibility
-        name = getattr(r, 'name', r.get('name', 'Unknown'))
-        cuisine = getattr(r, 'cuisine', r.get('cuisine', 'Unknown'))
-        location = getattr(r, 'location', r.get('location', 'Unknown'))
-        rating = getattr(r, 'rating', r.get('rating', 'N/A'))
-        cost = getattr(r, 'cost', r.get('cost', 'N/A'))
-        
-        context_text += f"- Name: {name}, Cuisine: {cuisine}, Location: {location}, Rating: {rating}, Cost: {cost}\n"
+    try:
+        request, estimated = prepare_request(query, restaurants)
+
+        started = time.perf_counter()
+        with span("llm"):
+            chat_completion = client.chat.completions.create(model=get_model_name(), **request)
+        record_llm_usage(
+            getattr(chat_completion, "usage", None), seconds=time.perf_counter() - started,
+            estimated_prompt_tokens=estimated, max_tokens=request["max_tokens"],
+        )
+        return chat_completion.choices[0].message.content
+    except LLMUnavailableError:
+        return template_summary(query, restaurants)
+    except Exception as e:
+        return f"Error generating analysis: {str(e)}"
+
+async def agenerate_restaurant_analysis(query, restaurants, client=None, timeout=LLM_TIMEOUT):
+    """
+    Async variant of generate_restaurant_analysis that never blocks the event loop.
+
+    Args:
+        query (str): The user's search query.
+        restaurants (list): List of Restaurant objects or matching dicts.
+        client: AsyncGroq client instance. If None, it attempts to create one.
+        timeout (float): Seconds to wait for the completion.
+
+    Returns:
+        str: The AI analysis text.
+    """
+    if client is None:
+        client = get_async_groq_client()
+
+    if not client:
+        return "Analysis unavailable (Groq API Key missing)."
 
     try:
-        prompt = f"""
-        You are a helpful food critic and restaurant expert. The user is asking: "{query}"
-        
-        Here are the top restaurant matches from our database:
-        {context_text}
-        
-        Based on these matches, provide a concise, engaging recommendation explaining why these places fit the user's request. 
-        Highlight the best option if clear. Keep it friendly and under 150 words.
-        """
-        
-        # Use configurable model or default to stable version
-        model_name = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
-        
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt,
-                }
-            ],
-            model=model_name, 
+        request, estimated = prepare_request(query, restaurants)
+
+        started = time.perf_counter()
+        with span("llm"):
+            chat_completion = await asyncio.wait_for(
+                client.chat.completions.create(model=get_model_name(), **request),
+                timeout=timeout,
+            )
+        record_llm_usage(
+            getattr(chat_completion, "usage", None), seconds=time.perf_counter() - started,
+            estimated_prompt_tokens=estimated, max_tokens=request["max_tokens"],
         )
         return chat_completion.choices[0].message.content
+    except LLMUnavailableError:
+        return template_summary(query, restaurants)
+    except asyncio.TimeoutError:
+        return f"Error generating analysis: timed out after {timeout:g}s"
     except Exception as e:
         return f"Error generating analysis: {str(e)}"
+
+def _stream_usage(chunk):
+    # Groq reports usage on the final chunk under x_groq
+    return getattr(getattr(chunk, "x_groq", None), "usage", None)
+
+def stream_restaurant_analysis(query, restaurants, client=None):
+    """
+    Streaming variant of generate_restaurant_analysis.
+    Yields the analysis text in chunks as Groq produces them.
+    """
+    if client is None:
+        client = get_groq_client()
+
+    if not client:
+        yield "Analysis unavailable (Groq API Key missing)."
+        return
+
+    try:
+        request, estimated = prepare_request(query, restaurants)
+        started = time.perf_counter()
+        usage = None
+        stream = client.chat.completions.create(model=get_model_name(), stream=True, **request)
+        for chunk in stream:
+            text = chunk.choices[0].delta.content
+            if text:
+                yield text
+            usage = _stream_usage(chunk) or usage
+        record_llm_usage(usage, seconds=time.perf_counter() - started, mode="stream",
+                         estimated_prompt_tokens=estimated, max_tokens=request["max_tokens"])
+    except LLMUnavailableError:
+        yield template_summary(query, restaurants)
+    except Exception as e:
+        yield f"Error generating analysis: {str(e)}"
+
+async def astream_restaurant_analysis(query, restaurants, client=None, timeout=LLM_TIMEOUT):
+    """
+    Async streaming variant of generate_restaurant_analysis.
+    Yields the analysis text in chunks; `timeout` bounds the wait for the stream to open.
+    """
+    if client is None:
+        client = get_async_groq_client()
+
+    if not client:
+        yield "Analysis unavailable (Groq API Key missing)."
+        return
+
+    try:
+        request, estimated = prepare_request(query, restaurants)
+        started = time.perf_counter()
+        usage = None
+        stream = await asyncio.wait_for(
+            client.chat.completions.create(model=get_model_name(), stream=True, **request),
+            timeout=timeout,
+        )
+        async for chunk in stream:
+            text = chunk.choices[0].delta.content
+            if text:
+                yield text
+            usage = _stream_usage(chunk) or usage
+        record_llm_usage(usage, seconds=time.perf_counter() - started, mode="stream",
+                         estimated_prompt_tokens=estimated, max_tokens=request["max_tokens"])
+    except LLMUnavailableError:
+        yield template_summary(query, restaurants)
+    except asyncio.TimeoutError:
+        yield f"Error generating analysis: timed out after {timeout:g}s"
+    except Exception as e:
+        yield f"Error generating analysis: {str(e)}"
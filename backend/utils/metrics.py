@@ -0,0 +1,343 @@
+import math
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Minimal in-process metrics with Prometheus text exposition (format 0.0.4).
+# Spans record into per-stage histograms and, while a request is being timed,
+# into that request's timings dict (used for the Server-Timing header).
+
+# Seconds; covers sub-millisecond FAISS lookups up to slow LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple((name, labels[name]) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key, value):
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram of observed values."""
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    def snapshot(self, **labels):
+        """Returns {"count", "sum", "buckets": [(upper bound, cumulative count)]}, or None."""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            if state is None:
+                return None
+            cumulative, total = [], 0
+            for bound, count in zip(self.buckets, state["counts"]):
+                total += count
+                cumulative.append((bound, total))
+            return {"count": state["count"], "sum": state["sum"], "buckets": cumulative}
+
+    def _samples(self, key, state):
+        lines, total = [], 0
+        for bound, count in zip(self.buckets, state["counts"]):
+            total += count
+            labels = key + (("le", _format_value(bound)),)
+            lines.append(f"{self.name}_bucket{_format_labels(labels)} {total}")
+        lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(state['sum'])}")
+        lines.append(f"{self.name}_count{_format_labels(key)} {state['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named collection of metrics rendered together for a /metrics scrape."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered.")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self.register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self.register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self):
+        """Prometheus text exposition of every registered metric."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "rec_stage_seconds", "Time spent in each stage of the recommendation pipeline.", ["stage"]
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "rec_request_seconds", "End-to-end API request latency.", ["endpoint"]
+)
+REQUESTS_TOTAL = REGISTRY.counter(
+    "rec_requests_total", "API requests handled, by endpoint and status code.", ["endpoint", "status"]
+)
+REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    "rec_requests_in_flight", "API requests currently being handled.", ["endpoint"]
+)
+LLM_TOKENS = REGISTRY.counter(
+    "rec_llm_tokens_total", "Tokens reported by the LLM API, by kind (prompt or completion).", ["kind"]
+)
+LLM_CALL_SECONDS = REGISTRY.histogram(
+    "rec_llm_call_seconds", "Latency of LLM analysis calls, by mode (complete or stream).", ["mode"]
+)
+LLM_EVENTS = REGISTRY.counter(
+    "rec_llm_events_total", "LLM gateway events: retry, hedge, hedge_win, fallback, circuit_open.", ["event"]
+)
+LLM_CIRCUIT_OPEN = REGISTRY.gauge(
+    "rec_llm_circuit_open", "1 while the LLM circuit breaker is rejecting calls, else 0."
+)
+CACHE_HIT_RATIO = REGISTRY.gauge(
+    "rec_cache_hit_ratio", "Hit ratio of each cache tier since startup.", ["cache", "tier"]
+)
+CACHE_ENTRIES = REGISTRY.gauge(
+    "rec_cache_entries", "Entries held by each cache tier.", ["cache", "tier"]
+)
+
+
+# Stage durations (seconds) of the request being handled, or None outside a timed request
+_request_timings = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def request_timings():
+    """Collects the spans of one request; yields the {stage: seconds} dict being filled."""
+    timings = {}
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+@contextmanager
+def span(stage):
+    """Times a block into rec_stage_seconds{stage} and the current request's timings."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+def _percentile(values, q):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+class LLMUsageStats:
+    """
+    Per-call LLM usage (tokens, latency, budgets) over a sliding window of recent calls,
+    plus running totals. stats() is what to look at when tuning the prompt/output
+    budgets against p95 LLM time.
+    """
+
+    def __init__(self, window=1000):
+        self._calls = deque(maxlen=window)
+        self._totals = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "seconds": 0.0}
+        self._lock = threading.Lock()
+
+    def record(self, seconds, prompt_tokens=None, completion_tokens=None, estimated_prompt_tokens=None,
+               max_tokens=None):
+        with self._lock:
+            self._calls.append((seconds, prompt_tokens, completion_tokens, estimated_prompt_tokens, max_tokens))
+            self._totals["calls"] += 1
+            self._totals["seconds"] += seconds
+            self._totals["prompt_tokens"] += prompt_tokens or 0
+            self._totals["completion_tokens"] += completion_tokens or 0
+
+    def clear(self):
+        with self._lock:
+            self._calls.clear()
+            self._totals = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "seconds": 0.0}
+
+    def stats(self):
+        """Totals, plus latency/token percentiles over the window and how often answers hit max_tokens."""
+        with self._lock:
+            calls = list(self._calls)
+            stats = dict(self._totals)
+        stats["seconds"] = round(stats["seconds"], 3)
+        stats["window"] = len(calls)
+        if not calls:
+            return stats
+
+        seconds = [c[0] for c in calls]
+        prompt = [c[1] for c in calls if c[1] is not None]
+        completion = [c[2] for c in calls if c[2] is not None]
+        stats.update({
+            "p50_ms": round(_percentile(seconds, 50) * 1000, 2),
+            "p95_ms": round(_percentile(seconds, 95) * 1000, 2),
+            "p99_ms": round(_percentile(seconds, 99) * 1000, 2),
+        })
+        if prompt:
+            stats["mean_prompt_tokens"] = round(sum(prompt) / len(prompt), 1)
+            stats["p95_prompt_tokens"] = _percentile(prompt, 95)
+        if completion:
+            stats["mean_completion_tokens"] = round(sum(completion) / len(completion), 1)
+            stats["p95_completion_tokens"] = _percentile(completion, 95)
+            timed = [(c[0], c[2]) for c in calls if c[2]]
+            if timed:
+                stats["completion_tokens_per_s"] = round(sum(t for _, t in timed) / max(sum(s for s, _ in timed), 1e-9), 1)
+        capped = [c for c in calls if c[2] is not None and c[4]]
+        if capped:
+            # Answers cut off by max_tokens; a high ratio means the output budget is too tight
+            stats["hit_max_tokens_ratio"] = round(sum(c[2] >= c[4] for c in capped) / len(capped), 4)
+        estimated = [(c[1], c[3]) for c in calls if c[1] and c[3]]
+        if estimated:
+            # Measured / estimated prompt tokens; tune LLM_CHARS_PER_TOKEN if far from 1
+            stats["prompt_estimate_ratio"] = round(sum(a for a, _ in estimated) / sum(e for _, e in estimated), 3)
+        return stats
+
+
+LLM_USAGE = LLMUsageStats()
+
+
+def record_llm_usage(usage, seconds=None, mode="complete", estimated_prompt_tokens=None, max_tokens=None):
+    """
+    Adds the prompt/completion token counts of an LLM response's usage object and,
+    when the call's latency is given, records the call in rec_llm_call_seconds and LLM_USAGE.
+    """
+    tokens = {}
+    for kind in ("prompt", "completion"):
+        value = getattr(usage, f"{kind}_tokens", None) if usage is not None else None
+        if isinstance(value, int) and value >= 0:
+            tokens[kind] = value
+            if value > 0:
+                LLM_TOKENS.inc(value, kind=kind)
+    if seconds is not None:
+        LLM_CALL_SECONDS.observe(seconds, mode=mode)
+        LLM_USAGE.record(seconds, tokens.get("prompt"), tokens.get("completion"), estimated_prompt_tokens, max_tokens)
+
+
+def record_cache_stats(cache_stats):
+    """Publishes RecommendationService.get_cache_stats() as hit-ratio and size gauges."""
+    for cache, tiers in cache_stats.items():
+        for tier, stats in tiers.items():
+            CACHE_HIT_RATIO.set(stats["hit_ratio"], cache=cache, tier=tier)
+            CACHE_ENTRIES.set(stats["size"], cache=cache, tier=tier)
+
+
+def format_server_timing(timings):
+    """Formats a timings dict as a Server-Timing header value (durations in ms)."""
+    return ", ".join(f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings.items())
@@ -0,0 +1,182 @@
+import os
+import re
+import numpy as np
+from backend.utils.vector_index import (
+    build_index, save_index, load_index, search_reranked, search_selected, search_subset, supports_selector
+)
+from backend.utils.artifacts import load_vectors
+
+# Multi-vector representation: besides its one short "Name/Cuisine/Location/Type" vector,
+# a restaurant can have many vectors embedded from chunks of its reviews and menu.
+# Stored next to the main bundle when ingest runs with --multi-vector:
+#   chunk_vectors.npy  - one row per chunk, grouped by restaurant, in row order
+#   chunk_owners.npy   - int32 metadata row id owning each chunk
+#   chunk_hashes.npy   - uint64 hash of each chunk's text, so the next ingest reuses vectors
+#   chunk_index.bin    - FAISS index over the chunks (+ chunk_index.json)
+# A query searches both indexes and each restaurant scores its best match (max-sim).
+CHUNK_VECTORS_FILE = "chunk_vectors.npy"
+CHUNK_OWNERS_FILE = "chunk_owners.npy"
+CHUNK_HASHES_FILE = "chunk_hashes.npy"
+CHUNK_INDEX_FILE = "chunk_index.bin"
+
+# Long-text columns chunked, with the label prefixed to each of their chunks
+CHUNK_COLUMNS = {"reviews_list": "Review", "menu_item": "Menu"}
+# Words per chunk (~90 MiniLM tokens) and the cap per restaurant that bounds the vector
+# count at 1 + MAX_CHUNKS_PER_RESTAURANT times the restaurant count
+CHUNK_WORDS = int(os.getenv("CHUNK_WORDS", "64"))
+MAX_CHUNKS_PER_RESTAURANT = int(os.getenv("MAX_CHUNKS_PER_RESTAURANT", "16"))
+# The chunk index is compressed and partitioned so memory and query latency grow slowly
+# with the chunk count; smaller chunk sets use a flat index
+CHUNK_INDEX_TYPE = os.getenv("CHUNK_INDEX_TYPE", "ivf_pq")
+CHUNK_MIN_ANN_ROWS = int(os.getenv("CHUNK_MIN_ANN_ROWS", "20000"))
+# Rows the chunk index is trained on, and rows added (or embedded) per block while building
+CHUNK_TRAIN_SIZE = int(os.getenv("CHUNK_TRAIN_SIZE", "65536"))
+CHUNK_BLOCK_SIZE = int(os.getenv("CHUNK_BLOCK_SIZE", "8192"))
+# Chunks fetched per requested candidate, so several chunks of one restaurant don't crowd out others
+CHUNK_FANOUT = int(os.getenv("CHUNK_FANOUT", "4"))
+# Filtered chunk searches over at most this many chunks scan the chunk vectors exactly
+CHUNK_EXACT_MAX_ROWS = int(os.getenv("CHUNK_EXACT_MAX_ROWS", "16384"))
+
+_ESCAPES = re.compile(r"\\n|\n|\\x[0-9a-fA-F]{2}")
+_REVIEW_MARKERS = re.compile(r"\bRated \d(?:\.\d)?\b|\bRATED\b")
+_PUNCTUATION = re.compile(r"[\[\]()'\"]+")
+
+
+def clean_text(value):
+    """Flattens a raw reviews_list / menu_item string ("[('Rated 4.0', 'RATED\\n ...')]") to plain words."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ""
+    text = _ESCAPES.sub(" ", str(value))
+    text = _REVIEW_MARKERS.sub(" ", text)
+    # List separators ("', '") leave lone commas behind
+    return " ".join(word for word in _PUNCTUATION.sub(" ", text).split() if word != ",")
+
+
+def iter_chunks(df, columns=CHUNK_COLUMNS, words=CHUNK_WORDS, max_chunks=MAX_CHUNKS_PER_RESTAURANT):
+    """Yields (row id, chunk text) for every restaurant, in row order, at most max_chunks per row."""
+    present = [(column, label) for column, label in columns.items() if column in df.columns]
+    if not present:
+        return
+    for row, values in enumerate(zip(*(df[column].to_numpy(dtype=object) for column, _ in present))):
+        emitted = 0
+        for (_, label), value in zip(present, values):
+            tokens = clean_text(value).split()
+            for start in range(0, len(tokens), words):
+                if emitted == max_chunks:
+                    break
+                yield row, f"{label}: " + " ".join(tokens[start:start + words])
+                emitted += 1
+
+
+def build_chunk_index(vectors, index_file, index_type=CHUNK_INDEX_TYPE, block_size=CHUNK_BLOCK_SIZE,
+                      train_size=CHUNK_TRAIN_SIZE, **index_params):
+    """
+    Builds the chunk index from a (memory-mapped) matrix without loading it whole:
+    trained on a random sample, then filled block by block.
+    """
+    n = len(vectors)
+    if n < CHUNK_MIN_ANN_ROWS:
+        index_type, index_params = "flat", {}
+    sample = np.sort(np.random.default_rng(0).choice(n, size=min(n, train_size), replace=False))
+    index, meta = build_index(np.asarray(vectors[sample], dtype='float32'), index_type=index_type, add=False,
+                              **index_params)
+    for start in range(0, n, block_size):
+        index.add(np.ascontiguousarray(vectors[start:start + block_size], dtype='float32'))
+    meta["ntotal"] = int(index.ntotal)
+    save_index(index, index_file, meta)
+    return index, meta
+
+
+def max_sim(parts, k, n_queries=1):
+    """
+    Merges (distances, restaurant ids) lists, where a restaurant may appear many times
+    (its own vector and its chunks), keeping each restaurant's nearest match. Returns the
+    k nearest restaurants per query, padded with inf / -1 like a FAISS result.
+    """
+    parts = [p for p in parts if p[1].shape[1]]
+    if not parts:
+        return np.empty((n_queries, 0), dtype='float32'), np.empty((n_queries, 0), dtype=np.int64)
+    distances = np.full((n_queries, k), np.inf, dtype='float32')
+    indices = np.full((n_queries, k), -1, dtype=np.int64)
+    all_distances = np.hstack([np.where(ids >= 0, d, np.inf) for d, ids in parts])
+    all_ids = np.hstack([ids for _, ids in parts])
+    for q in range(n_queries):
+        order = np.argsort(all_distances[q], kind="stable")
+        ids = all_ids[q][order]
+        # First (nearest) occurrence of each restaurant, in distance order
+        _, first = np.unique(ids, return_index=True)
+        first = np.sort(first[ids[first] >= 0])[:k]
+        distances[q, :len(first)] = all_distances[q][order][first]
+        indices[q, :len(first)] = ids[first]
+    return distances, indices
+
+
+class ChunkIndex:
+    """Chunk vectors, their owners and their FAISS index, searched per restaurant."""
+
+    def __init__(self, index, meta, owners, vectors=None, fanout=CHUNK_FANOUT):
+        self.index = index
+        self.meta = meta
+        self.owners = owners
+        self.vectors = vectors
+        self.fanout = fanout
+        # Chunks whose owner is served (None: all of them); see subset
+        self.served = None
+
+    @classmethod
+    def load(cls, artifact_dir, mmap=True):
+        """Opens a bundle's chunk artifacts, or returns None if it was built without them."""
+        index_file = os.path.join(artifact_dir, CHUNK_INDEX_FILE)
+        owners_file = os.path.join(artifact_dir, CHUNK_OWNERS_FILE)
+        if not (os.path.exists(index_file) and os.path.exists(owners_file)):
+            return None
+        index, meta = load_index(index_file, mmap=mmap)
+        vectors_file = os.path.join(artifact_dir, CHUNK_VECTORS_FILE)
+        vectors = load_vectors(vectors_file, mmap=mmap) if os.path.exists(vectors_file) else None
+        return cls(index, meta, np.load(owners_file, mmap_mode='r' if mmap else None), vectors)
+
+    @property
+    def ntotal(self):
+        return int(self.index.ntotal)
+
+    def subset(self, rows):
+        """
+        Restricts searches to chunks owned by the given sorted row ids and renumbers owners
+        to positions in rows. The FAISS index itself stays whole.
+        """
+        owners = np.asarray(self.owners, dtype=np.int64)
+        positions = np.searchsorted(rows, owners)
+        served = positions < len(rows)
+        served[served] = rows[positions[served]] == owners[served]
+        self.served = served
+        self.owners = np.where(served, positions, -1)
+        return self
+
+    def search(self, queries, k, mask=None):
+        """
+        Nearest chunks for k restaurants (k * fanout chunks), as (distances, owner row ids)
+        with owners repeated; optionally only chunks of rows set in the mask.
+        """
+        fetch_k = min(k * self.fanout, self.ntotal)
+        rerank = self.meta.get("rerank", 0) if self.vectors is not None else 0
+        if mask is None and self.served is None:
+            distances, positions = search_reranked(self.index, self.vectors, queries, fetch_k, rerank)
+        else:
+            if mask is None:
+                chunk_mask = self.served
+            else:
+                chunk_mask = mask[np.maximum(self.owners, 0)]
+                if self.served is not None:
+                    chunk_mask = chunk_mask & self.served
+            count = int(chunk_mask.sum())
+            if count == 0:
+                return np.empty((len(queries), 0), dtype='float32'), np.empty((len(queries), 0), dtype=np.int64)
+            fetch_k = min(fetch_k, count)
+            if self.vectors is not None and (count <= CHUNK_EXACT_MAX_ROWS or not supports_selector(self.meta)):
+                distances, positions = search_subset(self.vectors, np.flatnonzero(chunk_mask), queries, fetch_k)
+            else:
+                distances, positions = search_selected(
+                    self.index, queries, fetch_k, chunk_mask, vectors=self.vectors, rerank=rerank
+                )
+        owners = np.where(positions >= 0, np.asarray(self.owners)[np.maximum(positions, 0)], -1)
+        return distances, owners.astype(np.int64)
@@ -0,0 +1,86 @@
+import os
+import math
+
+# Token budgets for the analysis prompt. Both grow with the number of restaurants, so a
+# top_k=3 request sends (and waits for) less than a top_k=10 one:
+#   input  <= LLM_PROMPT_TOKENS_BASE + LLM_PROMPT_TOKENS_PER_RESULT * n
+#   output <= min(LLM_OUTPUT_TOKENS_BASE + LLM_OUTPUT_TOKENS_PER_RESULT * n, LLM_MAX_OUTPUT_TOKENS)
+LLM_PROMPT_TOKENS_BASE = int(os.getenv("LLM_PROMPT_TOKENS_BASE", "120"))
+LLM_PROMPT_TOKENS_PER_RESULT = int(os.getenv("LLM_PROMPT_TOKENS_PER_RESULT", "30"))
+LLM_OUTPUT_TOKENS_BASE = int(os.getenv("LLM_OUTPUT_TOKENS_BASE", "80"))
+LLM_OUTPUT_TOKENS_PER_RESULT = int(os.getenv("LLM_OUTPUT_TOKENS_PER_RESULT", "25"))
+LLM_MAX_OUTPUT_TOKENS = int(os.getenv("LLM_MAX_OUTPUT_TOKENS", "400"))
+# Token estimate used for budgeting (no tokenizer for the hosted model is loaded); the
+# measured prompt_tokens / estimate ratio is reported in the LLM usage stats
+CHARS_PER_TOKEN = float(os.getenv("LLM_CHARS_PER_TOKEN", "4"))
+# Longest user query (characters) copied into the prompt, and cuisines listed per restaurant
+MAX_QUERY_CHARS = int(os.getenv("LLM_MAX_QUERY_CHARS", "300"))
+MAX_CUISINES = 3
+# Words asked for per token of output budget, leaving room for the answer to finish
+WORDS_PER_OUTPUT_TOKEN = 0.6
+
+INSTRUCTIONS = (
+    "You are a helpful food critic and restaurant expert. "
+    "Recommend from the matches below (name | cuisines | location | rating | cost for two in INR), "
+    "explaining why they fit the user's request. Highlight the best option if clear. "
+    "Be friendly and concise, under {words} words."
+)
+
+
+def estimate_tokens(text):
+    """Approximate token count of a text for budgeting."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def prompt_budget(n_results):
+    """Input token budget for a prompt describing n_results restaurants."""
+    return LLM_PROMPT_TOKENS_BASE + LLM_PROMPT_TOKENS_PER_RESULT * max(n_results, 1)
+
+
+def output_budget(n_results):
+    """max_tokens for the analysis of n_results restaurants."""
+    return min(LLM_OUTPUT_TOKENS_BASE + LLM_OUTPUT_TOKENS_PER_RESULT * max(n_results, 1), LLM_MAX_OUTPUT_TOKENS)
+
+
+def _field(r, name, default):
+    value = r.get(name, default) if isinstance(r, dict) else getattr(r, name, default)
+    return default if value is None or value == "" else str(value)
+
+
+def compact_restaurant(r):
+    """One short line per restaurant: name | first cuisines | location | rating | cost."""
+    cuisines = ", ".join(c.strip() for c in _field(r, "cuisine", "?").split(",")[:MAX_CUISINES])
+    rating = _field(r, "rating", "?").replace("/5", "").strip()
+    cost = _field(r, "cost", "?")
+    return f"{_field(r, 'name', 'Unknown')} | {cuisines} | {_field(r, 'location', '?')} | {rating} | {cost}"
+
+
+def build_prompt(query, restaurants, max_tokens=None, output_tokens=None):
+    """
+    Builds the analysis prompt from the query and the matched restaurants (dicts or
+    objects), within max_tokens (prompt_budget(len(restaurants)) by default). The
+    lowest-ranked restaurants are dropped if the lines don't fit.
+
+    Returns:
+        tuple: (prompt, number of restaurants included)
+    """
+    n = len(restaurants)
+    max_tokens = max_tokens or prompt_budget(n)
+    output_tokens = output_tokens or output_budget(n)
+    query = " ".join(str(query).split())[:MAX_QUERY_CHARS]
+    header = (
+        INSTRUCTIONS.format(words=max(10, int(output_tokens * WORDS_PER_OUTPUT_TOKEN) // 10 * 10))
+        + f'\nUser request: "{query}"\nMatches, best first:\n'
+    )
+
+    used = estimate_tokens(header)
+    lines = []
+    for i, r in enumerate(restaurants, 1):
+        line = f"{i}. {compact_restaurant(r)}\n"
+        cost = estimate_tokens(line)
+        # Always keep the best match, even over budget
+        if lines and used + cost > max_tokens:
+            break
+        lines.append(line)
+        used += cost
+    return header + "".join(lines), len(lines)
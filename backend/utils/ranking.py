@@ -0,0 +1,96 @@
+import os
+import re
+import numpy as np
+from backend.utils.features import numeric_features
+
+# Score fusion over the ANN shortlist. Every candidate gets
+#   w_similarity * similarity + w_rating * quality + w_votes * popularity + w_cost * cost fit
+# with each term in [0, 1], computed for the whole (queries x candidates) matrix at once.
+RANK_FUSION = os.getenv("RANK_FUSION", "1") != "0"
+RANK_SIMILARITY_WEIGHT = float(os.getenv("RANK_SIMILARITY_WEIGHT", "1.0"))
+RANK_RATING_WEIGHT = float(os.getenv("RANK_RATING_WEIGHT", "0.3"))
+RANK_VOTES_WEIGHT = float(os.getenv("RANK_VOTES_WEIGHT", "0.1"))
+RANK_COST_WEIGHT = float(os.getenv("RANK_COST_WEIGHT", "0.2"))
+# Ratings are shrunk towards RATING_PRIOR as if it had RATING_PRIOR_VOTES extra votes,
+# so a 4.9 from 3 votes doesn't outrank a 4.5 from 3000
+RATING_PRIOR = float(os.getenv("RANK_RATING_PRIOR", "3.5"))
+RATING_PRIOR_VOTES = float(os.getenv("RANK_RATING_PRIOR_VOTES", "25"))
+# Budget (cost for two) assumed for queries asking for "cheap" or "budget" places
+CHEAP_BUDGET = float(os.getenv("RANK_CHEAP_BUDGET", "400"))
+
+_BUDGET_PATTERN = re.compile(
+    r"\b(?:under|below|within|upto|up to|less than|max|budget(?: of)?)\s*(?:rs\.?|inr|₹)?\s*(\d[\d,]*)", re.IGNORECASE
+)
+_CHEAP_PATTERN = re.compile(r"\b(?:cheap|budget|affordable|inexpensive|pocket[- ]friendly)\b", re.IGNORECASE)
+
+
+def budget_from_query(query):
+    """Cost for two implied by free text ("under 500", "cheap eats"), or None."""
+    match = _BUDGET_PATTERN.search(query or "")
+    if match:
+        return float(match.group(1).replace(",", ""))
+    if _CHEAP_PATTERN.search(query or ""):
+        return CHEAP_BUDGET
+    return None
+
+
+class FusionRanker:
+    """
+    Re-orders ANN candidates by fusing vector similarity with precomputed rating,
+    vote and cost features. All per-restaurant terms that don't depend on the query
+    are computed once here, so ranking a shortlist is a handful of NumPy gathers.
+    """
+
+    def __init__(self, df, similarity=RANK_SIMILARITY_WEIGHT, rating=RANK_RATING_WEIGHT,
+                 votes=RANK_VOTES_WEIGHT, cost=RANK_COST_WEIGHT):
+        self.weights = {"similarity": similarity, "rating": rating, "votes": votes, "cost": cost}
+        features = numeric_features(df)
+
+        known = ~np.isnan(features["rating"])
+        vote_counts = np.clip(np.nan_to_num(features["votes"], nan=0.0), 0, None)
+        # Bayesian average: unrated rows sit at the prior, thinly voted ones close to it
+        weight = np.where(known, vote_counts, 0.0)
+        rating = np.where(known, features["rating"], RATING_PRIOR)
+        adjusted = (weight * rating + RATING_PRIOR_VOTES * RATING_PRIOR) / (weight + RATING_PRIOR_VOTES)
+        self.quality = np.clip((adjusted - 1.0) / 4.0, 0.0, 1.0).astype('float32')
+
+        # Log-scaled so the most voted places don't drown everything else
+        top = np.log1p(vote_counts.max()) if len(vote_counts) else 0.0
+        self.popularity = (np.log1p(vote_counts) / top if top > 0 else np.zeros_like(vote_counts)).astype('float32')
+        self.cost = features["cost"]
+
+    def scores(self, distances, indices, budget=None):
+        """
+        Fused scores (higher is better) for a (queries x candidates) shortlist; -inf
+        where FAISS returned no candidate (-1). budget is the cost for two each query
+        asks for: one value, one per query (None where unknown), or None.
+        """
+        distances = np.asarray(distances, dtype='float32')
+        indices = np.asarray(indices)
+        valid = indices >= 0
+        ids = np.where(valid, indices, 0)
+
+        # Similarity scaled to [0, 1] within each query's shortlist (1 = nearest)
+        nearest = np.where(valid, distances, np.inf).min(axis=1, keepdims=True)
+        farthest = np.where(valid, distances, -np.inf).max(axis=1, keepdims=True)
+        spread = farthest - nearest
+        with np.errstate(invalid="ignore", divide="ignore"):
+            similarity = np.where(spread > 0, (farthest - np.where(valid, distances, farthest)) / spread, 1.0)
+
+        w = self.weights
+        score = w["similarity"] * similarity + w["rating"] * self.quality[ids] + w["votes"] * self.popularity[ids]
+        if budget is not None and w["cost"]:
+            # One budget for every query, or one per query (None/NaN where there is none)
+            budget = np.array(budget, dtype='float32', ndmin=1).reshape(-1, 1)
+            budget[budget <= 0] = np.nan
+            cost = self.cost[ids]
+            # 1 within budget, falling off quadratically above it; unknown costs are neutral
+            with np.errstate(invalid="ignore"):
+                fit = np.where(np.isnan(cost), 0.5, np.clip(budget / np.maximum(cost, 1.0), 0.0, 1.0) ** 2)
+            score = score + w["cost"] * np.where(np.isnan(budget), 0.0, fit)
+        return np.where(valid, score, -np.inf)
+
+    def rank(self, distances, indices, budget=None):
+        """Returns (distances, indices) re-ordered by fused score, best first, per query."""
+        order = np.argsort(-self.scores(distances, indices, budget), axis=1, kind="stable")
+        return np.take_along_axis(np.asarray(distances), order, axis=1), np.take_along_axis(np.asarray(indices), order, axis=1)
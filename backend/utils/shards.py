@@ -0,0 +1,243 @@
+import os
+import re
+import json
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from backend.utils.vector_index import (
+    build_index, save_index, load_index, search_reranked, search_selected, search_subset, supports_selector
+)
+from backend.utils.artifacts import write_vectors, load_vectors, VECTORS_FILE
+
+# Region shards (opt-in): when SHARD_COLUMN / --shard-column is set, ingest partitions
+# the rows by that column and writes, next to the monolithic bundle, one independently
+# loadable directory per region:
+#   shards/shards.json         - manifest: column, and per shard its value and row count
+#   shards/<name>/ids.npy      - int64 global row ids of the shard's rows, ascending
+#   shards/<name>/vectors.npy  - the shard's embedding rows
+#   shards/<name>/faiss_index.bin (+ .json)
+# A shard node loads only its served rows: metadata, result columns, filters, ranking and
+# the lexical index are built over them, and shard ids are renumbered into that local row
+# space (see ShardSet.localize). The chunk index stays one global FAISS index (memory-mapped),
+# with chunks of unserved rows masked out.
+# e.g. SHARD_COLUMN="listed_in(city)"; empty writes no shards.
+SHARD_COLUMN = os.getenv("SHARD_COLUMN", "")
+SHARDS_DIR = "shards"
+SHARDS_MANIFEST = "shards.json"
+SHARD_IDS_FILE = "ids.npy"
+SHARD_INDEX_FILE = "faiss_index.bin"
+# Shards smaller than this get an exact flat index: training IVF/PQ on a few thousand
+# rows buys nothing and PQ codebooks need more training points than that
+SHARD_MIN_ANN_ROWS = int(os.getenv("SHARD_MIN_ANN_ROWS", "20000"))
+# Threads searching shards in parallel (FAISS releases the GIL while it searches)
+SHARD_SEARCH_WORKERS = int(os.getenv("SHARD_SEARCH_WORKERS", "4"))
+# Filtered searches over at most this many of a shard's rows scan its vectors exactly
+SHARD_EXACT_MAX_ROWS = int(os.getenv("SHARD_EXACT_MAX_ROWS", "4096"))
+
+
+def shard_name(value):
+    """Directory-safe name of a shard value ("Koramangala 5th Block" -> "koramangala-5th-block")."""
+    return re.sub(r"[^a-z0-9]+", "-", str(value).lower()).strip("-") or "unknown"
+
+
+def shards_dir(artifact_dir):
+    return os.path.join(artifact_dir, SHARDS_DIR)
+
+
+def write_shards(df, embeddings, artifact_dir, column=SHARD_COLUMN, index_type="flat", vectors_dtype="float32",
+                 **index_params):
+    """
+    Partitions rows by column and writes one shard bundle per distinct value.
+    Returns the manifest, or None when df has no such column.
+    """
+    if column not in df.columns:
+        print(f"WARNING: Column '{column}' not found; no shards written.")
+        return None
+
+    names = df[column].astype("string").fillna("").map(shard_name).to_numpy(dtype=object)
+    values = df[column].astype("string").fillna("").to_numpy(dtype=object)
+    root = shards_dir(artifact_dir)
+    manifest = {"column": column, "shards": {}}
+    for name in sorted(set(names)):
+        ids = np.flatnonzero(names == name).astype(np.int64)
+        path = os.path.join(root, name)
+        os.makedirs(path, exist_ok=True)
+        if len(ids) >= SHARD_MIN_ANN_ROWS:
+            index, meta = build_index(embeddings[ids], index_type=index_type, **index_params)
+        else:
+            index, meta = build_index(embeddings[ids], index_type="flat")
+        save_index(index, os.path.join(path, SHARD_INDEX_FILE), meta)
+        write_vectors(embeddings[ids], os.path.join(path, VECTORS_FILE), dtype=vectors_dtype)
+        with open(os.path.join(path, SHARD_IDS_FILE), "wb") as f:
+            np.save(f, ids)
+        manifest["shards"][name] = {"value": values[ids[0]], "rows": int(len(ids)), "index_type": meta["index_type"]}
+
+    with open(os.path.join(root, SHARDS_MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Wrote {len(manifest['shards'])} shards by '{column}'.")
+    return manifest
+
+
+def merge_results(parts, k, n_queries=1):
+    """
+    Merges per-shard (distances, global ids) results for the same queries into the
+    k nearest overall, padded with inf / -1 like a FAISS result.
+    """
+    parts = [p for p in parts if p[1].shape[1]]
+    if not parts:
+        return np.empty((n_queries, 0), dtype='float32'), np.empty((n_queries, 0), dtype=np.int64)
+    distances = np.hstack([np.where(ids >= 0, d, np.inf) for d, ids in parts]).astype('float32')
+    indices = np.hstack([ids for _, ids in parts]).astype(np.int64)
+    k = min(k, distances.shape[1])
+    order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+    return np.take_along_axis(distances, order, axis=1), np.take_along_axis(indices, order, axis=1)
+
+
+class Shard:
+    """One region's index, vectors and id map; the index and vectors load on first search."""
+
+    def __init__(self, name, path, rows, value=None, mmap=True):
+        self.name = name
+        self.path = path
+        self.rows = rows
+        self.value = value
+        self.mmap = mmap
+        # Row ids are tiny and needed for routing, so they load up front (global until localized)
+        self.ids = np.load(os.path.join(path, SHARD_IDS_FILE))
+        self.index = None
+        self.meta = {}
+        self.vectors = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self.index is not None
+
+    def load(self):
+        with self._lock:
+            if self.index is None:
+                vectors_file = os.path.join(self.path, VECTORS_FILE)
+                if os.path.exists(vectors_file):
+                    self.vectors = load_vectors(vectors_file, mmap=self.mmap)
+                self.index, self.meta = load_index(os.path.join(self.path, SHARD_INDEX_FILE), mmap=self.mmap)
+        return self
+
+    def search(self, queries, k, mask=None):
+        """k nearest rows of this shard (global ids), optionally only those set in the global mask."""
+        self.load()
+        rerank = self.meta.get("rerank", 0) if self.vectors is not None else 0
+        if mask is None:
+            distances, positions = search_reranked(self.index, self.vectors, queries, min(k, self.rows), rerank)
+        else:
+            local_mask = mask[self.ids]
+            count = int(local_mask.sum())
+            if count == 0:
+                return np.empty((len(queries), 0), dtype='float32'), np.empty((len(queries), 0), dtype=np.int64)
+            k = min(k, count)
+            if self.vectors is not None and (count <= SHARD_EXACT_MAX_ROWS or not supports_selector(self.meta)):
+                distances, positions = search_subset(self.vectors, np.flatnonzero(local_mask), queries, k)
+            else:
+                distances, positions = search_selected(
+                    self.index, queries, k, local_mask, vectors=self.vectors, rerank=rerank
+                )
+        return distances, np.where(positions >= 0, self.ids[np.maximum(positions, 0)], -1)
+
+    def warm_up(self):
+        if self.loaded:
+            self.index.search(np.zeros((1, self.index.d), dtype='float32'), 1)
+
+
+class ShardSet:
+    """
+    The shards a node serves. Searches go to the shards holding selected rows (so a
+    location filter only touches its regions) or fan out to all of them in parallel,
+    and the per-shard top-k lists are merged by distance. Routing follows the filter mask
+    only; a location named in the query text alone ("biryani in BTM") fans out.
+    """
+
+    def __init__(self, column, shards, workers=SHARD_SEARCH_WORKERS):
+        self.column = column
+        self.shards = shards
+        self.workers = workers
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    @classmethod
+    def load(cls, artifact_dir, serve="all", mmap=True):
+        """
+        Opens the shard manifest of a bundle. serve is "all" or a comma-separated list of
+        shard names or values; only those are searched. Returns None if the bundle has no shards.
+        """
+        manifest_file = os.path.join(shards_dir(artifact_dir), SHARDS_MANIFEST)
+        if not os.path.exists(manifest_file):
+            return None
+        with open(manifest_file) as f:
+            manifest = json.load(f)
+
+        wanted = None if serve in (None, "", "all") else {shard_name(s) for s in serve.split(",") if s.strip()}
+        shards = {}
+        for name, info in manifest["shards"].items():
+            if wanted is None or name in wanted:
+                path = os.path.join(shards_dir(artifact_dir), name)
+                shards[name] = Shard(name, path, info["rows"], value=info.get("value"), mmap=mmap)
+        missing = sorted((wanted or set()) - set(shards))
+        if missing:
+            print(f"WARNING: Unknown shards requested: {', '.join(missing)}.")
+        return cls(manifest["column"], shards)
+
+    @property
+    def ntotal(self):
+        return sum(shard.rows for shard in self.shards.values())
+
+    def served_ids(self):
+        """Sorted global row ids of all served shards."""
+        return np.sort(np.concatenate([shard.ids for shard in self.shards.values()] or [np.empty(0, np.int64)]))
+
+    def localize(self, served_ids):
+        """Renumbers shard ids to positions in served_ids, so searches return local row ids."""
+        for shard in self.shards.values():
+            shard.ids = np.searchsorted(served_ids, shard.ids)
+
+    def loaded_names(self):
+        return [name for name, shard in self.shards.items() if shard.loaded]
+
+    def preload(self, names):
+        """Loads the named shards (e.g. the ones a predecessor had loaded) ahead of traffic."""
+        for name in names:
+            if name in self.shards:
+                self.shards[name].load().warm_up()
+
+    def route(self, mask=None):
+        """Shards holding at least one selected row (all served shards when mask is None)."""
+        if mask is None:
+            return list(self.shards.values())
+        return [shard for shard in self.shards.values() if mask[shard.ids].any()]
+
+    def _executor(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="rec-shard")
+            return self._pool
+
+    def search(self, queries, k, mask=None):
+        """Searches the routed shards in parallel and merges their results into the global top-k."""
+        queries = np.ascontiguousarray(queries, dtype='float32')
+        shards = self.route(mask)
+        if len(shards) <= 1 or self.workers <= 1:
+            parts = [shard.search(queries, k, mask) for shard in shards]
+        else:
+            parts = list(self._executor().map(lambda shard: shard.search(queries, k, mask), shards))
+        return merge_results(parts, k, len(queries))
+
+    def after_fork(self):
+        """Worker threads don't survive fork(); the pool is recreated on the next search."""
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def stats(self):
+        return {
+            "column": self.column,
+            "served": len(self.shards),
+            "rows": self.ntotal,
+            "loaded": self.loaded_names(),
+        }
@@ -0,0 +1,391 @@
+import os
+import json
+import math
+import time
+import numpy as np
+
+# faiss is imported inside the functions that need it, so importing this module
+# (e.g. for INDEX_TYPES in CLIs) doesn't load the native library.
+
+# Supported index types and the FAISS factory strings they map to.
+# "{nlist}", "{m}" and "{pq_m}"/"{pq_bits}" are filled in from the build parameters.
+INDEX_TYPES = {
+    "flat": "Flat",
+    "ivf_flat": "IVF{nlist},Flat",
+    "hnsw": "HNSW{m}",
+    "ivf_pq": "IVF{nlist},PQ{pq_m}x{pq_bits}",
+    # Compressed codes without partitioning: int8 / float16 scalar quantization,
+    # product quantization and 1-bit-per-dimension binary (LSH) codes
+    "sq8": "SQ8",
+    "sq_fp16": "SQfp16",
+    "pq": "PQ{pq_m}x{pq_bits}",
+    "binary": "LSH",
+}
+
+# Lossy index types whose shortlist is re-ranked with exact float distances
+# (from vectors.npy) by default, fetching RERANK_FACTOR x k candidates.
+QUANTIZED_TYPES = {"ivf_pq", "sq8", "sq_fp16", "pq", "binary"}
+DEFAULT_RERANK_FACTOR = 4
+# Index types whose search() rejects an IDSelector; filtered queries scan vectors.npy instead
+NO_SELECTOR_TYPES = {"pq", "binary"}
+
+DEFAULT_HNSW_M = 32
+DEFAULT_EF_CONSTRUCTION = 200
+DEFAULT_EF_SEARCH = 64
+DEFAULT_PQ_M = 48
+DEFAULT_PQ_BITS = 8
+
+
+def index_meta_path(index_file):
+    """Returns the path of the JSON sidecar stored next to a FAISS index file."""
+    return os.path.splitext(index_file)[0] + ".json"
+
+
+def suggest_nlist(n_vectors):
+    """Picks an IVF list count of roughly 4 * sqrt(n), keeping ~39 training points per list."""
+    nlist = int(4 * math.sqrt(max(n_vectors, 1)))
+    return max(1, min(nlist, n_vectors // 39 or 1))
+
+
+def default_nprobe(nlist):
+    """Default number of IVF lists to visit per query."""
+    return max(1, nlist // 16)
+
+
+def build_index(embeddings, index_type="flat", nlist=None, m=DEFAULT_HNSW_M,
+                ef_construction=DEFAULT_EF_CONSTRUCTION, pq_m=DEFAULT_PQ_M,
+                pq_bits=DEFAULT_PQ_BITS, nprobe=None, ef_search=DEFAULT_EF_SEARCH, rerank=None, add=True):
+    """
+    Builds (and trains, if required) a FAISS index over the given embeddings.
+
+    Args:
+        embeddings (np.ndarray): float32 matrix of shape (n, d).
+        index_type (str): One of INDEX_TYPES.
+        nlist (int): Number of IVF lists. Defaults to suggest_nlist(n).
+        m (int): HNSW graph degree.
+        ef_construction (int): HNSW build-time beam width.
+        pq_m (int): Number of PQ sub-quantizers (must divide d).
+        pq_bits (int): Bits per PQ code.
+        nprobe (int): Default IVF lists visited at search time.
+        ef_search (int): Default HNSW beam width at search time.
+        rerank (int): Shortlist size, as a multiple of k, re-ranked with exact distances.
+            Defaults to DEFAULT_RERANK_FACTOR for QUANTIZED_TYPES; 0 disables re-ranking.
+        add (bool): Add the embeddings after training. With False they are only a training
+            sample and the caller adds the rows itself (e.g. block by block).
+
+    Returns:
+        tuple: (faiss.Index, dict) the index and its metadata.
+    """
+    import faiss
+
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}'. Choose from {sorted(INDEX_TYPES)}.")
+
+    embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+    n_vectors, dimension = embeddings.shape
+
+    build_params = {}
+    search_params = {}
+    if index_type in ("ivf_flat", "ivf_pq"):
+        nlist = nlist or suggest_nlist(n_vectors)
+        build_params["nlist"] = nlist
+        search_params["nprobe"] = nprobe or default_nprobe(nlist)
+    if index_type == "hnsw":
+        build_params.update({"m": m, "ef_construction": ef_construction})
+        search_params["efSearch"] = ef_search
+    if index_type in ("ivf_pq", "pq"):
+        if dimension % pq_m != 0:
+            raise ValueError(f"pq_m={pq_m} must divide the embedding dimension {dimension}.")
+        build_params.update({"pq_m": pq_m, "pq_bits": pq_bits})
+
+    factory = INDEX_TYPES[index_type].format(nlist=nlist, m=m, pq_m=pq_m, pq_bits=pq_bits)
+    index = faiss.index_factory(dimension, factory)
+
+    if index_type == "hnsw":
+        index.hnsw.efConstruction = ef_construction
+
+    if not index.is_trained:
+        print(f"Training {factory} index on {n_vectors} vectors...")
+        index.train(embeddings)
+    if add:
+        index.add(embeddings)
+
+    meta = {
+        "index_type": index_type,
+        "factory": factory,
+        "dimension": dimension,
+        "ntotal": int(index.ntotal),
+        "build_params": build_params,
+        "search_params": search_params,
+        "rerank": rerank_factor(index_type, rerank),
+    }
+    apply_search_params(index, search_params)
+    return index, meta
+
+
+def rerank_factor(index_type, rerank=None):
+    """Shortlist multiple re-ranked exactly for an index type (0 = no re-ranking)."""
+    if rerank is None:
+        return DEFAULT_RERANK_FACTOR if index_type in QUANTIZED_TYPES else 0
+    return max(0, int(rerank))
+
+
+def supports_selector(meta):
+    """Whether the index can take an IDSelector through SearchParameters."""
+    return meta.get("index_type", "flat") not in NO_SELECTOR_TYPES
+
+
+def apply_search_params(index, search_params):
+    """Applies tunable search parameters (nprobe, efSearch) that the index supports."""
+    import faiss
+
+    parameter_space = faiss.ParameterSpace()
+    for name, value in (search_params or {}).items():
+        if value is None:
+            continue
+        try:
+            parameter_space.set_index_parameter(index, name, value)
+        except RuntimeError:
+            print(f"WARNING: Index does not support search parameter '{name}'.")
+
+
+def search_selected(index, queries, k, mask, vectors=None, rerank=0):
+    """
+    Searches only the rows whose bit is set in the boolean mask, using a FAISS
+    IDSelectorBitmap passed through SearchParameters (IVF and HNSW keep their
+    configured nprobe / efSearch). With rerank > 0 the shortlist is re-ranked
+    exactly against vectors.
+    """
+    import faiss
+
+    bitmap = np.packbits(mask, bitorder='little')
+    selector = faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bitmap))
+
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    elif hasattr(index, "hnsw"):
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    # bitmap must stay alive until the search returns
+    distances, indices = search_reranked(index, vectors, queries, k, rerank, params=params)
+    del bitmap
+    return distances, indices
+
+
+def search_subset(vectors, ids, queries, k):
+    """Exact L2 search over a small subset of rows, returning global row ids."""
+    import faiss
+
+    subset = np.ascontiguousarray(vectors[ids], dtype='float32')
+    distances, positions = faiss.knn(np.ascontiguousarray(queries, dtype='float32'), subset, min(k, len(ids)))
+    return distances, ids[positions]
+
+
+def rerank_exact(vectors, queries, candidates, k):
+    """
+    Re-orders each query's candidate ids by exact L2 distance to the stored float
+    vectors and keeps the best k. Rows with fewer candidates are padded with -1.
+
+    Returns:
+        tuple: (distances, indices) shaped like a FAISS search result.
+    """
+    queries = np.ascontiguousarray(queries, dtype='float32')
+    distances = np.full((len(queries), k), np.inf, dtype='float32')
+    indices = np.full((len(queries), k), -1, dtype=np.int64)
+    for i, row in enumerate(np.asarray(candidates)):
+        ids = row[row >= 0]
+        if len(ids) == 0:
+            continue
+        diff = np.asarray(vectors[np.sort(ids)], dtype='float32') - queries[i]
+        exact = np.einsum('ij,ij->i', diff, diff)
+        order = np.argsort(exact, kind='stable')[:k]
+        distances[i, :len(order)] = exact[order]
+        indices[i, :len(order)] = np.sort(ids)[order]
+    return distances, indices
+
+
+def search_reranked(index, vectors, queries, k, factor, params=None):
+    """Searches factor * k candidates in a (quantized) index and re-ranks them exactly."""
+    fetch_k = min(k * factor, index.ntotal) if factor else k
+    queries = np.ascontiguousarray(queries, dtype='float32')
+    if params is None:
+        distances, indices = index.search(queries, fetch_k)
+    else:
+        distances, indices = index.search(queries, fetch_k, params=params)
+    if not factor or vectors is None:
+        return distances, indices
+    return rerank_exact(vectors, queries, indices, k)
+
+
+def save_index(index, index_file, meta):
+    """Writes the index and records its type and parameters next to it."""
+    import faiss
+
+    faiss.write_index(index, index_file)
+    with open(index_meta_path(index_file), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+
+def read_index_meta(index_file):
+    """The metadata saved with an index, without runtime overrides; None if it has no sidecar."""
+    meta_file = index_meta_path(index_file)
+    if not os.path.exists(meta_file):
+        return None
+    with open(meta_file) as f:
+        return json.load(f)
+
+
+def mmap_flags():
+    """read_index flags that map the index file instead of copying it into RAM."""
+    import faiss
+
+    # IO_FLAG_MMAP covers IVF inverted lists; IO_FLAG_MMAP_IFC (newer FAISS) covers flat codes
+    return faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0) | faiss.IO_FLAG_READ_ONLY
+
+
+def load_index(index_file, nprobe=None, ef_search=None, mmap=False, rerank=None):
+    """
+    Loads whichever index type was built, with its recorded search parameters.
+
+    Search parameters and the re-rank factor can be overridden per call or through
+    the FAISS_NPROBE, FAISS_EF_SEARCH and FAISS_RERANK environment variables. With mmap=True the index data is mapped
+    read-only, so processes serving the same file share its pages.
+
+    Returns:
+        tuple: (faiss.Index, dict) the index and its metadata.
+    """
+    import faiss
+
+    index = None
+    if mmap:
+        try:
+            index = faiss.read_index(index_file, mmap_flags())
+        except RuntimeError as e:
+            print(f"WARNING: Could not memory-map {index_file} ({e}); reading it into memory.")
+    if index is None:
+        index = faiss.read_index(index_file)
+
+    meta = read_index_meta(index_file)
+    if meta is None:
+        # Indexes built before index types were configurable are always flat.
+        meta = {"index_type": "flat", "factory": "Flat", "dimension": index.d,
+                "ntotal": int(index.ntotal), "build_params": {}, "search_params": {}}
+
+    search_params = dict(meta.get("search_params", {}))
+    nprobe = nprobe or os.getenv("FAISS_NPROBE")
+    ef_search = ef_search or os.getenv("FAISS_EF_SEARCH")
+    if nprobe and "nprobe" in search_params:
+        search_params["nprobe"] = int(nprobe)
+    if ef_search and "efSearch" in search_params:
+        search_params["efSearch"] = int(ef_search)
+
+    apply_search_params(index, search_params)
+    meta["search_params"] = search_params
+    rerank = rerank if rerank is not None else os.getenv("FAISS_RERANK")
+    meta["rerank"] = rerank_factor(meta["index_type"], rerank if rerank is not None else meta.get("rerank"))
+    return index, meta
+
+
+def _time_search(index, queries, k, vectors=None, rerank=0):
+    """Runs one query at a time and returns (indices, per-query latencies in ms)."""
+    latencies = []
+    all_indices = []
+    for i in range(len(queries)):
+        start = time.perf_counter()
+        _, indices = search_reranked(index, vectors, queries[i:i + 1], k, rerank)
+        latencies.append((time.perf_counter() - start) * 1000)
+        all_indices.append(indices[0])
+    return np.array(all_indices), np.array(latencies)
+
+
+def recall_at_k(approx_indices, exact_indices):
+    """Fraction of the exact top-k neighbours also returned by the approximate search."""
+    hits = 0
+    for approx, exact in zip(approx_indices, exact_indices):
+        hits += len(np.intersect1d(approx, exact[exact >= 0]))
+    return hits / max(exact_indices[exact_indices >= 0].size, 1)
+
+
+def recall_latency_report(index, meta, embeddings, queries, k=10, sweep=None):
+    """
+    Measures recall@k and latency of an index against an exact flat baseline.
+
+    Args:
+        index: The approximate index to evaluate.
+        meta (dict): Its metadata from build_index/load_index.
+        embeddings (np.ndarray): The vectors the index was built from.
+        queries (np.ndarray): float32 query vectors.
+        k (int): Number of neighbours to compare.
+        sweep (list): Values of the index's search parameter (nprobe or efSearch)
+            to evaluate. Defaults to a few powers of two around the configured value.
+
+    Returns:
+        list[dict]: One row per configuration, starting with the flat baseline.
+    """
+    import faiss
+
+    queries = np.ascontiguousarray(queries, dtype='float32')
+    baseline = faiss.IndexFlatL2(embeddings.shape[1])
+    baseline.add(np.ascontiguousarray(embeddings, dtype='float32'))
+    exact, flat_latencies = _time_search(baseline, queries, k)
+
+    rows = [_report_row("flat", None, None, 1.0, flat_latencies)]
+
+    search_params = meta.get("search_params", {})
+    if not search_params:
+        if meta.get("index_type", "flat") != "flat":
+            approx, latencies = _time_search(index, queries, k)
+            rows.append(_report_row(meta["index_type"], None, None, recall_at_k(approx, exact), latencies))
+        rows.extend(_rerank_rows(index, meta, embeddings, queries, k, exact))
+        return rows
+
+    param_name, configured = next(iter(search_params.items()))
+    if sweep is None:
+        sweep = sorted({max(1, configured // 4), max(1, configured // 2), configured,
+                        configured * 2, configured * 4})
+    for value in sweep:
+        apply_search_params(index, {param_name: value})
+        approx, latencies = _time_search(index, queries, k)
+        rows.append(_report_row(meta["index_type"], param_name, value, recall_at_k(approx, exact), latencies))
+
+    # Restore the configured value so the index can be saved or served afterwards.
+    apply_search_params(index, search_params)
+    rows.extend(_rerank_rows(index, meta, embeddings, queries, k, exact))
+    return rows
+
+
+def _rerank_rows(index, meta, embeddings, queries, k, exact):
+    """Recall/latency with exact re-ranking of the shortlist, around the configured factor."""
+    factor = meta.get("rerank", 0)
+    if not factor:
+        return []
+    rows = []
+    for value in sorted({max(1, factor // 2), factor, factor * 2}):
+        approx, latencies = _time_search(index, queries, k, vectors=embeddings, rerank=value)
+        rows.append(_report_row(meta["index_type"] + "+rr", "rerank", value, recall_at_k(approx, exact), latencies))
+    return rows
+
+
+def _report_row(index_type, param_name, param_value, recall, latencies):
+    return {
+        "index_type": index_type,
+        "param": param_name,
+        "value": param_value,
+        "recall": round(float(recall), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 4),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 4),
+    }
+
+
+def format_report(rows, k=10):
+    """Formats recall_latency_report rows as a plain-text table."""
+    lines = [f"{'index':<10} {'param':<10} {'value':>6} {'recall@' + str(k):>10} {'p50 ms':>9} {'p95 ms':>9}"]
+    for row in rows:
+        value = "" if row["value"] is None else row["value"]
+        lines.append(
+            f"{row['index_type']:<10} {row['param'] or '':<10} {value:>6} "
+            f"{row['recall']:>10.4f} {row['p50_ms']:>9.4f} {row['p95_ms']:>9.4f}"
+        )
+    return "\n".join(lines)
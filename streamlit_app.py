@@ -1,6 +1,12 @@
 import streamlit as st
 import os
-from backend.core import rec_service
+from backend.core import get_rec_service, watch_artifacts
+
+# Same process-wide service (and artifacts) the API uses; loaded once per process.
+# Fetched again on every rerun, so a generation swapped in by the watcher is picked up.
+rec_service = get_rec_service()
+# Reloads newly published generations when ARTIFACT_WATCH_SECONDS is set (started once)
+watch_artifacts()
 
 st.set_page_config(
     page_title="Zomato AI Recommender",
@@ -43,12 +49,17 @@ st.markdown("""
 st.title("🍽️ Zomato AI Restaurant Recommender")
 st.markdown("Discover the best places to eat in Bengaluru using AI-powered search.")
 
+if not rec_service.is_ready():
+    st.error("Recommendation data is not loaded. Please run ingest_data.py first.")
+
 # Sidebar Inputs
 with st.sidebar:
     st.header("Your Preferences")
     
     cuisine = st.text_input("Cuisine", placeholder="e.g., North Indian, Italian, Sushi")
     location = st.text_input("Location", placeholder="e.g., Koramangala, Indiranagar")
+    max_cost = st.number_input("Max cost for two (₹, 0 = any)", min_value=0, value=0, step=100)
+    min_rating = st.slider("Minimum rating", 0.0, 5.0, 0.0, 0.5)
     top_k = st.slider("Number of Recommendations", 3, 10, 5)
     
     st.markdown("---")
@@ -58,6 +69,9 @@ with st.sidebar:
 if "results" not in st.session_state:
     st.session_state["results"] = None
 
+# Analysis stream of a search made in this run; rendered into its slot after the cards
+analysis_stream = None
+
 # Main Content
 if search_btn:
     if not cuisine and not location:
@@ -72,13 +86,21 @@ if search_btn:
         with st.spinner(f"Searching for '{query}'..."):
             try:
                 # Direct Backend Call (No HTTP Request)
-                data = rec_service.get_recommendations(query, top_k)
+                filters = {
+                    "location": location,
+                    "max_cost": max_cost or None,
+                    "min_rating": min_rating or None,
+                }
+                events = rec_service.stream_recommendations(query, top_k, filters=filters)
+                # Restaurants arrive first; the analysis is streamed in below
+                kind, payload = next(events)
                 
-                if "error" in data:
-                    st.error(f"Error: {data['error']}")
+                if kind == "error":
+                    st.error(f"Error: {payload}")
                 else:
                     # Store in session state for persistence
-                    st.session_state["results"] = data
+                    st.session_state["results"] = {"restaurants": payload, "ai_analysis": None}
+                    analysis_stream = events
             except Exception as e:
                 st.error(f"An error occurred: {str(e)}")
 
@@ -86,14 +108,9 @@ if search_btn:
 if st.session_state["results"]:
     data = st.session_state["results"]
     
-    # AI Analysis Section
-    if "ai_analysis" in data:
-        st.subheader("🤖 AI Analysis")
-        st.markdown(f"""
-        <div class="ai-analysis">
-            {data['ai_analysis']}
-        </div>
-        """, unsafe_allow_html=True)
+    # AI Analysis Section (filled in after the cards when it is still streaming)
+    st.subheader("🤖 AI Analysis")
+    analysis_slot = st.container()
     
     # Restaurant Cards
     st.subheader("Top Recommendations")
@@ -124,6 +141,18 @@ if st.session_state["results"]:
                     st.write("No Link")
             st.markdown("---")
 
+    with analysis_slot:
+        if analysis_stream is not None:
+            data["ai_analysis"] = st.write_stream(
+                payload for kind, payload in analysis_stream if kind == "token"
+            )
+        elif data.get("ai_analysis"):
+            st.markdown(f"""
+            <div class="ai-analysis">
+                {data['ai_analysis']}
+            </div>
+            """, unsafe_allow_html=True)
+
 else:
     # Landing State
     st.info("👈 Enter your preferences in the sidebar to get started!")